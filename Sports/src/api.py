@@ -1,31 +1,95 @@
-from src.schemas import PredictionRequest, PredictionResponse
+from src.schemas import (
+    ActivationResponse,
+    BookmakerOdds,
+    Canary,
+    MatchResult,
+    ModelVersion,
+    OddsBookResponse,
+    OddsUpdateResponse,
+    PredictionRequest,
+    PredictionResponse,
+    ResultsResponse,
+)
 from src.models import AIModel
+from src.jobs import RetrainJobManager
+from src.executor import ExecutorSaturated, PredictionExecutor
+from src.admission import AdmissionController, AdmissionMiddleware
+from src.batching import MicroBatcher
+from src.coalescing import RequestCoalescer, request_key
+from src.subscriptions import FixtureHub, Subscriber
+from src.documentation import DocumentationStore
+from src.serialization import MsgpackRoute, PredictionSerializer, validation_error_response
+from src.profiling import RequestProfiler
+from src.startup import StartupTracker, sample_requests
+from src.config import settings
+from src.metrics import (
+    MODEL_INFO,
+    MODEL_LAST_TRAINED,
+    REGISTRY,
+    MetricsMiddleware,
+)
+from src.lazy_imports import preload_heavy_modules
+from src.logging_setup import (
+    PayloadSampler,
+    RequestIdMiddleware,
+    StageTimer,
+    configure_logging,
+)
 
-from fastapi import FastAPI, HTTPException, status
-from fastapi.responses import JSONResponse
-from fastapi.encoders import jsonable_encoder
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect, status
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import ValidationError
 import datetime
+import asyncio
 import logging
 import json
 
 
-# Configure Logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Upper bound on the number of fixtures accepted by /predict/slate
+MAX_SLATE_SIZE = 1000
+
 
 class SportsPredictionAPI:
     def __init__(self):
-        # Initialize the AI Model
-        self.ai_model = AIModel()
+        self.startup = StartupTracker()
+        # Route logging through the background queue before anything logs
+        configure_logging(level=settings.log_level, fmt=settings.log_format)
+        self.payload_sampler = PayloadSampler(settings.log_payload_sample_rate)
+
+        # The AI model and everything that calls it are created by _start()
+        # once the server is up, see _lifespan()
+        self.ai_model = None
+        self.executor = None
+        self.batcher = None
+        self.retrain_jobs = None
+        self.hub = None
+        self.coalescer = RequestCoalescer.from_settings(settings)
+        self.admission = AdmissionController.from_settings(settings, batch_path="/predict/slate")
+        self.documentation = DocumentationStore()
+        self.serializer = PredictionSerializer.from_settings(PredictionResponse, settings)
+        self.profiler = RequestProfiler.from_settings(settings)
 
         # Initialize FastAPI app
         self.app = FastAPI(
             title="Sports Prediction API",
             description="REST API wrapping a predictive model for predicting sports outcomes and model retraining.",
             version="0.1.0",
+            lifespan=self._lifespan,
         )
+        if self.admission is not None:
+            # Innermost, so shed requests still get a request ID and show up in the metrics
+            self.app.add_middleware(AdmissionMiddleware, controller=self.admission)
+        self.app.add_middleware(RequestIdMiddleware)
+        self.app.add_middleware(MetricsMiddleware)
+        # Every route also accepts application/msgpack bodies
+        self.app.router.route_class = MsgpackRoute
+        self.app.add_exception_handler(RequestValidationError, validation_error_response)
         self._setup_routes()
+        self.startup.record("app_init")
 
     def _setup_routes(self):
         """
@@ -37,68 +101,528 @@ class SportsPredictionAPI:
             response_model=PredictionResponse,
             status_code=status.HTTP_200_OK,
         )
-        async def predict_outcome(request: PredictionRequest):
+        async def predict_outcome(request: PredictionRequest, http_request: Request):
             """
             Predicts the outcome of a sports match based on provided team and odds data.
             """
+            self._ensure_ready()
             try:
+                timer = StageTimer()
+                data = request.model_dump()
+                profile_mode = self.profiler.requested_mode(http_request.headers)
+                profile_report = None
+                with timer.stage("predict"):
+                    if profile_mode is not None:
+                        # Profiled requests run inline so the capture sees the model's work
+                        with self.profiler.profile(profile_mode, "predict") as profile_report:
+                            prediction_result = self.ai_model.predict(data)
+                    elif self.coalescer is not None:
+                        # Identical requests already in flight share one model call
+                        prediction_result = await self.coalescer.run(
+                            request_key(data), lambda: self._dispatch(data)
+                        )
+                    else:
+                        prediction_result = await self._dispatch(data)
+                with timer.stage("encode"):
+                    response = self.serializer.response(
+                        prediction_result, http_request.headers.get("accept")
+                    )
+                if profile_report and profile_report["path"]:
+                    response.headers["X-Profile-Report"] = profile_report["path"]
                 logger.info(
-                    f"INFO: Prediction request received at {datetime.datetime.now().isoformat()}"
+                    "Prediction served",
+                    extra=timer.log_fields(
+                        data if self.payload_sampler.should_log() else None
+                    ),
+                )
+                return response
+
+            except ExecutorSaturated as e:
+                raise self._overloaded(e)
+            except Exception as e:
+                logger.error("Prediction failed - %s", e)
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"An error occurred during prediction: {str(e)}",
+                )
+
+        @self.app.post(
+            "/predict/slate",
+            response_model=list[PredictionResponse],
+            status_code=status.HTTP_200_OK,
+        )
+        async def predict_slate(requests: list[PredictionRequest], http_request: Request):
+            """
+            Predicts the outcomes of a whole slate of fixtures in one call.
+            Results are returned in the same order as the fixtures and are
+            validated against PredictionResponse.
+            """
+            self._ensure_ready()
+            if len(requests) > MAX_SLATE_SIZE:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"A slate can contain at most {MAX_SLATE_SIZE} fixtures.",
+                )
+            try:
+                logger.info("Slate prediction request for %d fixtures received", len(requests))
+                prediction_results = await self.executor.run(
+                    "predict_many", [request.model_dump() for request in requests]
                 )
-                prediction_result = self.ai_model.predict(request.dict())
-                return JSONResponse(content=jsonable_encoder(prediction_result))
+                # Validated once here, so JSON and msgpack clients get the same checked results
+                prediction_results = self.serializer.validate_many(prediction_results)
+                return self.serializer.response_many(prediction_results, http_request.headers.get("accept"))
 
+            except ExecutorSaturated as e:
+                raise self._overloaded(e)
             except Exception as e:
-                logger.info(f"ERROR: Prediction failed - {e}")
+                logger.error("Slate prediction failed - %s", e)
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                     detail=f"An error occurred during prediction: {str(e)}",
                 )
 
-        @self.app.post("/retrain", status_code=status.HTTP_200_OK)
+        @self.app.post(
+            "/results",
+            response_model=ResultsResponse,
+            status_code=status.HTTP_200_OK,
+        )
+        async def record_results(results: list[MatchResult]):
+            """
+            Records finished matches, in the order given, and updates the
+            ratings /predict uses for the winner and its confidence.
+            """
+            self._ensure_ready()
+            ratings = self.ai_model.ratings
+            if ratings is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Team ratings are disabled (RATINGS_ENABLED=false).",
+                )
+            teams = []
+            book = self.ai_model.odds_book
+            for result in results:
+                ratings.record_result(
+                    result.home_team,
+                    result.away_team,
+                    result.home_goals,
+                    result.away_goals,
+                    result.played_at,
+                )
+                teams += [result.home_team, result.away_team]
+                if book is not None:
+                    # The match is over, its odds are no use anymore
+                    book.remove(result.home_team, result.away_team)
+            # Rebuilding and writing the snapshot is file I/O, keep it off the event loop
+            await asyncio.to_thread(ratings.save)
+            logger.info("Recorded %d match results", len(results))
+            return {
+                "applied": len(results),
+                "ratings": [ratings.describe(team) for team in dict.fromkeys(teams)],
+            }
+
+        @self.app.post(
+            "/odds",
+            response_model=OddsUpdateResponse,
+            status_code=status.HTTP_200_OK,
+        )
+        async def update_odds(updates: list[PredictionRequest]):
+            """
+            Takes the latest average odds of fixtures. Subscribed fixtures whose
+            odds moved are predicted again and the changes pushed on /subscribe.
+            """
+            self._ensure_ready()
+            if self.hub is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Subscriptions are disabled (SUBSCRIPTIONS_ENABLED=false).",
+                )
+            try:
+                return await self.hub.update_odds([update.model_dump() for update in updates])
+            except ExecutorSaturated as e:
+                raise self._overloaded(e)
+
+        @self.app.post(
+            "/odds/book",
+            response_model=OddsBookResponse,
+            status_code=status.HTTP_200_OK,
+        )
+        async def update_odds_book(updates: list[BookmakerOdds]):
+            """
+            Applies line moves of single bookmakers to the odds book, in the
+            order given. Subscribed fixtures are predicted again with the new
+            best odds.
+            """
+            self._ensure_ready()
+            book = self.ai_model.odds_book
+            if book is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="The odds book is disabled (ODDS_BOOK_ENABLED=false).",
+                )
+            if self.executor.mode == "process":
+                # Process-pool children have books of their own this one can't reach
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Line moves need the inline or thread execution mode; "
+                    "send the odds_book with each request instead.",
+                )
+            for update in updates:
+                book.update(update.home_team, update.away_team, update.bookmaker, update.market, update.prices)
+            fixtures = list(dict.fromkeys((update.home_team, update.away_team) for update in updates))
+            pushed = 0
+            if self.hub is not None:
+                try:
+                    pushed = await self.hub.refresh(fixtures)
+                except ExecutorSaturated as e:
+                    raise self._overloaded(e)
+            return {
+                "applied": len(updates),
+                "pushed": pushed,
+                "fixtures": [book.describe(home_team, away_team) for home_team, away_team in fixtures],
+            }
+
+        @self.app.websocket("/subscribe")
+        async def subscribe(websocket: WebSocket):
+            """
+            Pushes prediction changes of the fixtures a client follows.
+            Clients send {"subscribe": [<PredictionRequest>, ...]} or
+            {"unsubscribe": [{"home_team": ..., "away_team": ...}, ...]}.
+            Each followed fixture first gets a "snapshot" message with its full
+            prediction, then "update" messages with only the fields that changed.
+            """
+            if self.hub is None or not self.startup.ready:
+                # 1013: try again later
+                await websocket.close(code=1013)
+                return
+            await websocket.accept()
+            subscriber = self.hub.connect()
+            sender = asyncio.create_task(self._send_messages(websocket, subscriber))
+            try:
+                while True:
+                    frame = await websocket.receive()
+                    if frame["type"] == "websocket.disconnect":
+                        raise WebSocketDisconnect(frame.get("code", 1000))
+                    await self._handle_subscription(subscriber, frame.get("text") or frame.get("bytes"))
+            except WebSocketDisconnect:
+                pass
+            finally:
+                sender.cancel()
+                self.hub.disconnect(subscriber)
+
+        @self.app.post("/retrain", status_code=status.HTTP_202_ACCEPTED)
         async def retrain_model():
             """
-            Triggers the retraining process for the AI model.
-            This endpoint requires no parameters.
+            Starts the retraining process for the AI model in the background.
+            This endpoint requires no parameters and returns a job ID that can be
+            polled on /retrain/{job_id}.
             """
-            logger.info(
-                f"INFO: Retrain endpoint called at {datetime.datetime.now().isoformat()}"
+            self._ensure_ready()
+            job = self.retrain_jobs.submit()
+            logger.info("Retrain endpoint called, job %s", job.job_id)
+            return JSONResponse(
+                status_code=status.HTTP_202_ACCEPTED,
+                content={
+                    "message": "Model retraining initiated successfully.",
+                    "job_id": job.job_id,
+                    "status_url": f"/retrain/{job.job_id}",
+                },
             )
-            retrain_status = self.ai_model.retrain()
 
-            if retrain_status.get("status") == "success":
-                return JSONResponse(
-                    content={
-                        "message": "Model retraining initiated successfully.",
-                        "details": retrain_status,
-                    }
+        @self.app.get("/retrain/{job_id}")
+        async def retrain_status(job_id: str):
+            """
+            Reports the current stage and stage timings of a retraining job.
+            """
+            self._ensure_ready()
+            job = self.retrain_jobs.get(job_id)
+            if job is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Unknown retrain job: {job_id}",
+                )
+            return JSONResponse(content=job.to_dict())
+
+        @self.app.get("/models", response_model=list[ModelVersion])
+        async def list_models():
+            """
+            Lists the registered model versions, newest first.
+            """
+            return self._model_registry().versions()
+
+        @self.app.post("/models/rollback", response_model=ActivationResponse)
+        async def rollback_model():
+            """
+            Goes back to the model version that was active before the current one.
+            """
+            self._model_registry()
+            try:
+                activation = self.ai_model.rollback()
+            except LookupError as e:
+                raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+            self.executor.refresh()
+            return activation
+
+        @self.app.post("/models/{version_id}/activate", response_model=ActivationResponse)
+        async def activate_model(version_id: str):
+            """
+            Serves a registered model version from now on.
+            """
+            self._model_registry()
+            try:
+                activation = self.ai_model.activate(version_id)
+            except KeyError:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Unknown model version: {version_id}",
                 )
-            else:
+            self.executor.refresh()
+            return activation
+
+        @self.app.put("/models/canary", response_model=Canary)
+        async def set_canary(canary: Canary):
+            """
+            Routes `percent` % of the /predict calls to another version, to
+            compare it with the active one on live traffic.
+            """
+            registry = self._model_registry()
+            try:
+                registry.set_canary(canary.version_id, canary.percent)
+            except KeyError:
                 raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail={
-                        "message": "Model retraining failed.",
-                        "details": retrain_status,
-                    },
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Unknown model version: {canary.version_id}",
                 )
+            self.executor.refresh()
+            return canary
+
+        @self.app.delete("/models/canary", status_code=status.HTTP_204_NO_CONTENT)
+        async def clear_canary():
+            """
+            Sends every /predict call to the active version again.
+            """
+            self._model_registry().clear_canary()
+            self.executor.refresh()
 
         @self.app.get("/health")
         async def health_check():
             """
-            Health check endpoint.
+            Health check endpoint. Answers as soon as the process is up;
+            use /ready to know whether predictions can be served.
             """
+            if self.ai_model is None:
+                return {
+                    "status": "starting",
+                    "ready": False,
+                    "model_loaded": False,
+                    "startup_phase": self.startup.current_phase,
+                }
             return {
                 "status": "healthy",
+                "ready": self.startup.ready,
                 "model_loaded": self.ai_model.model is not None,
                 "last_trained_at": self.ai_model.last_trained_at,
+                "model_version": self.ai_model.model["version"],
+                "cache": self._cache_stats(),
+                "registry": self.ai_model.registry.stats() if self.ai_model.registry else None,
+                "executor": self.executor.stats(),
+                "microbatch": self.batcher.stats() if self.batcher else None,
+                "coalescing": self.coalescer.stats() if self.coalescer else None,
+                "subscriptions": self.hub.stats() if self.hub else None,
+                "admission": self.admission.stats() if self.admission else None,
+                "ratings": self.ai_model.ratings.stats() if self.ai_model.ratings else None,
+                "odds_book": self.ai_model.odds_book.stats() if self.ai_model.odds_book else None,
             }
 
+        @self.app.get("/ready")
+        async def readiness_check():
+            """
+            Readiness check endpoint. Answers 503 until the model is loaded
+            and warmed up, and reports how long each startup phase took.
+            """
+            report = self.startup.to_dict()
+            if report["ready"]:
+                return report
+            return JSONResponse(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                content=report,
+                headers={"Retry-After": str(settings.startup_retry_after_seconds)},
+            )
+
         @self.app.get("/documentation")
-        async def get_documentation():
-            # Reads the documentation.json file and returns it oin this enbdpount
-            with open("documentation.json", "r") as file:
-                documentation = json.load(file)
-            return JSONResponse(content=documentation)
+        async def get_documentation(request: Request):
+            """
+            Returns documentation.json from memory, with ETag revalidation.
+            """
+            body, etag = self.documentation.current()
+            headers = {
+                "ETag": etag,
+                "Cache-Control": f"public, max-age={settings.documentation_max_age}",
+            }
+            if_none_match = request.headers.get("if-none-match")
+            if if_none_match and DocumentationStore.matches(if_none_match, etag):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+            return Response(content=body, media_type="application/json", headers=headers)
+
+        @self.app.get("/metrics", include_in_schema=False)
+        async def metrics():
+            """
+            Exposes request, model and retrain metrics in the Prometheus text format.
+            """
+            self._update_model_gauges()
+            return PlainTextResponse(
+                REGISTRY.render(), media_type="text/plain; version=0.0.4"
+            )
+
+    @asynccontextmanager
+    async def _lifespan(self, app):
+        """
+        Starts loading the model in the background so uvicorn binds its port
+        straight away, and releases the executor and job threads on shutdown.
+        """
+        startup = asyncio.create_task(self._start())
+        try:
+            yield
+        finally:
+            startup.cancel()
+            if self.batcher is not None:
+                self.batcher.close()
+            if self.executor is not None:
+                self.executor.shutdown()
+            if self.retrain_jobs is not None:
+                self.retrain_jobs.shutdown()
+
+    async def _start(self):
+        """
+        Runs the startup phases off the event loop, then marks the API ready.
+        """
+        try:
+            with self.startup.phase("imports"):
+                await asyncio.to_thread(preload_heavy_modules)
+            with self.startup.phase("model_load"):
+                ai_model = await asyncio.to_thread(AIModel)
+            with self.startup.phase("executor"):
+                executor = PredictionExecutor.from_settings(ai_model, settings)
+                self.batcher = MicroBatcher.from_settings(
+                    lambda rows: executor.run("predict_routed", rows), settings
+                )
+                self.retrain_jobs = RetrainJobManager(ai_model, on_success=executor.refresh)
+                self.hub = FixtureHub.from_settings(
+                    lambda rows: executor.run("predict_many", rows), self.serializer.encode, settings
+                )
+                self.executor = executor
+                self.ai_model = ai_model
+            if settings.warmup_requests > 0:
+                with self.startup.phase("warmup"):
+                    await self._warmup(settings.warmup_requests)
+            self.startup.mark_ready()
+        except Exception as e:
+            self.startup.fail(e)
+
+    async def _warmup(self, count: int):
+        """
+        Sends `count` synthetic predictions through the same path as real
+        requests (executor, batch method and serializer), so the first real
+        request doesn't pay for cold code paths or pool start-up.
+        """
+        samples = sample_requests(PredictionRequest, min(count, self.executor.max_pending))
+        # Concurrent calls so every process-pool child gets started
+        results = await asyncio.gather(
+            *(self.executor.run("predict", sample) for sample in samples)
+        )
+        self.serializer.dumps(results[0])
+        self.serializer.dumps_many(await self.executor.run("predict_many", samples))
+        if self.ai_model.cache is not None:
+            # Keep the synthetic requests out of the cache and its statistics
+            self.ai_model.cache.clear(reset_stats=True)
+
+    def _dispatch(self, data):
+        """
+        Sends one /predict row to the micro-batcher when it's enabled,
+        otherwise straight to the executor.
+        """
+        if self.batcher is not None:
+            return self.batcher.submit(data)
+        return self.executor.run("predict", data)
+
+    async def _handle_subscription(self, subscriber: Subscriber, frame):
+        try:
+            # A malformed frame gets an error message like any invalid request
+            message = json.loads(frame)
+            if not isinstance(message, dict):
+                raise ValueError("Expected a JSON object")
+            if "subscribe" in message:
+                requests = [PredictionRequest.model_validate(row).model_dump() for row in message["subscribe"]]
+                await self.hub.subscribe(subscriber, requests)
+            if "unsubscribe" in message:
+                self.hub.unsubscribe(
+                    subscriber, [(row["home_team"], row["away_team"]) for row in message["unsubscribe"]]
+                )
+        except (ValidationError, ValueError, TypeError, KeyError, ExecutorSaturated) as e:
+            subscriber.push(self.serializer.encode({"type": "error", "detail": str(e)}).decode("utf-8"))
+
+    @staticmethod
+    async def _send_messages(websocket: WebSocket, subscriber: Subscriber):
+        """
+        Sends a subscriber's queued messages, in order, until it's dropped.
+        """
+        while True:
+            message = await subscriber.queue.get()
+            if message is None:
+                # Too far behind; the client can reconnect and subscribe again
+                await websocket.close(code=1013)
+                return
+            await websocket.send_text(message)
+
+    def _ensure_ready(self):
+        if not self.startup.ready:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="The model is still starting up, retry later.",
+                headers={"Retry-After": str(settings.startup_retry_after_seconds)},
+            )
+
+    def _cache_stats(self):
+        if self.ai_model.cache is None:
+            return None
+        stats = self.ai_model.cache.stats()
+        if self.executor.mode == "process":
+            # Predictions run in the pool workers, each with a cache of its own
+            stats["note"] = "Counts of the API process only; process-pool workers keep their own caches."
+        return stats
+
+    @staticmethod
+    def _overloaded(exc: ExecutorSaturated) -> HTTPException:
+        logger.warning("Prediction rejected, executor queue is full")
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(exc),
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+
+    def _model_registry(self):
+        self._ensure_ready()
+        if self.ai_model.registry is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="The model registry is disabled (MODEL_REGISTRY_ENABLED=false).",
+            )
+        return self.ai_model.registry
+
+    def _update_model_gauges(self):
+        """
+        Refreshes the model version and last-trained gauges before a scrape.
+        """
+        if self.ai_model is None:
+            return
+        MODEL_INFO.clear()
+        MODEL_INFO.labels(self.ai_model.model["version"]).set(1)
+
+        last_trained_at = self.ai_model.last_trained_at
+        if isinstance(last_trained_at, str):
+            last_trained_at = datetime.datetime.strptime(
+                last_trained_at, "%Y-%m-%d %H:%M:%S"
+            ).timestamp()
+        MODEL_LAST_TRAINED.set(last_trained_at or 0)
 
     def get_app(self):
         """
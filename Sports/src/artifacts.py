@@ -0,0 +1,125 @@
+from pathlib import Path
+from typing import Any, Dict, Tuple
+import hashlib
+import json
+import mmap
+import os
+
+from src.lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+
+
+# On-disk model artifact format:
+#
+#   <artifact_dir>/manifest.json          metadata plus the layout of every array
+#   <artifact_dir>/weights-<sha256>.bin   all arrays, raw, back to back
+#
+# The weights file is named after its content hash and never modified once
+# written, and the manifest is replaced atomically, so readers always see a
+# consistent pair. Loading maps the weights file read-only and hands out NumPy
+# views into it: every uvicorn worker shares the same page-cache copy and a
+# cold start costs about as much as an open().
+
+MANIFEST_NAME = "manifest.json"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+
+def artifact_exists(directory) -> bool:
+    return (Path(directory) / MANIFEST_NAME).is_file()
+
+
+def write_atomic(path: Path, data: bytes):
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+def write_artifact(directory, metadata: Dict[str, Any], arrays: Dict[str, "np.ndarray"]) -> Path:
+    """
+    Writes `arrays` as raw little-endian buffers plus a JSON manifest holding
+    `metadata` and the dtype/shape/offset of each array.
+    Returns the path of the manifest.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    layout = {}
+    chunks = []
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        if array.dtype.hasobject:
+            raise ValueError(f"Array '{name}' has an object dtype and cannot be memory-mapped")
+        array = array.astype(array.dtype.newbyteorder("<"), copy=False)
+
+        padding = -offset % ALIGNMENT
+        if padding:
+            chunks.append(b"\0" * padding)
+            offset += padding
+        layout[name] = {
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": offset,
+            "nbytes": array.nbytes,
+        }
+        chunks.append(array.tobytes())
+        offset += array.nbytes
+
+    blob = b"".join(chunks)
+    digest = hashlib.sha256(blob).hexdigest()
+    weights_name = f"weights-{digest[:32]}.bin"
+    weights_path = directory / weights_name
+    if not weights_path.exists():
+        write_atomic(weights_path, blob)
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "metadata": metadata,
+        "weights_file": weights_name,
+        "weights_sha256": digest,
+        "arrays": layout,
+    }
+    manifest_path = directory / MANIFEST_NAME
+    write_atomic(manifest_path, json.dumps(manifest, indent=2).encode("utf-8"))
+
+    # Old weight files can go: processes that still map them keep their pages
+    for stale in directory.glob("weights-*.bin"):
+        if stale.name != weights_name:
+            try:
+                stale.unlink()
+            except OSError:
+                pass
+    return manifest_path
+
+
+def load_artifact(directory) -> Tuple[Dict[str, Any], Dict[str, "np.ndarray"]]:
+    """
+    Opens an artifact written by write_artifact.
+    Returns the metadata and read-only arrays backed by a shared memory map.
+    """
+    directory = Path(directory)
+    with open(directory / MANIFEST_NAME, "r") as file:
+        manifest = json.load(file)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format: {manifest.get('format_version')}")
+
+    arrays = {}
+    weights_path = directory / manifest["weights_file"]
+    if manifest["arrays"] and os.path.getsize(weights_path) > 0:
+        with open(weights_path, "rb") as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        for name, spec in manifest["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = spec["nbytes"] // dtype.itemsize
+            arrays[name] = np.frombuffer(
+                buffer, dtype=dtype, count=count, offset=spec["offset"]
+            ).reshape(spec["shape"])
+    else:
+        for name, spec in manifest["arrays"].items():
+            arrays[name] = np.zeros(spec["shape"], dtype=np.dtype(spec["dtype"]))
+    return manifest["metadata"], arrays
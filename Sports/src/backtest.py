@@ -0,0 +1,190 @@
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import multiprocessing
+import logging
+import os
+
+from src.ingest import DATA_SUFFIXES, clean_chunks, parse_chunks
+from src.lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+
+
+logger = logging.getLogger(__name__)
+
+MATCH_COLUMNS = ("home_team", "away_team", "home_goals", "away_goals")
+# History files carry no odds, so every replayed fixture is priced even
+_REPLAY_ODDS = 2.0
+
+
+def load_match_history(path, chunk_rows: int = 50_000, max_rows: int = 5_000) -> Dict[str, "np.ndarray"]:
+    """
+    The latest `max_rows` matches of one league file (the ingest format:
+    team and goal columns, rows in time order), as column arrays.
+    """
+    kept: List[Dict[str, "np.ndarray"]] = []
+    rows = 0
+    chunks = clean_chunks(
+        parse_chunks(path, MATCH_COLUMNS, chunk_rows), MATCH_COLUMNS[2:], MATCH_COLUMNS[:2]
+    )
+    for chunk in chunks:
+        kept.append(chunk)
+        rows += len(chunk["home_goals"])
+        # Drop whole chunks once the newer ones alone cover max_rows
+        while rows - len(kept[0]["home_goals"]) >= max_rows:
+            rows -= len(kept.pop(0)["home_goals"])
+    if not kept:
+        return {}
+    return {column: np.concatenate([chunk[column] for chunk in kept])[-max_rows:] for column in MATCH_COLUMNS}
+
+
+def _pick_hits(results: List[Dict[str, Any]], home_teams, margin: "np.ndarray", total: "np.ndarray"):
+    """
+    Hit (1) / miss (0) / no pick (-1) of the winner, over/under and spread
+    picks of every fixture, shape (3, n).
+    """
+    hits = np.full((3, len(results)), -1, dtype=np.int8)
+    for i, result in enumerate(results):
+        home_won = result["winner"] == home_teams[i]
+        hits[0, i] = margin[i] > 0 if home_won else margin[i] < 0
+        if result["over_under"] is not None:
+            side, line = result["over_under"].split()
+            hits[1, i] = total[i] > float(line) if side == "Over" else total[i] < float(line)
+        if result["spread"] is not None:
+            team, handicap = result["spread"].rsplit(" ", 1)
+            handicap = float(handicap)
+            hits[2, i] = margin[i] + handicap > 0 if team == home_teams[i] else handicap - margin[i] > 0
+    return hits
+
+
+def _score_league(league: str, matches: Dict[str, "np.ndarray"], models: Dict[str, Dict[str, Any]], window: int):
+    # Runs in a worker process: replays one league through every model
+    from src.models import AIModel
+
+    home_teams, away_teams = matches["home_team"].tolist(), matches["away_team"].tolist()
+    home_goals, away_goals = matches["home_goals"], matches["away_goals"]
+    margin, total = home_goals - away_goals, home_goals + away_goals
+
+    scores = {}
+    for label, model in models.items():
+        evaluator = AIModel.for_backtest(model)
+        hits = []
+        # Walk forward: each window is predicted in one slate call with the
+        # ratings as they stood before it, then its results are recorded
+        for start in range(0, len(home_teams), window):
+            end = min(start + window, len(home_teams))
+            results = evaluator._predict_many(
+                [
+                    {
+                        "home_team": home_teams[i],
+                        "away_team": away_teams[i],
+                        "home_team_odds_avg": _REPLAY_ODDS,
+                        "away_team_odds_avg": _REPLAY_ODDS,
+                    }
+                    for i in range(start, end)
+                ]
+            )
+            hits.append(_pick_hits(results, home_teams[start:end], margin[start:end], total[start:end]))
+            if evaluator.ratings is not None:
+                for i in range(start, end):
+                    evaluator.ratings.record_result(home_teams[i], away_teams[i], int(home_goals[i]), int(away_goals[i]))
+        if hits:
+            hits = np.concatenate(hits, axis=1)
+            picked = hits >= 0
+            scores[label] = {"picks": picked.sum(axis=1).tolist(), "hits": (hits == 1).sum(axis=1).tolist()}
+    return scores
+
+
+class Backtester:
+    """
+    Walk-forward backtest of Sports models on the match history in DATA_DIR.
+
+    Every file is one league, replayed in time order a `window` of matches
+    at a time: each window is predicted in one vectorised slate call with
+    the team ratings frozen as they stood before it, its winner, over/under
+    and spread picks are checked against the final scores, and then its
+    results are fed to the ratings. Leagues run in parallel in a process
+    pool. A model's score is the share of its picks that won.
+    """
+
+    def __init__(
+        self,
+        directory,
+        window: int = 64,
+        max_history: int = 5_000,
+        chunk_rows: int = 50_000,
+        workers: Optional[int] = None,
+    ):
+        self.directory = Path(directory)
+        self.window = window
+        self.max_history = max_history
+        self.chunk_rows = chunk_rows
+        self.workers = workers
+
+    @classmethod
+    def from_settings(cls, settings) -> Optional["Backtester"]:
+        if not settings.backtest_enabled or not settings.data_dir.is_dir():
+            return None
+        return cls(
+            settings.data_dir,
+            window=settings.backtest_window,
+            max_history=settings.backtest_max_history,
+            chunk_rows=settings.ingest_chunk_rows,
+            workers=settings.backtest_workers or None,
+        )
+
+    def evaluate(self, models: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Scores each of `models` (label -> model dict). Returns label ->
+        score details, or an empty dict when there is no usable history.
+        """
+        history = self.load_history()
+        if not history:
+            return {}
+
+        args = [(league, matches, models, self.window) for league, matches in history.items()]
+        if len(args) > 1 and self.workers != 1:
+            # spawn keeps children clear of the parent's threads and locks
+            with ProcessPoolExecutor(
+                max_workers=min(len(args), self.workers or os.cpu_count() or 1),
+                mp_context=multiprocessing.get_context("spawn"),
+            ) as pool:
+                per_group = list(pool.map(_score_league, *zip(*args)))
+        else:
+            per_group = [_score_league(*arg) for arg in args]
+
+        return self._combine(per_group, groups=len(args))
+
+    def load_history(self) -> Dict[str, Dict[str, "np.ndarray"]]:
+        history = {}
+        for path in sorted(self.directory.rglob("*")):
+            if path.suffix not in DATA_SUFFIXES or not path.is_file():
+                continue
+            matches = load_match_history(path, self.chunk_rows, self.max_history)
+            if matches:
+                history[path.relative_to(self.directory).as_posix()] = matches
+        return history
+
+    @staticmethod
+    def _combine(per_group, groups: int) -> Dict[str, Dict[str, Any]]:
+        totals: Dict[str, Dict[str, "np.ndarray"]] = {}
+        for scores in per_group:
+            for label, values in scores.items():
+                total = totals.setdefault(label, {"picks": np.zeros(3, np.int64), "hits": np.zeros(3, np.int64)})
+                total["picks"] += values["picks"]
+                total["hits"] += values["hits"]
+
+        combined = {}
+        for label, total in totals.items():
+            picks, hits = total["picks"], total["hits"]
+            accuracy = np.divide(hits, picks, out=np.zeros(3), where=picks > 0)
+            combined[label] = {
+                "score": round(float(hits.sum() / max(picks.sum(), 1)), 6),
+                "winner_accuracy": round(float(accuracy[0]), 6),
+                "over_under_accuracy": round(float(accuracy[1]), 6),
+                "spread_accuracy": round(float(accuracy[2]), 6),
+                "matches": int(picks[0]),
+                "leagues": groups,
+            }
+        return combined
@@ -0,0 +1,123 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+import threading
+import json
+import math
+import time
+
+
+def bucket(value: float, tolerance: float) -> Any:
+    """
+    Maps a price or odds value onto a bucket so that values within
+    `tolerance` (relative, e.g. 0.001 = 0.1%) of each other share a cache key.
+    With a tolerance of 0 the value itself is used.
+    """
+    if tolerance <= 0 or value <= 0:
+        return value
+    return round(math.log(value) / math.log1p(tolerance))
+
+
+class PredictionCache:
+    """
+    Bounded in-process cache for prediction results.
+
+    Entries expire after `ttl_seconds` and the least recently used entries are
+    evicted once either `max_entries` or `max_bytes` is exceeded. Callers are
+    expected to include the model version in the key, so a retrain makes old
+    entries unreachable and they age out on their own.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 60.0,
+        max_entries: int = 10_000,
+        max_bytes: int = 64 * 1024 * 1024,
+        clock=time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_settings(cls, settings) -> Optional["PredictionCache"]:
+        if not settings.cache_enabled:
+            return None
+        return cls(
+            ttl_seconds=settings.cache_ttl_seconds,
+            max_entries=settings.cache_max_entries,
+            max_bytes=settings.cache_max_bytes,
+        )
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, size, expires_at = entry
+            if expires_at <= now:
+                self._remove(key, size)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        size = self._estimate_size(value)
+        if size > self.max_bytes:
+            return
+
+        expires_at = self._clock() + self.ttl_seconds
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size, expires_at)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self, reset_stats: bool = False):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if reset_stats:
+                self.hits = self.misses = self.expirations = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+            }
+
+    def _remove(self, key: Hashable, size: int):
+        del self._entries[key]
+        self._bytes -= size
+
+    @staticmethod
+    def _estimate_size(value: Any) -> int:
+        # The JSON length is a cheap, stable proxy for the memory an entry holds
+        return len(json.dumps(value, default=str))
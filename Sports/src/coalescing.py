@@ -0,0 +1,76 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+import asyncio
+import logging
+
+from src.metrics import COALESCED_REQUESTS
+
+
+logger = logging.getLogger(__name__)
+
+
+def request_key(data: Any) -> Hashable:
+    """
+    A hashable key for a request payload: dicts and lists are turned into
+    tuples, so equal payloads always get equal keys.
+    """
+    if isinstance(data, dict):
+        return tuple((key, request_key(value)) for key, value in sorted(data.items()))
+    if isinstance(data, (list, tuple)):
+        return tuple(request_key(value) for value in data)
+    return data
+
+
+class RequestCoalescer:
+    """
+    Single-flight execution of identical concurrent requests.
+
+    The first caller with a given key starts the computation; every caller
+    that arrives with the same key while it runs awaits that same result
+    instead of starting its own. Once the computation finishes the key is
+    forgotten, so later requests compute again (and go through the model's
+    own cache, which handles reuse over time).
+
+    The computation runs as a task of its own, so a caller that disconnects
+    (and gets cancelled) doesn't cancel it for the callers still waiting.
+    Errors reach every caller of the flight.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.flights = 0
+        self.coalesced = 0
+
+    @classmethod
+    def from_settings(cls, settings) -> Optional["RequestCoalescer"]:
+        if not settings.coalescing_enabled:
+            return None
+        return cls()
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Returns the result of `compute()`, shared with every concurrent caller using `key`.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self.flights += 1
+        else:
+            self.coalesced += 1
+            COALESCED_REQUESTS.inc()
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Marks the error as retrieved even if every caller went away
+            task.exception()
+
+    def stats(self):
+        return {
+            "in_flight": len(self._inflight),
+            "flights": self.flights,
+            "coalesced": self.coalesced,
+        }
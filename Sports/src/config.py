@@ -0,0 +1,154 @@
+from pathlib import Path
+import os
+
+
+# Runtime settings are read from environment variables so they can be tuned
+# with `docker run -e NAME=value ...` without touching the code.
+
+
+def _env_str(name: str, default: str) -> str:
+    return os.getenv(name, default)
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Template root (the directory holding main.py)
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+class Settings:
+    def __init__(self):
+        # Debug mode validates every /predict response against its schema
+        self.debug = _env_bool("DEBUG", False)
+        # Response encoder: "auto" (orjson if installed, else pydantic), "orjson", "pydantic" or "json"
+        self.response_serializer = _env_str("RESPONSE_SERIALIZER", "auto")
+
+        # Where the memory-mapped model artifact lives (see src/artifacts.py)
+        self.model_artifact_dir = Path(
+            _env_str("MODEL_ARTIFACT_DIR", str(BASE_DIR / "model_artifact"))
+        )
+        # Versioned model registry in the artifact directory (see src/registry.py)
+        self.model_registry_enabled = _env_bool("MODEL_REGISTRY_ENABLED", True)
+        self.model_registry_cache_size = _env_int("MODEL_REGISTRY_CACHE_SIZE", 3)  # versions kept loaded
+        # Versions kept on disk; the active one, its rollback history and the canary are never removed
+        self.model_registry_max_versions = _env_int("MODEL_REGISTRY_MAX_VERSIONS", 20)
+
+        # Historical data for retrain(): CSV or Parquet files streamed from DATA_DIR (see src/ingest.py)
+        self.data_dir = Path(_env_str("DATA_DIR", str(BASE_DIR / "data")))
+        # Per-file content hashes and summaries, so unchanged files are not read again
+        self.ingest_state_path = Path(
+            _env_str("INGEST_STATE_PATH", str(BASE_DIR / "ingest_state.json"))
+        )
+        self.ingest_chunk_rows = _env_int("INGEST_CHUNK_ROWS", 50_000)
+        self.ingest_workers = _env_int("INGEST_WORKERS", 0)  # 0 = one per CPU
+
+        # Walk-forward backtest run by retrain()'s evaluation stage (see src/backtest.py).
+        # A candidate scoring more than BACKTEST_TOLERANCE below the live model is not swapped in.
+        self.backtest_enabled = _env_bool("BACKTEST_ENABLED", True)
+        self.backtest_window = _env_int("BACKTEST_WINDOW", 64)  # time steps replayed per batch call
+        self.backtest_max_history = _env_int("BACKTEST_MAX_HISTORY", 5_000)  # latest rows per league file
+        self.backtest_tolerance = _env_float("BACKTEST_TOLERANCE", 0.0)
+        self.backtest_workers = _env_int("BACKTEST_WORKERS", 0)  # 0 = one per CPU
+
+        # Where AIModel calls run: "inline", "thread" or "process" (see src/executor.py)
+        self.execution_mode = _env_str("PREDICT_EXECUTION_MODE", "inline")
+        self.execution_workers = _env_int("PREDICT_WORKERS", 0)  # 0 = pool default
+        # Calls allowed to queue or run before /predict answers 503
+        self.execution_max_pending = _env_int("PREDICT_MAX_PENDING", 64)
+        self.execution_retry_after_seconds = _env_int("PREDICT_RETRY_AFTER_SECONDS", 1)
+
+        # Opt-in micro-batching of concurrent /predict calls (see src/batching.py).
+        # Batched rows go straight to the model's batch method, skipping the result cache.
+        self.microbatch_enabled = _env_bool("MICROBATCH_ENABLED", False)
+        self.microbatch_max_wait_ms = _env_float("MICROBATCH_MAX_WAIT_MS", 5.0)
+        self.microbatch_max_batch_size = _env_int("MICROBATCH_MAX_BATCH_SIZE", 64)
+        self.microbatch_max_queue = _env_int("MICROBATCH_MAX_QUEUE", 1024)
+
+        # Identical /predict requests in flight share one model call (see src/coalescing.py)
+        self.coalescing_enabled = _env_bool("PREDICT_COALESCING_ENABLED", True)
+
+        # Admission control: concurrency limits per route group, checked before routing (see src/admission.py)
+        self.admission_enabled = _env_bool("ADMISSION_ENABLED", True)
+        # /predict starts at ADMISSION_PREDICT_LIMIT concurrent requests and adapts
+        # between the min and max to keep its latency under the target
+        self.admission_predict_limit = _env_int("ADMISSION_PREDICT_LIMIT", 32)
+        self.admission_predict_min_limit = _env_int("ADMISSION_PREDICT_MIN_LIMIT", 4)
+        self.admission_predict_max_limit = _env_int("ADMISSION_PREDICT_MAX_LIMIT", 256)
+        self.admission_target_latency_ms = _env_float("ADMISSION_TARGET_LATENCY_MS", 100.0)
+        self.admission_batch_limit = _env_int("ADMISSION_BATCH_LIMIT", 8)  # /predict/slate
+        self.admission_probe_limit = _env_int("ADMISSION_PROBE_LIMIT", 16)  # /health, /ready and /metrics
+        self.admission_default_limit = _env_int("ADMISSION_DEFAULT_LIMIT", 32)  # every other route
+        # Requests allowed to wait per group (beyond: 429), and for how long (then: 503)
+        self.admission_max_queue = _env_int("ADMISSION_MAX_QUEUE", 128)
+        self.admission_queue_timeout_ms = _env_float("ADMISSION_QUEUE_TIMEOUT_MS", 500.0)
+        self.admission_retry_after_seconds = _env_int("ADMISSION_RETRY_AFTER_SECONDS", 1)
+
+        # WebSocket pushes of prediction changes on /subscribe, fed by /odds (see src/subscriptions.py)
+        self.subscriptions_enabled = _env_bool("SUBSCRIPTIONS_ENABLED", True)
+        # Messages a client may fall behind before it is disconnected
+        self.subscription_queue_size = _env_int("SUBSCRIPTION_QUEUE_SIZE", 256)
+        self.subscription_max_fixtures = _env_int("SUBSCRIPTION_MAX_FIXTURES", 500)  # per connection
+
+        # Prediction result cache (see src/cache.py)
+        self.cache_enabled = _env_bool("PREDICTION_CACHE_ENABLED", True)
+        self.cache_ttl_seconds = _env_float("PREDICTION_CACHE_TTL_SECONDS", 60.0)
+        self.cache_max_entries = _env_int("PREDICTION_CACHE_MAX_ENTRIES", 10_000)
+        self.cache_max_bytes = _env_int("PREDICTION_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+        # Relative tolerance (0.001 = 0.1%) within which prices share a cache entry
+        self.cache_price_tolerance = _env_float("PREDICTION_CACHE_PRICE_TOLERANCE", 0.0)
+
+        # Team ratings fed by /results (see src/ratings.py), saved as one binary snapshot
+        self.ratings_enabled = _env_bool("RATINGS_ENABLED", True)
+        self.ratings_snapshot_path = Path(
+            _env_str("RATINGS_SNAPSHOT_PATH", str(BASE_DIR / "ratings" / "ratings.bin"))
+        )
+        # Rating points added to the home side when predicting and updating
+        self.ratings_home_advantage = _env_float("RATINGS_HOME_ADVANTAGE", 60.0)
+
+        # Per-bookmaker odds behind the *_best_bet_odds (see src/odds_book.py)
+        self.odds_book_enabled = _env_bool("ODDS_BOOK_ENABLED", True)
+        # Initial room for fixtures and bookmakers; both double when full
+        self.odds_book_capacity = _env_int("ODDS_BOOK_CAPACITY", 256)
+        self.odds_book_bookmaker_capacity = _env_int("ODDS_BOOK_BOOKMAKER_CAPACITY", 64)
+
+        # Monte Carlo score simulation for the over/under and spread picks (see src/simulation.py)
+        self.simulation_enabled = _env_bool("SIMULATION_ENABLED", True)
+        self.simulation_runs = _env_int("SIMULATION_RUNS", 100_000)  # simulated matches per fixture
+        self.simulation_seed = _env_int("SIMULATION_SEED", 42)  # -1 = different draws on every call
+
+        # Logging (see src/logging_setup.py)
+        self.log_level = _env_str("LOG_LEVEL", "INFO")
+        self.log_format = _env_str("LOG_FORMAT", "json")  # "json" or "text"
+        # Log the request body of one in every N /predict calls (0 = never)
+        self.log_payload_sample_rate = _env_int("LOG_PAYLOAD_SAMPLE_RATE", 100)
+
+        # Per-request profiling, triggered by an `X-Profile: cpu|memory` header (see src/profiling.py)
+        self.profiling_enabled = _env_bool("PROFILING_ENABLED", False)
+        self.profiling_dir = Path(_env_str("PROFILING_DIR", str(BASE_DIR / "profiles")))
+        self.profiling_retention = _env_int("PROFILING_RETENTION", 20)
+
+        # Startup (see src/startup.py). The model loads after the port is bound and
+        # /ready answers 503 until WARMUP_REQUESTS synthetic predictions have run.
+        self.warmup_requests = _env_int("WARMUP_REQUESTS", 8)  # 0 = no warmup
+        self.startup_retry_after_seconds = _env_int("STARTUP_RETRY_AFTER_SECONDS", 2)
+
+        # /documentation (see src/documentation.py)
+        self.documentation_max_age = _env_int("DOCUMENTATION_MAX_AGE_SECONDS", 60)
+
+
+settings = Settings()
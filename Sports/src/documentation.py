@@ -0,0 +1,68 @@
+from pathlib import Path
+from typing import Tuple
+import threading
+import hashlib
+import json
+import os
+import time
+
+
+# documentation.json lives next to main.py, independent of the working directory
+DEFAULT_DOCUMENTATION_PATH = Path(__file__).resolve().parent.parent / "documentation.json"
+
+
+class DocumentationStore:
+    """
+    Keeps documentation.json in memory as pre-serialized bytes with an ETag.
+    The file is only re-read when its mtime changes, and the mtime is checked
+    at most once every `check_interval` seconds.
+    """
+
+    def __init__(self, path=DEFAULT_DOCUMENTATION_PATH, check_interval: float = 1.0):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self.body = b""
+        self.etag = ""
+        self._mtime_ns = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self):
+        mtime_ns = os.stat(self.path).st_mtime_ns
+        with open(self.path, "r") as file:
+            documentation = json.load(file)
+
+        body = json.dumps(documentation, separators=(",", ":")).encode("utf-8")
+        with self._lock:
+            self.body = body
+            self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+            self._mtime_ns = mtime_ns
+            self._checked_at = time.monotonic()
+
+    def current(self) -> Tuple[bytes, str]:
+        """
+        Returns the serialized document and its ETag, reloading it first if the
+        file changed on disk.
+        """
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            try:
+                if os.stat(self.path).st_mtime_ns != self._mtime_ns:
+                    self.reload()
+            except (OSError, ValueError):
+                # Keep serving the last good copy if the file is missing or mid-write
+                pass
+        return self.body, self.etag
+
+    @staticmethod
+    def matches(if_none_match: str, etag: str) -> bool:
+        """
+        Checks an If-None-Match header value against the current ETag.
+        """
+        for candidate in if_none_match.split(","):
+            candidate = candidate.strip()
+            if candidate == "*" or candidate.removeprefix("W/") == etag:
+                return True
+        return False
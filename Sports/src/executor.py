@@ -0,0 +1,152 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Optional, Tuple
+import multiprocessing
+import contextvars
+import functools
+import asyncio
+import logging
+import time
+
+from src.metrics import MODEL_PREDICT_SECONDS
+
+
+logger = logging.getLogger(__name__)
+
+EXECUTION_MODES = ("inline", "thread", "process")
+
+# The AIModel owned by a process-pool child, loaded once by _init_child
+_child_model = None
+
+
+def _init_child():
+    global _child_model
+    from src.config import settings
+    from src.logging_setup import configure_logging
+    from src.models import AIModel
+
+    configure_logging(level=settings.log_level, fmt=settings.log_format)
+    _child_model = AIModel()
+
+
+def _call_child_model(method: str, *args) -> Tuple[Any, float]:
+    # A child's own metrics never reach /metrics, so the call's duration is
+    # sent back with the result and recorded by the parent
+    start = time.perf_counter()
+    result = getattr(_child_model, method)(*args)
+    return result, time.perf_counter() - start
+
+
+class ExecutorSaturated(Exception):
+    """
+    Raised when the executor already has `max_pending` calls queued or running.
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__("Prediction capacity exhausted, retry later.")
+        self.retry_after = retry_after
+
+
+class PredictionExecutor:
+    """
+    Runs AIModel calls for the request handlers in one of three modes:
+
+    * inline:  on the event loop, as before (cheapest for trivial models)
+    * thread:  in a thread pool, for models that release the GIL (NumPy, ...)
+    * process: in a process pool where every child loads its own AIModel once
+
+    At most `max_pending` calls may be queued or running at a time; beyond that
+    run() raises ExecutorSaturated so the API can answer 503 straight away
+    instead of letting latency grow without bound.
+    """
+
+    def __init__(
+        self,
+        ai_model,
+        mode: str = "inline",
+        workers: Optional[int] = None,
+        max_pending: int = 64,
+        retry_after: int = 1,
+    ):
+        if mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode {mode!r}, expected one of {EXECUTION_MODES}")
+        self.ai_model = ai_model
+        self.mode = mode
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        # Only touched from the event loop thread, so no lock is needed
+        self.pending = 0
+        self.rejected = 0
+        self._pool = self._create_pool()
+
+    @classmethod
+    def from_settings(cls, ai_model, settings) -> "PredictionExecutor":
+        return cls(
+            ai_model,
+            mode=settings.execution_mode,
+            workers=settings.execution_workers or None,
+            max_pending=settings.execution_max_pending,
+            retry_after=settings.execution_retry_after_seconds,
+        )
+
+    def _create_pool(self):
+        if self.mode == "thread":
+            return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="predict")
+        if self.mode == "process":
+            # spawn keeps children clear of the parent's threads and locks
+            return ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_child,
+            )
+        return None
+
+    async def run(self, method: str, *args) -> Any:
+        """
+        Calls `AIModel.<method>(*args)` according to the execution mode.
+        """
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise ExecutorSaturated(self.retry_after)
+
+        self.pending += 1
+        try:
+            if self.mode == "inline":
+                return getattr(self.ai_model, method)(*args)
+
+            loop = asyncio.get_running_loop()
+            if self.mode == "thread":
+                # Carry the request context (e.g. the request ID for logs) along
+                context = contextvars.copy_context()
+                call = functools.partial(context.run, getattr(self.ai_model, method), *args)
+                return await loop.run_in_executor(self._pool, call)
+
+            result, elapsed = await loop.run_in_executor(self._pool, _call_child_model, method, *args)
+            MODEL_PREDICT_SECONDS.labels(method).observe(elapsed)
+            return result
+        finally:
+            self.pending -= 1
+
+    def refresh(self):
+        """
+        Called after the model in this process was swapped. Process-pool
+        children hold their own copy, so they are replaced by fresh ones that
+        load the newly saved artifact; calls already running finish on the old pool.
+        """
+        if self.mode == "process":
+            old_pool = self._pool
+            self._pool = self._create_pool()
+            old_pool.shutdown(wait=False)
+            logger.info("Process pool recycled to pick up the new model")
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
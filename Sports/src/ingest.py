@@ -0,0 +1,293 @@
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+import multiprocessing
+import functools
+import hashlib
+import logging
+import json
+import csv
+import os
+
+from src.lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+
+
+logger = logging.getLogger(__name__)
+
+DATA_SUFFIXES = (".csv", ".parquet")
+# Bump when the state file or the summaries in it change shape, so older
+# state is dropped and every file is summarized again (2: goal totals)
+STATE_FORMAT_VERSION = 2
+_HASH_BLOCK = 1024 * 1024
+
+# A chunk is a dict of equally long column arrays
+Chunk = Dict[str, "np.ndarray"]
+
+
+def file_digest(path) -> str:
+    """
+    SHA-256 of a file, read in fixed-size blocks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(_HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def parse_chunks(path, columns: Sequence[str], chunk_rows: int) -> Iterator[Dict[str, list]]:
+    """
+    Parse stage: yields `columns` of at most `chunk_rows` rows at a time.
+    """
+    path = Path(path)
+    if path.suffix == ".parquet":
+        # Imported here, so pyarrow only loads when there are Parquet files to read
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:  # pyarrow is optional, only needed for .parquet files
+            raise RuntimeError(f"Reading {path.name} needs pyarrow, which is not installed")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=list(columns)):
+            yield batch.to_pydict()
+        return
+
+    with open(path, "r", newline="") as file:
+        reader = csv.reader(file)
+        header = next(reader, None)
+        if header is None:
+            return
+        missing = [column for column in columns if column not in header]
+        if missing:
+            raise ValueError(f"{path.name} is missing columns {missing}")
+        indexes = [header.index(column) for column in columns]
+
+        rows = []
+        for row in reader:
+            rows.append(row)
+            if len(rows) == chunk_rows:
+                yield _columns_from_rows(rows, columns, indexes)
+                rows = []
+        if rows:
+            yield _columns_from_rows(rows, columns, indexes)
+
+
+def _columns_from_rows(rows, columns, indexes) -> Dict[str, list]:
+    return {
+        column: [row[index] if index < len(row) else "" for row in rows]
+        for column, index in zip(columns, indexes)
+    }
+
+
+def clean_chunks(
+    chunks: Iterator[Dict[str, list]],
+    numeric_columns: Sequence[str],
+    text_columns: Sequence[str],
+) -> Iterator[Chunk]:
+    """
+    Clean stage: converts numeric columns to float64 and drops rows with a
+    missing or non-finite number or an empty text field.
+    """
+    for chunk in chunks:
+        keep = None
+        cleaned = {}
+        for column in numeric_columns:
+            values = _to_float(chunk[column])
+            valid = np.isfinite(values)
+            keep = valid if keep is None else keep & valid
+            cleaned[column] = values
+        for column in text_columns:
+            values = np.array([str(value).strip() if value is not None else "" for value in chunk[column]])
+            valid = values != ""
+            keep = valid if keep is None else keep & valid
+            cleaned[column] = values
+
+        if keep is not None and not keep.all():
+            cleaned = {column: values[keep] for column, values in cleaned.items()}
+        if cleaned and len(next(iter(cleaned.values()))):
+            yield cleaned
+
+
+def _to_float(values: list) -> "np.ndarray":
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        # Only pay for the per-value path when a chunk has bad entries
+        converted = np.empty(len(values), dtype=np.float64)
+        for index, value in enumerate(values):
+            try:
+                converted[index] = float(value)
+            except (TypeError, ValueError):
+                converted[index] = np.nan
+        return converted
+
+
+def _process_file(
+    path: str,
+    numeric_columns: Sequence[str],
+    text_columns: Sequence[str],
+    summarize: Callable[[Iterator[Chunk]], Dict[str, Any]],
+    chunk_rows: int,
+) -> Dict[str, Any]:
+    # Runs in a worker process: the whole parse -> clean -> feature pipeline of one file
+    columns = list(text_columns) + list(numeric_columns)
+    chunks = clean_chunks(parse_chunks(path, columns, chunk_rows), numeric_columns, text_columns)
+    return summarize(chunks)
+
+
+class DataIngest:
+    """
+    Streams historical data files (CSV, or Parquet with pyarrow installed)
+    from `directory` through a parse -> clean -> feature generator pipeline.
+
+    Files are read `chunk_rows` rows at a time, so memory use depends on the
+    chunk size, not on the file size. `summarize` is the feature stage: it
+    consumes the cleaned chunks of one file and returns a small JSON-able
+    summary (sums, counts, ...). It must be a module-level function so it can
+    run in worker processes. Independent files are processed in parallel.
+
+    Summaries are kept in a state file next to each file's content hash, so
+    files that haven't changed since the last run are not read again.
+    """
+
+    def __init__(
+        self,
+        directory,
+        state_path,
+        numeric_columns: Sequence[str],
+        text_columns: Sequence[str],
+        summarize: Callable[[Iterator[Chunk]], Dict[str, Any]],
+        chunk_rows: int = 50_000,
+        workers: Optional[int] = None,
+    ):
+        self.directory = Path(directory)
+        self.state_path = Path(state_path)
+        self.numeric_columns = tuple(numeric_columns)
+        self.text_columns = tuple(text_columns)
+        self.summarize = summarize
+        self.chunk_rows = chunk_rows
+        self.workers = workers
+        # Summaries from another feature function can't be reused
+        self._pipeline_id = ":".join(
+            [
+                f"{summarize.__module__}.{summarize.__qualname__}",
+                ",".join(self.text_columns),
+                ",".join(self.numeric_columns),
+            ]
+        )
+
+    @classmethod
+    def from_settings(cls, settings, numeric_columns, text_columns, summarize) -> Optional["DataIngest"]:
+        if not settings.data_dir.is_dir():
+            return None
+        return cls(
+            settings.data_dir,
+            settings.ingest_state_path,
+            numeric_columns,
+            text_columns,
+            summarize,
+            chunk_rows=settings.ingest_chunk_rows,
+            workers=settings.ingest_workers or None,
+        )
+
+    def scan(self) -> List[Dict[str, Any]]:
+        """
+        Lists the data files and tells which ones changed since the last run.
+        Unchanged files carry their stored summary. A file is only hashed
+        when its size or modification time differs from the stored entry.
+        """
+        state = self._load_state()
+        files = []
+        for path in sorted(self.directory.rglob("*")):
+            if path.suffix not in DATA_SUFFIXES or not path.is_file():
+                continue
+            key = path.relative_to(self.directory).as_posix()
+            stat = path.stat()
+            entry = state.get(key)
+            if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                sha256 = entry["sha256"]
+            else:
+                sha256 = file_digest(path)
+            unchanged = entry is not None and entry["sha256"] == sha256
+            files.append(
+                {
+                    "key": key,
+                    "path": str(path),
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "sha256": sha256,
+                    "summary": entry["summary"] if unchanged else None,
+                }
+            )
+        return files
+
+    def run(self, files: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """
+        Processes the changed files from `files` (default: a fresh scan()),
+        records their summaries and returns the summaries of all files.
+        """
+        if files is None:
+            files = self.scan()
+        pending = [file for file in files if file["summary"] is None]
+        logger.info(
+            "Ingesting %d of %d data files (%d unchanged)",
+            len(pending),
+            len(files),
+            len(files) - len(pending),
+        )
+
+        process = functools.partial(
+            _process_file,
+            numeric_columns=self.numeric_columns,
+            text_columns=self.text_columns,
+            summarize=self.summarize,
+            chunk_rows=self.chunk_rows,
+        )
+        paths = [file["path"] for file in pending]
+        if len(pending) > 1 and self.workers != 1:
+            # spawn keeps children clear of the parent's threads and locks
+            with ProcessPoolExecutor(
+                max_workers=min(len(pending), self.workers or os.cpu_count() or 1),
+                mp_context=multiprocessing.get_context("spawn"),
+            ) as pool:
+                summaries = list(pool.map(process, paths))
+        else:
+            summaries = [process(path) for path in paths]
+
+        for file, summary in zip(pending, summaries):
+            file["summary"] = summary
+        self._save_state(files)
+        return [file["summary"] for file in files]
+
+    def _load_state(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_path, "r") as file:
+                state = json.load(file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable ingest state %s: %s", self.state_path, e)
+            return {}
+        if state.get("format_version") != STATE_FORMAT_VERSION or state.get("pipeline") != self._pipeline_id:
+            return {}
+        return state.get("files", {})
+
+    def _save_state(self, files: List[Dict[str, Any]]):
+        state = {
+            "format_version": STATE_FORMAT_VERSION,
+            "pipeline": self._pipeline_id,
+            "files": {
+                file["key"]: {
+                    "size": file["size"],
+                    "mtime_ns": file["mtime_ns"],
+                    "sha256": file["sha256"],
+                    "summary": file["summary"],
+                }
+                for file in files
+            },
+        }
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_name(f".{self.state_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as file:
+            json.dump(state, file)
+        os.replace(tmp_path, self.state_path)
@@ -0,0 +1,360 @@
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import threading
+import bisect
+import time
+
+
+# Metrics in the Prometheus text exposition format.
+#
+# Recording is lock-free on the hot path: every thread that records a value
+# gets its own shard (a plain list) the first time it touches a metric, and
+# afterwards only ever writes to that shard. Shards are summed when /metrics
+# is scraped. The only lock is taken once per (thread, metric) to register the
+# shard, and on scrape.
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+STAGE_BUCKETS = (0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Shards:
+    """
+    Per-thread value slots that are summed on read.
+    """
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._shards: List[List[float]] = []
+        self._lock = threading.Lock()
+
+    def get(self) -> List[float]:
+        shard = getattr(self._local, "values", None)
+        if shard is None:
+            shard = [0.0] * self._size
+            with self._lock:
+                self._shards.append(shard)
+            self._local.values = shard
+        return shard
+
+    def total(self) -> List[float]:
+        with self._lock:
+            shards = list(self._shards)
+        totals = [0.0] * self._size
+        for shard in shards:
+            for i, value in enumerate(shard):
+                totals[i] += value
+        return totals
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], "_Metric"] = {}
+        self._children_lock = threading.Lock()
+
+    def labels(self, *values: str, **kwargs: str):
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._children_lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._new_child()
+                    self._children[key] = child
+        return child
+
+    def clear(self):
+        """
+        Drops all labelled children, e.g. to retire an old model version label.
+        """
+        with self._children_lock:
+            self._children = {}
+
+    def _new_child(self) -> "_Metric":
+        raise NotImplementedError
+
+    def _series(self):
+        if self.labelnames:
+            with self._children_lock:
+                return list(self._children.items())
+        return [((), self)]
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for label_values, child in self._series():
+            lines.extend(child._render_samples(self.name, self.labelnames, label_values))
+        return lines
+
+    def _render_samples(self, name, labelnames, label_values) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._shards = _Shards(1)
+
+    def _new_child(self) -> "Counter":
+        return Counter(self.name, self.documentation)
+
+    def inc(self, amount: float = 1.0):
+        self._shards.get()[0] += amount
+
+    @property
+    def value(self) -> float:
+        return self._shards.total()[0]
+
+    def _render_samples(self, name, labelnames, label_values):
+        return [f"{name}{_format_labels(labelnames, label_values)} {_format_value(self.value)}"]
+
+
+class Gauge(_Metric):
+    """
+    A gauge is either driven with inc()/dec(), set() directly, or computed on
+    scrape from a callback registered with set_function().
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._shards = _Shards(1)
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def _new_child(self) -> "Gauge":
+        return Gauge(self.name, self.documentation)
+
+    def inc(self, amount: float = 1.0):
+        self._shards.get()[0] += amount
+
+    def dec(self, amount: float = 1.0):
+        self._shards.get()[0] -= amount
+
+    def set(self, value: float):
+        self._value = float(value)
+
+    def set_function(self, function: Callable[[], float]):
+        self._function = function
+
+    @property
+    def value(self) -> float:
+        if self._function is not None:
+            return float(self._function())
+        return self._value + self._shards.total()[0]
+
+    def _render_samples(self, name, labelnames, label_values):
+        return [f"{name}{_format_labels(labelnames, label_values)} {_format_value(self.value)}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # One slot per bucket, one for +Inf, one for the running sum
+        self._shards = _Shards(len(self.buckets) + 2)
+
+    def _new_child(self) -> "Histogram":
+        return Histogram(self.name, self.documentation, buckets=self.buckets)
+
+    def observe(self, value: float):
+        shard = self._shards.get()
+        shard[bisect.bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    def time(self):
+        return _Timer(self)
+
+    def snapshot(self) -> Dict[str, float]:
+        totals = self._shards.total()
+        return {"count": sum(totals[:-1]), "sum": totals[-1]}
+
+    def _render_samples(self, name, labelnames, label_values):
+        totals = self._shards.total()
+        lines = []
+        cumulative = 0.0
+        for upper, count in zip(self.buckets + (float("inf"),), totals[:-1]):
+            cumulative += count
+            le = 'le="' + _format_value(upper) + '"'
+            lines.append(
+                f"{name}_bucket{_format_labels(labelnames, label_values, le)} {_format_value(cumulative)}"
+            )
+        labels = _format_labels(labelnames, label_values)
+        lines.append(f"{name}_sum{labels} {_format_value(totals[-1])}")
+        lines.append(f"{name}_count{labels} {_format_value(cumulative)}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.observe(time.perf_counter() - self._start)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.register(
+    Counter("http_requests_total", "HTTP requests by route, method and status.", ("route", "method", "status"))
+)
+HTTP_LATENCY = REGISTRY.register(
+    Histogram("http_request_duration_seconds", "HTTP request latency by route.", ("route", "method"))
+)
+HTTP_IN_FLIGHT = REGISTRY.register(
+    Gauge("http_requests_in_flight", "HTTP requests currently being handled.")
+)
+MODEL_PREDICT_SECONDS = REGISTRY.register(
+    Histogram("model_predict_duration_seconds", "Time spent inside AIModel prediction calls.", ("method",))
+)
+MODEL_LOAD_SECONDS = REGISTRY.register(
+    Histogram("model_load_duration_seconds", "Time spent in AIModel._load_model.", buckets=STAGE_BUCKETS)
+)
+RETRAIN_STAGE_SECONDS = REGISTRY.register(
+    Histogram("model_retrain_stage_duration_seconds", "Duration of each retrain() stage.", ("stage",), STAGE_BUCKETS)
+)
+MICROBATCH_SIZE = REGISTRY.register(
+    Histogram("microbatch_size", "Rows per dispatched micro-batch.", buckets=SIZE_BUCKETS)
+)
+MICROBATCH_QUEUE_DELAY = REGISTRY.register(
+    Histogram("microbatch_queue_delay_seconds", "Time a request waited before its micro-batch was dispatched.")
+)
+COALESCED_REQUESTS = REGISTRY.register(
+    Counter("predict_coalesced_requests_total", "/predict requests answered by an identical request already in flight.")
+)
+ADMISSION_REQUESTS = REGISTRY.register(
+    Counter("admission_requests_total", "Requests admitted, queued or shed by admission control.", ("group", "outcome"))
+)
+ADMISSION_LIMIT = REGISTRY.register(
+    Gauge("admission_concurrency_limit", "Current concurrency limit of each admission control group.", ("group",))
+)
+MODEL_INFO = REGISTRY.register(
+    Gauge("model_info", "Currently loaded model version (always 1).", ("version",))
+)
+MODEL_VERSION_PREDICTIONS = REGISTRY.register(
+    Counter("model_version_predictions_total", "/predict calls served by each model version while a canary is set.", ("version",))
+)
+MODEL_LAST_TRAINED = REGISTRY.register(
+    Gauge("model_last_trained_timestamp_seconds", "Unix time the loaded model was trained.")
+)
+STARTUP_PHASE_SECONDS = REGISTRY.register(
+    Gauge("startup_phase_seconds", "Duration of each startup phase of the API.", ("phase",))
+)
+APP_READY = REGISTRY.register(
+    Gauge("app_ready", "1 once the model is loaded and warmed up, 0 before.")
+)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording request counts, latency and in-flight
+    requests. Requests are labelled with the matched route template (e.g.
+    /retrain/{job_id}) so label cardinality stays bounded. Requests shed by
+    AdmissionMiddleware never reach routing and are labelled with their
+    admission group (e.g. predict) instead.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths: Dict[object, str] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status_code[0] = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec()
+            route = self._route_for(scope)
+            method = scope["method"]
+            HTTP_LATENCY.labels(route, method).observe(elapsed)
+            HTTP_REQUESTS.labels(route, method, str(status_code[0])).inc()
+
+    def _route_for(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return scope.get("admission_group", "unmatched")
+        path = self._route_paths.get(endpoint)
+        if path is None:
+            path = "unmatched"
+            for route in getattr(scope.get("app"), "routes", ()):
+                if getattr(route, "endpoint", None) is endpoint:
+                    path = route.path
+                    break
+            self._route_paths[endpoint] = path
+        return path
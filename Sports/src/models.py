@@ -1,84 +1,451 @@
 import time
-import random
-from typing import Dict, Any
+from typing import Callable, Dict, Any, List, Optional, Tuple
 import datetime
+import hashlib
 import logging
 
+from src.artifacts import artifact_exists, load_artifact, write_artifact
+from src.backtest import Backtester
+from src.cache import PredictionCache, bucket
+from src.config import settings
+from src.coalescing import request_key
+from src.ingest import DataIngest
+from src.lazy_imports import lazy_import
+from src.odds_book import MARKET_NAMES, OddsBook, best_of, book_prices, fair_probabilities
+from src.ratings import RatingTable
+from src.registry import ModelRegistry
+from src.simulation import HANDICAP_LINES, OVER_UNDER_LINES, MatchSimulator, line_index
+from src.metrics import MODEL_LOAD_SECONDS, MODEL_PREDICT_SECONDS, RETRAIN_STAGE_SECONDS
+
+# NumPy is only imported for real during the startup "imports" phase
+np = lazy_import("numpy")
+
 
-# Configure Logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Columns read from the match history files in DATA_DIR (see src/ingest.py)
+MATCH_TEXT_COLUMNS = ("home_team", "away_team")
+MATCH_NUMERIC_COLUMNS = ("home_goals", "away_goals")
+# Mean home goals, away goals and shared (correlated) goals per match, used
+# by the score simulation until a retrain learns them from history
+DEFAULT_GOAL_RATES = (1.45, 1.15, 0.1)
+
+
+def fixture_draws(keys: List[str], count: int) -> "np.ndarray":
+    """
+    `count` uniform draws in [0, 1) per key, shaped (count, len(keys)).
+    The same key always gets the same draws (splitmix64 over a hash of the
+    key), so the placeholder parts of a prediction only change when the
+    fixture or the model does.
+    """
+    seeds = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little") for key in keys),
+        dtype=np.uint64,
+        count=len(keys),
+    )
+    z = seeds[None, :] + np.arange(1, count + 1, dtype=np.uint64)[:, None] * np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    z ^= z >> np.uint64(31)
+    return (z >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def summarize_match_history(chunks) -> Dict[str, Any]:
+    """
+    Feature stage of the ingest pipeline for one match history file.
+    Counts how often each outcome the API predicts happened, and the goals scored.
+    """
+    counts = dict.fromkeys(
+        ["matches", "home_wins", "away_wins", "over_2_5", "over_3_5", "home_cover_1_5", "away_cover_0_5"], 0
+    )
+    counts.update(home_goals=0.0, away_goals=0.0)
+    for chunk in chunks:
+        margin = chunk["home_goals"] - chunk["away_goals"]
+        total = chunk["home_goals"] + chunk["away_goals"]
+        counts["matches"] += len(margin)
+        counts["home_wins"] += int((margin > 0).sum())
+        counts["away_wins"] += int((margin < 0).sum())
+        counts["over_2_5"] += int((total > 2.5).sum())
+        counts["over_3_5"] += int((total > 3.5).sum())
+        counts["home_cover_1_5"] += int((margin > 1.5).sum())
+        counts["away_cover_0_5"] += int((margin < 0.5).sum())
+        counts["home_goals"] += float(chunk["home_goals"].sum())
+        counts["away_goals"] += float(chunk["away_goals"].sum())
+    return counts
+
 
 class AIModel:
     def __init__(self):
         self.model = None
         self.last_trained_at = None
+        self.cache = PredictionCache.from_settings(settings)
+        # Team ratings fed by /results (see src/ratings.py)
+        self.ratings = RatingTable.from_settings(settings)
+        # Score simulation behind the over/under and spread picks (see src/simulation.py)
+        self.simulator = MatchSimulator.from_settings(settings)
+        # Every bookmaker's prices per fixture (see src/odds_book.py)
+        self.odds_book = OddsBook.from_settings(settings)
+        # Versions on disk, activation and rollback (see src/registry.py)
+        self.registry = ModelRegistry.from_settings(settings, self._read_artifact, self._save_artifact)
         self._load_model()  # Attempt to load an initial model
 
+    @classmethod
+    def for_backtest(cls, model: Dict[str, Any]) -> "AIModel":
+        """
+        An AIModel serving `model` as it is, without the result cache, with
+        an empty in-memory rating table and no odds book, so a backtest only
+        measures the model itself.
+        """
+        evaluator = cls.__new__(cls)
+        evaluator.model = model
+        evaluator.last_trained_at = model.get("trained_at")
+        evaluator.cache = None
+        evaluator.registry = None
+        evaluator.ratings = (
+            RatingTable(None, home_advantage=settings.ratings_home_advantage) if settings.ratings_enabled else None
+        )
+        evaluator.simulator = MatchSimulator.from_settings(settings)
+        evaluator.odds_book = None
+        return evaluator
+
     def _load_model(self):
         """
         Placeholder for loading a pre-trained model from disk or a cloud storage.
         This would load your actual ML model artifact.
         """
 
-        logger.info("INFO: Attempting to load AI model...")
-        self.model = {"status": "dummy_model_loaded", "version": "1.0"}
-        self.last_trained_at = str(datetime.datetime.now()).split(".")[
-            0
-        ]  # Store current time as last trained time
+        logger.info("Attempting to load AI model...")
+        with MODEL_LOAD_SECONDS.time():
+            registry = self.registry
+            model = registry.load_active() if registry is not None else None
+            if model is None:
+                if artifact_exists(settings.model_artifact_dir):
+                    model = self._read_artifact(settings.model_artifact_dir)
+                else:
+                    # No saved artifact yet, start from the placeholder model
+                    model = self._build_model(version="1.0")
+                if registry is not None:
+                    # An empty registry starts out with this model as its first version
+                    model = registry.activate(registry.register(model))
+            self.model = model
+        self.last_trained_at = self.model.get("trained_at") or str(
+            datetime.datetime.now()
+        ).split(".")[0]  # Store current time as last trained time
         logger.info(
-            f"INFO: AI model loaded. Status: {self.model['status']}, Version: {self.model['version']}"
+            "AI model loaded. Status: %s, Version: %s",
+            self.model["status"],
+            self.model["version"],
         )
 
+    def _build_model(self, version: str, summaries: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Builds a complete model object without touching the live one.
+        Replace the body with your training code. NumPy arrays in the returned
+        dict are saved as the artifact's weights, everything else as metadata.
+        `summaries` are the per-file results of summarize_match_history, or
+        None when there is no data in DATA_DIR.
+        """
+        confidence_high = 99.0
+        goal_rates = np.array(DEFAULT_GOAL_RATES)
+        status = "dummy_model_loaded"
+        matches = sum(summary["matches"] for summary in summaries or ())
+        if matches:
+            keys = set().union(*summaries)
+            totals = {key: sum(summary.get(key, 0) for summary in summaries) for key in keys}
+            # No pick should be more confident than the most frequent historical outcome
+            rates = [
+                max(totals["home_wins"], totals["away_wins"]) / matches,
+                max(totals["over_2_5"], matches - totals["over_2_5"]) / matches,
+                max(totals["home_cover_1_5"], totals["away_cover_0_5"]) / matches,
+            ]
+            confidence_high = float(np.clip(round(100.0 * max(rates), 1), 50.0, 99.0))
+            if totals.get("home_goals") or totals.get("away_goals"):
+                # Average goals per side, keeping the default share of correlated goals
+                goal_rates[:2] = np.maximum(
+                    np.array([totals["home_goals"], totals["away_goals"]]) / matches - goal_rates[2], 0.05
+                )
+            status = "trained_on_history"
+        return {
+            "status": status,
+            "version": version,
+            # Range the dummy confidences are drawn from
+            "confidence_bounds": np.array([50.0, confidence_high]),
+            # Range of the dummy odds for the winner, over/under and spread markets
+            "odds_bounds": np.array([[1.5, 3.0], [1.6, 2.2], [1.7, 2.5]]),
+            # Home, away and shared goal rates of the score simulation
+            "goal_rates": goal_rates,
+        }
+
+    def _read_artifact(self, directory) -> Dict[str, Any]:
+        """
+        Opens a saved model artifact. The weight arrays are read-only views
+        into a memory map shared with every other worker process.
+        """
+        metadata, arrays = load_artifact(directory)
+        return {**metadata, **arrays}
+
+    def _save_artifact(self, model: Dict[str, Any], directory):
+        arrays = {key: value for key, value in model.items() if isinstance(value, np.ndarray)}
+        metadata = {key: value for key, value in model.items() if key not in arrays}
+        write_artifact(directory, metadata, arrays)
+
+    def _next_version(self) -> str:
+        versions = [self.model["version"]]
+        if self.registry is not None:
+            # Counts from the newest registered version, so labels stay unique after a rollback
+            versions += [entry["version"] for entry in self.registry.versions()]
+        major, minor = max(
+            (int(major), int(minor or 0))
+            for major, _, minor in (str(version).partition(".") for version in versions)
+            if major.isdigit() and (minor or "0").isdigit()
+        )
+        return f"{major}.{minor + 1}"
+
+    def activate(self, version_id: str) -> Dict[str, Any]:
+        """
+        Serves a registered version from now on. A version that is still
+        loaded (warm) is swapped in without touching the disk.
+        """
+        warm = self.registry.is_warm(version_id)
+        self._swap(self.registry.activate(version_id))
+        return {"version_id": version_id, "version": self.model["version"], "warm": warm}
+
+    def rollback(self) -> Dict[str, Any]:
+        """
+        Goes back to the version that was active before the current one.
+        """
+        self._swap(self.registry.rollback())
+        return {"version_id": self.model["version_id"], "version": self.model["version"], "warm": True}
+
+    def _swap(self, model: Dict[str, Any]):
+        self.model = model
+        self.last_trained_at = model.get("trained_at") or self.last_trained_at
+        logger.info("Now serving model version %s (%s)", model["version"], model["version_id"])
+
     def predict(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Placeholder for making predictions using the loaded AI model.
         This will contain your actual prediction logic.
         """
 
-        logger.info(f"INFO: Making prediction with data: {data}")
-        home_team = data.get("home_team", "Home Team")
-        away_team = data.get("away_team", "Away Team")
+        logger.debug("Making prediction with data: %s", data)
+
+        with MODEL_PREDICT_SECONDS.labels("predict").time():
+            # The key carries the model version, so a finished retrain
+            # automatically stops serving results from the previous model
+            model = self.model if self.registry is None else self.registry.route(self.model)
+            book = self.odds_book
+            cache_key = None
+            if self.cache is not None:
+                cache_key = (
+                    model.get("version_id", model["version"]),
+                    data["home_team"],
+                    data["away_team"],
+                    bucket(data["home_team_odds_avg"], settings.cache_price_tolerance),
+                    bucket(data["away_team_odds_avg"], settings.cache_price_tolerance),
+                    # New results move the ratings, and so the winner confidence
+                    self.ratings.results_applied if self.ratings is not None else 0,
+                    # Bookmakers moving their lines change the best odds
+                    book.version(data["home_team"], data["away_team"]) if book is not None else 0,
+                    request_key(data.get("odds_book")),
+                )
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    return cached
 
-        winner_options = [home_team, away_team]
-        over_under_options = [
-            "Over 2.5",
-            "Under 2.5",
-            "Over 3.5",
-            "Under 3.5",
-            None,
-        ]  # Spread can be null
-        spread_options = [f"{home_team} -1.5", f"{away_team} +0.5", None]
+            result = self._predict_many([data], model)[0]
+            if cache_key is not None:
+                self.cache.put(cache_key, result)
+            return result
+
+    def predict_many(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Scores a whole slate of fixtures at once.
+        Every market is drawn for all fixtures in one array operation; only
+        building the response dicts loops over the fixtures.
+        """
+        with MODEL_PREDICT_SECONDS.labels("predict_many").time():
+            return self._predict_many(data)
+
+    def predict_routed(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Predictions for rows that arrived as separate /predict calls (the
+        micro-batcher's batches). Like predict(), each row goes to the active
+        model or the canary; the rows of each model then run as one batch.
+        """
+        with MODEL_PREDICT_SECONDS.labels("predict_routed").time():
+            if self.registry is None:
+                return self._predict_many(data)
+            active = self.model
+            groups: Dict[str, Tuple[Dict[str, Any], List[int]]] = {}
+            for index in range(len(data)):
+                model = self.registry.route(active)
+                groups.setdefault(model.get("version_id", model["version"]), (model, []))[1].append(index)
+            results: List[Optional[Dict[str, Any]]] = [None] * len(data)
+            for model, indices in groups.values():
+                for index, result in zip(indices, self._predict_many([data[index] for index in indices], model)):
+                    results[index] = result
+            return results
+
+    def _predict_many(self, data: List[Dict[str, Any]], model: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        logger.debug("Making slate prediction for %d fixtures", len(data))
+        n = len(data)
+        if n == 0:
+            return []
+
+        # Grab the model once so a concurrent retrain can't swap it mid-slate
+        model = model or self.model
+        confidence_low, confidence_high = model["confidence_bounds"]
+        odds_bounds = model["odds_bounds"]
+        home_teams = [row.get("home_team", "Home Team") for row in data]
+        away_teams = [row.get("away_team", "Away Team") for row in data]
+        # Placeholder draws fixed per model version and fixture, so predicting
+        # a fixture again (e.g. for /subscribe) only changes what really moved
+        version = model.get("version_id", model["version"])
+        draws = fixture_draws([f"{version}|{home}|{away}" for home, away in zip(home_teams, away_teams)], 9)
+        book = self.odds_book
+        if book is not None:
+            best_prices, implied_home_win = self._market_odds(book, data, home_teams, away_teams)
+
+        # Option indexes; -1 stands for "no prediction" (null in the response)
+        over_under_options = ["Over 2.5", "Under 2.5", "Over 3.5", "Under 3.5"]
+        if self.ratings is not None:
+            # Winner and its confidence come from the team ratings
+            home_win = self.ratings.home_win_probability(home_teams, away_teams)
+            winner_pick = (home_win < 0.5).astype(np.int64)  # 0 = home, 1 = away
+            rated_confidence = np.round(100.0 * np.maximum(home_win, 1.0 - home_win), 1)
+        else:
+            winner_pick = (draws[0] < 0.5).astype(np.int64)  # 0 = home, 1 = away
+        over_under_pick = (draws[1] * (len(over_under_options) + 1)).astype(np.int64)
+        over_under_pick[over_under_pick == len(over_under_options)] = -1
+        spread_pick = (draws[2] * 3).astype(np.int64)  # 0 = home -1.5, 1 = away +0.5
+        spread_pick[spread_pick == 2] = -1
 
         # Generate dummy predictions
-        winner = random.choice(winner_options)
-        winner_confidence = round(random.uniform(50, 99), 1) if winner else None
-        winner_odds = round(random.uniform(1.5, 3.0), 2) if winner else None
+        confidences = np.round(confidence_low + draws[3:6] * (confidence_high - confidence_low), 1)
+        odds = np.round(odds_bounds[:, :1] + draws[6:9] * (odds_bounds[:, 1:] - odds_bounds[:, :1]), 2)
+        if self.ratings is not None:
+            confidences[0] = rated_confidence
+        if self.simulator is not None:
+            # Over/under and spread picks are the most likely option in the simulated scores
+            if self.ratings is None:
+                # Without ratings, the team strengths come from the average odds
+                home_odds = np.array([row["home_team_odds_avg"] for row in data], dtype=np.float64)
+                away_odds = np.array([row["away_team_odds_avg"] for row in data], dtype=np.float64)
+                home_win = (1.0 / home_odds) / (1.0 / home_odds + 1.0 / away_odds)
+                if book is not None:
+                    # or, where bookmakers priced the fixture, their margin-free consensus
+                    home_win = np.where(np.isnan(implied_home_win), home_win, implied_home_win)
+            simulated = self._simulate(model, home_win)
+            over_under_pick = simulated[0].argmax(axis=1)
+            spread_pick = simulated[1].argmax(axis=1)
+            confidences[1] = np.round(100.0 * simulated[0].max(axis=1), 1)
+            confidences[2] = np.round(100.0 * simulated[1].max(axis=1), 1)
+        if book is not None:
+            odds = self._best_odds(best_prices, odds, winner_pick, over_under_pick, spread_pick)
+        winner_confidence, over_under_confidence, spread_confidence = confidences.tolist()
+        winner_odds, over_under_odds, spread_odds = odds.tolist()
 
-        over_under = random.choice(over_under_options)
-        over_under_confidence = round(random.uniform(50, 99), 1) if over_under else None
-        over_under_odds = round(random.uniform(1.6, 2.2), 2) if over_under else None
+        winner_pick = winner_pick.tolist()
+        over_under_pick = over_under_pick.tolist()
+        spread_pick = spread_pick.tolist()
 
-        spread = random.choice(spread_options)
-        spread_confidence = round(random.uniform(50, 99), 1) if spread else None
-        spread_odds = round(random.uniform(1.7, 2.5), 2) if spread else None
-        if spread is None:
-            spread_odds = None
+        results = []
+        for i in range(n):
+            home_team, away_team = home_teams[i], away_teams[i]
+            over_under = (
+                over_under_options[over_under_pick[i]] if over_under_pick[i] >= 0 else None
+            )
+            if spread_pick[i] == 0:
+                spread = f"{home_team} -1.5"
+            elif spread_pick[i] == 1:
+                spread = f"{away_team} +0.5"
+            else:
+                spread = None
 
-        return {
-            "winner": winner,
-            "winner_confidence_pct": winner_confidence,
-            "winner_best_bet_odds": winner_odds,
-            "over_under": over_under,
-            "over_under_confidence_pct": over_under_confidence,
-            "over_under_best_bet_odds": over_under_odds,
-            "spread": spread,
-            "spread_confidence_pct": spread_confidence,
-            "spread_best_bet_odds": spread_odds,  # This can be null as per spec
-        }
+            results.append(
+                {
+                    "winner": away_team if winner_pick[i] else home_team,
+                    "winner_confidence_pct": winner_confidence[i],
+                    "winner_best_bet_odds": winner_odds[i],
+                    "over_under": over_under,
+                    "over_under_confidence_pct": over_under_confidence[i] if over_under else None,
+                    "over_under_best_bet_odds": over_under_odds[i] if over_under else None,
+                    "spread": spread,
+                    "spread_confidence_pct": spread_confidence[i] if spread else None,
+                    "spread_best_bet_odds": spread_odds[i] if spread else None,  # This can be null as per spec
+                }
+            )
+        return results
+
+    def _market_odds(self, book: OddsBook, data, home_teams, away_teams):
+        """
+        Best price of every market and selection, (n, markets, 2), and the
+        margin-free home win probability, (n,), of a slate. A fixture sent
+        with its own odds_book is priced from that book alone; the shared
+        book is only ever written through /odds/book.
+        """
+        fixture_rows = book.lookup(list(zip(home_teams, away_teams)))
+        best = book.best_prices(fixture_rows)
+        implied = book.implied_probabilities(fixture_rows, "winner")
+        winner = MARKET_NAMES.index("winner")
+        for i, row in enumerate(data):
+            if row.get("odds_book"):
+                prices = book_prices(row["odds_book"])
+                best[i] = best_of(prices)
+                implied[i] = fair_probabilities(prices[winner][None])[0]
+        return best, implied[:, 0]
 
-    def retrain(self):
+    def _best_odds(self, best, odds, winner_pick, over_under_pick, spread_pick):
+        """
+        Replaces the drawn odds of the picked options with the best price
+        wherever a bookmaker offers one.
+        """
+        fixtures = np.arange(len(best))
+        # (market, selection) of every option, in the order _predict_many lists them
+        over_under_market = np.array([MARKET_NAMES.index(f"over_under_{line}") for line in (2.5, 2.5, 3.5, 3.5)])
+        over_under_side = np.array([0, 1, 0, 1])  # over, under
+        spread_market = np.array([MARKET_NAMES.index("spread_-1.5"), MARKET_NAMES.index("spread_-0.5")])
+        spread_side = np.array([0, 1])  # home -1.5, away +0.5
+        over_under = np.maximum(over_under_pick, 0)
+        spread = np.maximum(spread_pick, 0)
+        booked = np.stack(
+            [
+                best[fixtures, MARKET_NAMES.index("winner"), winner_pick],
+                best[fixtures, over_under_market[over_under], over_under_side[over_under]],
+                best[fixtures, spread_market[spread], spread_side[spread]],
+            ]
+        )
+        return np.where(np.isnan(booked), odds, booked)
+
+    def _simulate(self, model: Dict[str, Any], home_win: "np.ndarray"):
+        """
+        Simulates the scores of a slate. Returns the probabilities of the
+        over/under options, (n, 4), and of the spread options, (n, 2),
+        in the order _predict_many lists them.
+        """
+        # Stronger home sides score more and concede less; at even strength
+        # the model's base goal rates apply. Replace with your own goal model.
+        home_rate, away_rate, shared_rate = model.get("goal_rates", DEFAULT_GOAL_RATES)
+        strength = np.sqrt(np.clip(home_win, 0.02, 0.98) / np.clip(1.0 - home_win, 0.02, 0.98))
+        simulated = self.simulator.simulate(home_rate * strength, away_rate / strength, shared_rate)
+
+        over = simulated["over"]
+        over_2_5 = over[:, line_index(OVER_UNDER_LINES, 2.5)]
+        over_3_5 = over[:, line_index(OVER_UNDER_LINES, 3.5)]
+        over_under = np.stack([over_2_5, 1.0 - over_2_5, over_3_5, 1.0 - over_3_5], axis=1)
+
+        home_cover = simulated["home_cover"]
+        spread = np.stack(
+            [
+                home_cover[:, line_index(HANDICAP_LINES, -1.5)],  # home -1.5
+                1.0 - home_cover[:, line_index(HANDICAP_LINES, -0.5)],  # away +0.5
+            ],
+            axis=1,
+        )
+        return over_under, spread
+
+    def retrain(self, progress: Optional[Callable[[str], None]] = None):
         """
         Placeholder for the AI model retraining logic.
         This would involve:
@@ -88,41 +455,116 @@ class AIModel:
         4. Evaluating the model.
         5. Saving the new model artifact.
         6. Updating the loaded model in memory (or triggering a reload).
+
+        `progress` is called with the name of each stage as it starts.
+        The new model is built next to the live one and swapped in with a
+        single assignment, so concurrent predictions never see a partial model.
         """
-        logger.info("INFO: Starting AI model retraining process...")
+
+        current = {"stage": None, "started": 0.0}
+
+        def enter(stage: Optional[str]):
+            # Closes the timing of the previous stage and starts the next one
+            now = time.perf_counter()
+            if current["stage"] is not None:
+                RETRAIN_STAGE_SECONDS.labels(current["stage"]).observe(now - current["started"])
+            current["stage"], current["started"] = stage, now
+            if stage is not None and progress is not None:
+                progress(stage)
+
+        logger.info("Starting AI model retraining process...")
         try:
-            # Simulate data sourcing
-            logger.info("INFO: Sourcing historical or new data...")
-            time.sleep(2)  # Simulate network/DB call
+            # Find the history files in DATA_DIR that changed since the last run
+            enter("sourcing")
+            ingest = DataIngest.from_settings(
+                settings, MATCH_NUMERIC_COLUMNS, MATCH_TEXT_COLUMNS, summarize_match_history
+            )
+            if ingest is not None:
+                logger.info("Sourcing historical data from %s...", settings.data_dir)
+                data_files = ingest.scan()
+            else:
+                logger.info("Sourcing historical or new data...")
+                time.sleep(2)  # Simulate network/DB call
 
-            # Simulate data preprocessing
-            logger.info("INFO: Preprocessing data...")
-            time.sleep(1)
+            # Stream the changed files through parse -> clean -> feature
+            enter("preprocessing")
+            logger.info("Preprocessing data...")
+            if ingest is not None:
+                summaries = ingest.run(data_files)
+            else:
+                summaries = None
+                time.sleep(1)
 
             # Simulate model training
-            logger.info("INFO: Training new model version...")
+            enter("training")
+            logger.info("Training new model version...")
             time.sleep(5)  # This could be a long-running process
+            candidate = self._build_model(version=self._next_version(), summaries=summaries)
 
-            # Simulate model evaluation (e.g., checking performance metrics)
-            logger.info("INFO: Evaluating new model...")
-            time.sleep(1)
+            # Replay the history through both models; keep the live one if its picks win more often
+            enter("evaluation")
+            backtester = Backtester.from_settings(settings)
+            if backtester is not None:
+                logger.info("Backtesting new model against version %s...", self.model["version"])
+                scores = backtester.evaluate({"live": self.model, "candidate": candidate})
+            else:
+                logger.info("Evaluating new model...")
+                scores = {}
+                time.sleep(1)
+            if scores and scores["candidate"]["score"] < scores["live"]["score"] - settings.backtest_tolerance:
+                enter(None)
+                logger.warning(
+                    "Keeping version %s: candidate %s scored %.4f in the backtest against %.4f",
+                    self.model["version"],
+                    candidate["version"],
+                    scores["candidate"]["score"],
+                    scores["live"]["score"],
+                )
+                candidate_id = None
+                if self.registry is not None:
+                    # Kept as an inactive version, e.g. to try it as a canary
+                    candidate["trained_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+                    candidate_id = self.registry.register(candidate)
+                return {
+                    "status": "rejected",
+                    "message": f"Candidate scored below the live model in the backtest, keeping version {self.model['version']}.",
+                    "version": self.model["version"],
+                    "candidate_version_id": candidate_id,
+                    "backtest": scores,
+                }
 
-            # Simulate saving the new model artifact
-            logger.info("INFO: Saving new model artifact...")
-            # In a real scenario, you'd save to a persistent volume, cloud storage (GCS, S3), etc.
-            time.sleep(0.5)
+            # Save the new model artifact and reopen it memory-mapped
+            enter("saving")
+            logger.info("Saving new model artifact...")
+            # In a real scenario you may also push it to a persistent volume, cloud storage (GCS, S3), etc.
+            candidate["trained_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+            if self.registry is not None:
+                candidate = self.registry.load(self.registry.register(candidate))
+            else:
+                self._save_artifact(candidate, settings.model_artifact_dir)
+                candidate = self._read_artifact(settings.model_artifact_dir)
 
-            # Update the in-memory model (or trigger a reload mechanism)
-            self._load_model()  # Reloads the dummy model for this example
+            # Swap the fully built model in; readers hold on to whichever
+            # reference they grabbed before this line.
+            enter("swapping")
+            if self.registry is not None:
+                self.registry.activate(candidate["version_id"])
+            self.model = candidate
             self.last_trained_at = time.time()
+            enter(None)
             logger.info(
-                f"INFO: AI model retraining complete. New model loaded at {time.ctime(self.last_trained_at)}"
+                "AI model retraining complete. Version %s loaded at %s",
+                candidate["version"],
+                time.ctime(self.last_trained_at),
             )
             return {
                 "status": "success",
                 "message": "Model retrained and loaded successfully.",
+                "version": candidate["version"],
+                "version_id": candidate.get("version_id"),
                 "last_trained_at": time.ctime(self.last_trained_at),
+                "backtest": scores or None,
             }
         except Exception as e:
-            logger.error(f"ERROR: Model retraining failed: {e}")
+            logger.error("Model retraining failed: %s", e)
             return {"status": "error", "message": f"Model retraining failed: {str(e)}"}
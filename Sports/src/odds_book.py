@@ -0,0 +1,276 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import threading
+import logging
+import math
+
+from src.lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+
+
+logger = logging.getLogger(__name__)
+
+# Two-way markets: name -> (first selection, second selection). The spread
+# markets are handicaps on the home side, e.g. "spread_-1.5" is home -1.5
+# against away +1.5.
+MARKETS = {
+    "winner": ("home", "away"),
+    "over_under_2.5": ("over", "under"),
+    "over_under_3.5": ("over", "under"),
+    "spread_-1.5": ("home", "away"),
+    "spread_-0.5": ("home", "away"),
+}
+MARKET_NAMES = tuple(MARKETS)
+
+FixtureKey = Tuple[str, str]
+
+
+def validate_book(book: Dict[str, Dict[str, Dict[str, float]]]):
+    """
+    Checks an odds book (bookmaker -> market -> selection -> decimal price).
+    Raises ValueError on unknown markets or selections and prices that
+    aren't finite and above 1.
+    """
+    for bookmaker, markets in book.items():
+        for market, prices in markets.items():
+            validate_prices(market, prices, bookmaker)
+
+
+def validate_prices(market: str, prices: Dict[str, float], bookmaker: str = ""):
+    if market not in MARKETS:
+        raise ValueError(f"Unknown market {market!r}, expected one of {MARKET_NAMES}")
+    for selection, price in prices.items():
+        if selection not in MARKETS[market]:
+            raise ValueError(f"Unknown selection {selection!r} of {market}, expected one of {MARKETS[market]}")
+        if not (price > 1.0 and math.isfinite(price)):
+            raise ValueError(f"{bookmaker} {market} {selection}: decimal odds must be finite and above 1, got {price}")
+
+
+def book_prices(book: Dict[str, Dict[str, Dict[str, float]]]) -> "np.ndarray":
+    """
+    The prices of an odds book as sent with a request, shaped (markets,
+    bookmakers, 2) like one fixture of OddsBook.prices, NaN where missing.
+    """
+    prices = np.full((len(MARKETS), max(len(book), 1), 2), np.nan)
+    for column, markets in enumerate(book.values()):
+        for market, selection_prices in markets.items():
+            market_index = MARKET_NAMES.index(market)
+            for side, selection in enumerate(MARKETS[market]):
+                if selection in selection_prices:
+                    prices[market_index, column, side] = selection_prices[selection]
+    return prices
+
+
+def best_of(prices: "np.ndarray") -> "np.ndarray":
+    """
+    Highest price across bookmakers (axis -2), NaN where nobody prices a selection.
+    """
+    priced = ~np.isnan(prices).all(axis=-2)
+    return np.where(priced, np.where(np.isnan(prices), -np.inf, prices).max(axis=-2), np.nan)
+
+
+def fair_probabilities(prices: "np.ndarray") -> "np.ndarray":
+    """
+    Margin-free probabilities of both selections of a two-way market from
+    prices shaped (n, bookmakers, 2), as (n, 2): each bookmaker's implied
+    probabilities (1 / price) are divided by their sum (the overround), then
+    averaged over the bookmakers pricing both selections. NaN where none does.
+    """
+    implied = 1.0 / prices
+    fair = implied / implied.sum(axis=2, keepdims=True)  # NaN unless both sides are priced
+    complete = ~np.isnan(fair[:, :, 0])
+    counts = complete.sum(axis=1)
+    totals = np.where(complete[:, :, None], fair, 0.0).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        probabilities = totals / counts[:, None]
+    probabilities[counts == 0] = np.nan
+    return probabilities
+
+
+class OddsBook:
+    """
+    Decimal odds of every bookmaker for every fixture and market, kept in
+    NumPy arrays for vectorised reads.
+
+    Fixtures and bookmakers are interned to integer IDs. `prices` has the
+    shape (fixtures, markets, bookmakers, 2), NaN where a bookmaker has no
+    price. Alongside it, `best` and `best_bookmaker` (fixtures, markets, 2)
+    hold the highest price of each selection and who offers it, so reading
+    a best price is O(1). A single bookmaker moving a line updates that
+    index in O(1) too, unless the move takes the best price away, in which
+    case only that one selection is rescanned across bookmakers.
+
+    Implied probabilities remove each bookmaker's overround (margin) by
+    normalising its implied probabilities to sum to 1, then average across
+    bookmakers, for whole slates at once. Fixture rows freed by remove()
+    are reused.
+    """
+
+    def __init__(self, fixture_capacity: int = 256, bookmaker_capacity: int = 64):
+        self._lock = threading.Lock()
+        self._fixtures: Dict[FixtureKey, int] = {}
+        self._free_rows: List[int] = []
+        self.bookmakers: List[str] = []
+        self._bookmaker_ids: Dict[str, int] = {}
+        self._allocate(fixture_capacity, bookmaker_capacity)
+        self.updates = 0
+
+    @classmethod
+    def from_settings(cls, settings) -> Optional["OddsBook"]:
+        if not settings.odds_book_enabled:
+            return None
+        return cls(
+            fixture_capacity=settings.odds_book_capacity,
+            bookmaker_capacity=settings.odds_book_bookmaker_capacity,
+        )
+
+    def _allocate(self, fixtures: int, bookmakers: int, keep: Optional[Tuple[int, int]] = None):
+        prices = np.full((fixtures, len(MARKETS), bookmakers, 2), np.nan)
+        best = np.full((fixtures, len(MARKETS), 2), np.nan)
+        best_bookmaker = np.full((fixtures, len(MARKETS), 2), -1, dtype=np.int32)
+        versions = np.zeros(fixtures, dtype=np.int64)
+        if keep is not None:
+            # Growing: copy the old content into the corner of the new arrays
+            old_fixtures, old_bookmakers = keep
+            prices[:old_fixtures, :, :old_bookmakers] = self.prices
+            best[:old_fixtures] = self.best
+            best_bookmaker[:old_fixtures] = self.best_bookmaker
+            versions[:old_fixtures] = self.versions
+        # Assigned last, so lock-free readers always see a consistent set
+        self.prices, self.best, self.best_bookmaker, self.versions = prices, best, best_bookmaker, versions
+
+    def _fixture_row(self, key: FixtureKey) -> int:
+        row = self._fixtures.get(key)
+        if row is not None:
+            return row
+        if self._free_rows:
+            row = self._free_rows.pop()
+        else:
+            row = len(self._fixtures)
+            capacity, bookmakers = self.prices.shape[0], self.prices.shape[2]
+            if row == capacity:
+                self._allocate(capacity * 2, bookmakers, keep=(capacity, bookmakers))
+        self._fixtures[key] = row
+        return row
+
+    def _bookmaker_column(self, name: str) -> int:
+        column = self._bookmaker_ids.get(name)
+        if column is not None:
+            return column
+        column = len(self.bookmakers)
+        fixtures, capacity = self.prices.shape[0], self.prices.shape[2]
+        if column == capacity:
+            self._allocate(fixtures, capacity * 2, keep=(fixtures, capacity))
+        self.bookmakers.append(name)
+        self._bookmaker_ids[name] = column
+        return column
+
+    def update(self, home_team: str, away_team: str, bookmaker: str, market: str, prices: Dict[str, float]):
+        """
+        Moves one bookmaker's line: sets its prices for the given selections
+        of `market` and keeps the best-price index current.
+        """
+        market_index = MARKET_NAMES.index(market)
+        with self._lock:
+            row = self._fixture_row((home_team, away_team))
+            column = self._bookmaker_column(bookmaker)
+            for side, selection in enumerate(MARKETS[market]):
+                if selection not in prices:
+                    continue
+                price = prices[selection]
+                self.prices[row, market_index, column, side] = price
+                best = self.best[row, market_index, side]
+                if not price < best:  # also true while there is no best price (NaN)
+                    self.best[row, market_index, side] = price
+                    self.best_bookmaker[row, market_index, side] = column
+                elif self.best_bookmaker[row, market_index, side] == column:
+                    # The best bookmaker shortened its price: rescan this selection
+                    candidates = self.prices[row, market_index, :, side]
+                    best_column = int(np.nanargmax(candidates))
+                    self.best[row, market_index, side] = candidates[best_column]
+                    self.best_bookmaker[row, market_index, side] = best_column
+            self.versions[row] += 1
+            self.updates += 1
+
+    def remove(self, home_team: str, away_team: str):
+        """
+        Drops a fixture (e.g. once it's played) and frees its row.
+        """
+        with self._lock:
+            row = self._fixtures.pop((home_team, away_team), None)
+            if row is None:
+                return
+            self.prices[row] = np.nan
+            self.best[row] = np.nan
+            self.best_bookmaker[row] = -1
+            self.versions[row] += 1
+            self._free_rows.append(row)
+
+    def lookup(self, keys: Sequence[FixtureKey]) -> "np.ndarray":
+        """
+        Fixture rows for `keys`, -1 for fixtures without odds.
+        """
+        fixtures = self._fixtures
+        return np.fromiter((fixtures.get(key, -1) for key in keys), dtype=np.int64, count=len(keys))
+
+    def version(self, home_team: str, away_team: str) -> int:
+        row = self._fixtures.get((home_team, away_team))
+        return 0 if row is None else int(self.versions[row])
+
+    def best_prices(self, rows: "np.ndarray") -> "np.ndarray":
+        """
+        Best price of every market and selection, (len(rows), markets, 2),
+        NaN for unknown fixtures (row -1) and unpriced selections.
+        """
+        best = self.best[rows]
+        best[rows < 0] = np.nan
+        return best
+
+    def best_price(self, home_team: str, away_team: str, market: str, selection: str) -> Tuple[Optional[float], Optional[str]]:
+        """
+        Best price of one selection and the bookmaker offering it.
+        """
+        row = self._fixtures.get((home_team, away_team))
+        if row is None:
+            return None, None
+        market_index = MARKET_NAMES.index(market)
+        side = MARKETS[market].index(selection)
+        column = int(self.best_bookmaker[row, market_index, side])
+        if column < 0:
+            return None, None
+        return float(self.best[row, market_index, side]), self.bookmakers[column]
+
+    def implied_probabilities(self, rows: "np.ndarray", market: str) -> "np.ndarray":
+        """
+        Margin-free probabilities of both selections of `market`, (len(rows), 2),
+        see fair_probabilities(). NaN for unknown fixtures (row -1).
+        """
+        probabilities = fair_probabilities(self.prices[np.maximum(rows, 0), MARKET_NAMES.index(market)])
+        probabilities[rows < 0] = np.nan
+        return probabilities
+
+    def describe(self, home_team: str, away_team: str) -> Optional[Dict[str, Any]]:
+        row = self._fixtures.get((home_team, away_team))
+        if row is None:
+            return None
+        rows = np.array([row])
+        markets = {}
+        for market_index, (market, selections) in enumerate(MARKETS.items()):
+            fair = self.implied_probabilities(rows, market)[0]
+            columns = self.best_bookmaker[row, market_index]
+            markets[market] = {
+                selection: {
+                    "best_price": None if columns[side] < 0 else float(self.best[row, market_index, side]),
+                    "bookmaker": None if columns[side] < 0 else self.bookmakers[columns[side]],
+                    "probability": None if np.isnan(fair[side]) else round(float(fair[side]), 4),
+                }
+                for side, selection in enumerate(selections)
+            }
+        return {"home_team": home_team, "away_team": away_team, "markets": markets}
+
+    def stats(self):
+        return {
+            "fixtures": len(self._fixtures),
+            "bookmakers": len(self.bookmakers),
+            "updates": self.updates,
+        }
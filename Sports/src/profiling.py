@@ -0,0 +1,145 @@
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+import threading
+import tracemalloc
+import cProfile
+import logging
+import pstats
+import time
+import io
+
+from src.logging_setup import request_id_var
+
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ("cpu", "memory")
+
+
+class RequestProfiler:
+    """
+    Opt-in profiling of single requests.
+
+    When enabled, a request carrying `X-Profile: cpu` or `X-Profile: memory`
+    gets cProfile stats or a tracemalloc allocation snapshot captured around
+    its AIModel call. Reports are written to `directory` and only the newest
+    `retention` are kept. Requests without the header only pay for a header
+    lookup, and nothing at all while profiling is disabled.
+    """
+
+    def __init__(self, enabled: bool, directory, retention: int = 20, top: int = 40):
+        self.enabled = enabled
+        self.directory = Path(directory)
+        self.retention = retention
+        self.top = top
+        # cProfile and tracemalloc are process-wide, so one capture at a time
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings) -> "RequestProfiler":
+        return cls(
+            enabled=settings.profiling_enabled,
+            directory=settings.profiling_dir,
+            retention=settings.profiling_retention,
+        )
+
+    def requested_mode(self, headers) -> Optional[str]:
+        """
+        Returns the profiling mode asked for by the request, if any.
+        """
+        if not self.enabled:
+            return None
+        mode = headers.get("x-profile")
+        if not mode:
+            return None
+        mode = mode.strip().lower()
+        return mode if mode in PROFILE_MODES else "cpu"
+
+    @contextmanager
+    def profile(self, mode: str, label: str):
+        """
+        Profiles the enclosed block and yields a dict that holds the report
+        path once the block has finished. If another capture is running the
+        block just runs unprofiled.
+        """
+        report = {"path": None}
+        if not self._lock.acquire(blocking=False):
+            yield report
+            return
+
+        try:
+            if mode == "memory":
+                with self._memory(label, report):
+                    yield report
+            else:
+                with self._cpu(label, report):
+                    yield report
+        finally:
+            self._lock.release()
+
+    @contextmanager
+    def _cpu(self, label: str, report: dict):
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            stem = self._stem(label, "cpu")
+            profiler.dump_stats(str(stem.with_suffix(".prof")))
+            summary = io.StringIO()
+            summary.write(f"{label}: {elapsed_ms:.3f} ms wall time\n\n")
+            pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(self.top)
+            report["path"] = self._write(stem.with_suffix(".txt"), summary.getvalue())
+
+    @contextmanager
+    def _memory(self, label: str, report: dict):
+        already_tracing = tracemalloc.is_tracing()
+        if not already_tracing:
+            tracemalloc.start(25)
+        before = tracemalloc.take_snapshot()
+        try:
+            yield
+        finally:
+            after = tracemalloc.take_snapshot()
+            ignore = (tracemalloc.Filter(False, tracemalloc.__file__),)
+            before, after = before.filter_traces(ignore), after.filter_traces(ignore)
+            current, peak = tracemalloc.get_traced_memory()
+            if not already_tracing:
+                tracemalloc.stop()
+
+            lines = [f"{label}: traced memory current={current} B peak={peak} B", ""]
+            for stat in after.compare_to(before, "lineno")[: self.top]:
+                lines.append(str(stat))
+            report["path"] = self._write(
+                self._stem(label, "memory").with_suffix(".txt"), "\n".join(lines) + "\n"
+            )
+
+    def _stem(self, label: str, mode: str) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        request_id = request_id_var.get() or "no-request-id"
+        stamp = time.strftime("%Y%m%dT%H%M%S")
+        return self.directory / f"{stamp}-{label}-{mode}-{request_id}"
+
+    def _write(self, path: Path, text: str) -> str:
+        path.write_text(text)
+        self._enforce_retention()
+        logger.info("Profile report written to %s", path)
+        return path.name
+
+    def _enforce_retention(self):
+        reports = {}
+        for path in self.directory.iterdir():
+            if path.suffix in (".txt", ".prof"):
+                reports.setdefault(path.stem, []).append(path)
+        stems = sorted(reports, key=lambda stem: max(p.stat().st_mtime for p in reports[stem]))
+        for stem in stems[: max(0, len(stems) - self.retention)]:
+            for path in reports[stem]:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
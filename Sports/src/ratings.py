@@ -0,0 +1,307 @@
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+import threading
+import logging
+import struct
+import json
+import math
+import time
+import os
+
+from src.lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+
+
+logger = logging.getLogger(__name__)
+
+# Snapshot file layout: MAGIC, a little-endian u64 header length, the JSON
+# header (team names, array layout, counters), then the raw arrays.
+MAGIC = b"RATINGS1"
+ALIGNMENT = 64
+
+INITIAL_RATING = 1500.0
+INITIAL_DEVIATION = 350.0
+MIN_DEVIATION = 30.0
+# Rating deviation regained per day without a match (Glicko's c)
+DEVIATION_GROWTH_PER_DAY = 5.0
+# Weight of the latest match in the recent-form averages
+FORM_ALPHA = 0.2
+
+_Q = math.log(10) / 400.0
+
+# Per-team arrays: name -> dtype
+ARRAYS = {
+    "rating": "<f8",
+    "deviation": "<f8",
+    "games": "<i4",
+    "form_points": "<f8",  # moving average of 1 / 0.5 / 0 per win / draw / loss
+    "form_goal_diff": "<f8",  # moving average of the goal difference
+    "last_played": "<f8",  # unix time of the latest match
+}
+
+
+def _g(deviation):
+    # Glicko's attenuation of rating differences by uncertainty
+    return 1.0 / np.sqrt(1.0 + 3.0 * _Q * _Q * np.square(deviation) / (math.pi * math.pi))
+
+
+class RatingTable:
+    """
+    Glicko-style team ratings kept in NumPy arrays.
+
+    Team names are interned to integer IDs that index one array per statistic
+    (see ARRAYS), so the table stays compact and lookups are O(1). Every
+    match result updates both teams in O(1): ratings move by the Glicko-1
+    rule, the rating deviation shrinks with each match and grows again with
+    time off, and the recent-form averages are refreshed.
+
+    The table is saved to, and loaded from, a single binary snapshot.
+    Process-pool children reload it when the snapshot changes, checking its
+    mtime at most once every `check_interval` seconds. A table never reloads
+    its own snapshot, nor one written while it holds results it hasn't
+    saved yet, so reloading can't undo recorded results. With `path` None
+    the table only lives in memory (backtests replay history into one).
+    """
+
+    def __init__(self, path, home_advantage: float = 60.0, capacity: int = 256, check_interval: float = 1.0):
+        self.path = Path(path) if path is not None else None
+        self.home_advantage = home_advantage
+        self.check_interval = check_interval
+        self.names: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self.results_applied = 0
+        self._arrays = self._empty_arrays(capacity)
+        self._lock = threading.Lock()
+        # One save at a time, so an older snapshot can't replace a newer one
+        self._save_lock = threading.Lock()
+        self._mtime_ns = None
+        # results_applied as of the last save or load; anything above is unsaved
+        self._saved_results = 0
+        self._checked_at = 0.0
+        if self.path is not None and self.path.is_file():
+            self.load()
+
+    @classmethod
+    def from_settings(cls, settings) -> Optional["RatingTable"]:
+        if not settings.ratings_enabled:
+            return None
+        return cls(settings.ratings_snapshot_path, home_advantage=settings.ratings_home_advantage)
+
+    @staticmethod
+    def _empty_arrays(capacity: int) -> Dict[str, "np.ndarray"]:
+        arrays = {name: np.zeros(capacity, dtype=dtype) for name, dtype in ARRAYS.items()}
+        arrays["rating"][:] = INITIAL_RATING
+        arrays["deviation"][:] = INITIAL_DEVIATION
+        arrays["form_points"][:] = 0.5
+        return arrays
+
+    def team_id(self, name: str) -> int:
+        """
+        Interns `name`, adding the team with default ratings if it is new.
+        """
+        team_id = self._ids.get(name)
+        if team_id is not None:
+            return team_id
+        team_id = len(self.names)
+        capacity = len(self._arrays["rating"])
+        if team_id == capacity:
+            grown = self._empty_arrays(capacity * 2)
+            for key, values in self._arrays.items():
+                grown[key][:capacity] = values
+            self._arrays = grown
+        self.names.append(name)
+        self._ids[name] = team_id
+        return team_id
+
+    def lookup(self, names: Sequence[str]) -> "np.ndarray":
+        """
+        Team IDs for `names`, -1 for teams without any recorded result.
+        """
+        ids = self._ids
+        return np.fromiter((ids.get(name, -1) for name in names), dtype=np.int64, count=len(names))
+
+    def home_win_probability(self, home_teams: Sequence[str], away_teams: Sequence[str]) -> "np.ndarray":
+        """
+        Expected score of the home side for each fixture (a draw counts as
+        half a win), from both ratings, their deviations and home advantage.
+        Unknown teams count as new teams with the initial rating.
+        """
+        self._reload_if_changed()
+        # team_id() and load() swap the arrays, so take them together with the IDs
+        with self._lock:
+            arrays = self._arrays
+            home_ids, away_ids = self.lookup(home_teams), self.lookup(away_teams)
+        home_rating = np.where(home_ids >= 0, arrays["rating"][home_ids], INITIAL_RATING)
+        away_rating = np.where(away_ids >= 0, arrays["rating"][away_ids], INITIAL_RATING)
+        home_deviation = np.where(home_ids >= 0, arrays["deviation"][home_ids], INITIAL_DEVIATION)
+        away_deviation = np.where(away_ids >= 0, arrays["deviation"][away_ids], INITIAL_DEVIATION)
+        spread = _g(np.sqrt(np.square(home_deviation) + np.square(away_deviation)))
+        difference = home_rating + self.home_advantage - away_rating
+        return 1.0 / (1.0 + np.power(10.0, -spread * difference / 400.0))
+
+    def record_result(self, home_team: str, away_team: str, home_goals: int, away_goals: int, played_at: Optional[float] = None):
+        """
+        Updates both teams with one match result.
+        """
+        played_at = time.time() if played_at is None else played_at
+        with self._lock:
+            home, away = self.team_id(home_team), self.team_id(away_team)
+            arrays = self._arrays
+            rating, deviation = arrays["rating"], arrays["deviation"]
+
+            # Uncertainty grows again with the time since each team last played
+            for team in (home, away):
+                if arrays["games"][team]:
+                    idle_days = max(played_at - arrays["last_played"][team], 0.0) / 86400.0
+                    deviation[team] = min(
+                        math.sqrt(deviation[team] ** 2 + DEVIATION_GROWTH_PER_DAY ** 2 * idle_days),
+                        INITIAL_DEVIATION,
+                    )
+
+            home_score = 1.0 if home_goals > away_goals else 0.5 if home_goals == away_goals else 0.0
+            sides = (
+                (home, away, home_score, self.home_advantage, home_goals - away_goals),
+                (away, home, 1.0 - home_score, -self.home_advantage, away_goals - home_goals),
+            )
+            updates = []
+            for team, opponent, score, advantage, goal_diff in sides:
+                g = float(_g(deviation[opponent]))
+                expected = 1.0 / (1.0 + 10.0 ** (-g * (rating[team] + advantage - rating[opponent]) / 400.0))
+                d_squared_inv = _Q * _Q * g * g * expected * (1.0 - expected)
+                precision = 1.0 / deviation[team] ** 2 + d_squared_inv
+                updates.append(
+                    (
+                        team,
+                        rating[team] + _Q / precision * g * (score - expected),
+                        max(math.sqrt(1.0 / precision), MIN_DEVIATION),
+                        score,
+                        goal_diff,
+                    )
+                )
+
+            # Both sides are computed from the pre-match ratings before either is written
+            for team, new_rating, new_deviation, score, goal_diff in updates:
+                rating[team] = new_rating
+                deviation[team] = new_deviation
+                arrays["games"][team] += 1
+                arrays["form_points"][team] += FORM_ALPHA * (score - arrays["form_points"][team])
+                arrays["form_goal_diff"][team] += FORM_ALPHA * (goal_diff - arrays["form_goal_diff"][team])
+                arrays["last_played"][team] = played_at
+            self.results_applied += 1
+
+    def describe(self, name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            team_id = self._ids.get(name)
+            arrays = self._arrays
+        if team_id is None:
+            return None
+        return {
+            "team": name,
+            "rating": round(float(arrays["rating"][team_id]), 2),
+            "rating_deviation": round(float(arrays["deviation"][team_id]), 2),
+            "games": int(arrays["games"][team_id]),
+            "form_points": round(float(arrays["form_points"][team_id]), 4),
+            "form_goal_diff": round(float(arrays["form_goal_diff"][team_id]), 4),
+        }
+
+    def save(self):
+        """
+        Writes the table to its snapshot file, atomically. Safe to call from
+        a worker thread while results keep coming in.
+        """
+        if self.path is None:
+            return
+        with self._save_lock:
+            self._save()
+
+    def _save(self):
+        with self._lock:
+            count = len(self.names)
+            arrays = {key: np.ascontiguousarray(values[:count]) for key, values in self._arrays.items()}
+            layout = {}
+            offset = 0
+            for key, values in arrays.items():
+                layout[key] = {"dtype": values.dtype.str, "offset": offset}
+                offset += -(-values.nbytes // ALIGNMENT) * ALIGNMENT
+            results_applied = self.results_applied
+            header = json.dumps(
+                {
+                    "teams": self.names,
+                    "results_applied": results_applied,
+                    "arrays": layout,
+                }
+            ).encode("utf-8")
+
+            data_start = -(-(len(MAGIC) + 8 + len(header)) // ALIGNMENT) * ALIGNMENT
+            buffer = bytearray(data_start + offset)
+            buffer[: len(MAGIC)] = MAGIC
+            buffer[len(MAGIC) : len(MAGIC) + 8] = struct.pack("<Q", len(header))
+            buffer[len(MAGIC) + 8 : len(MAGIC) + 8 + len(header)] = header
+            for key, values in arrays.items():
+                start = data_start + layout[key]["offset"]
+                buffer[start : start + values.nbytes] = values.tobytes()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as file:
+            file.write(buffer)
+        # Under the lock, so no reload can see the new mtime before it's recorded
+        with self._lock:
+            os.replace(tmp_path, self.path)
+            self._mtime_ns = self.path.stat().st_mtime_ns
+            self._saved_results = results_applied
+
+    def load(self):
+        """
+        Replaces the table with the content of its snapshot file.
+        """
+        with open(self.path, "rb") as file:
+            mtime_ns = os.fstat(file.fileno()).st_mtime_ns
+            data = file.read()
+        if data[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} is not a ratings snapshot")
+        (header_length,) = struct.unpack_from("<Q", data, len(MAGIC))
+        header = json.loads(data[len(MAGIC) + 8 : len(MAGIC) + 8 + header_length])
+        data_start = -(-(len(MAGIC) + 8 + header_length) // ALIGNMENT) * ALIGNMENT
+
+        names = header["teams"]
+        arrays = self._empty_arrays(max(len(names) * 2, 256))
+        for key, spec in header["arrays"].items():
+            if key in arrays:
+                values = np.frombuffer(data, dtype=spec["dtype"], count=len(names), offset=data_start + spec["offset"])
+                arrays[key][: len(names)] = values
+
+        with self._lock:
+            if mtime_ns == self._mtime_ns or self.results_applied != self._saved_results:
+                return  # Our own snapshot, already loaded, or it would drop unsaved results
+            self.names = list(names)
+            self._ids = {name: team_id for team_id, name in enumerate(self.names)}
+            self._arrays = arrays
+            self.results_applied = self._saved_results = header["results_applied"]
+            self._mtime_ns = mtime_ns
+        logger.info("Loaded ratings of %d teams from %s", len(names), self.path)
+
+    def _reload_if_changed(self):
+        if self.path is None:
+            return
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        try:
+            with self._lock:
+                changed = self.path.stat().st_mtime_ns != self._mtime_ns
+                unsaved = self.results_applied != self._saved_results
+            if changed and not unsaved:
+                self.load()
+        except (OSError, ValueError):
+            # Keep the ratings in memory if the snapshot is missing or unreadable
+            pass
+
+    def stats(self):
+        return {
+            "teams": len(self.names),
+            "results_applied": self.results_applied,
+            "snapshot": self.path.name if self.path is not None else None,
+        }
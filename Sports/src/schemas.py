@@ -1,5 +1,7 @@
-from typing import Optional
-from pydantic import BaseModel, Field
+from typing import Dict, Optional
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
+
+from src.odds_book import MARKET_NAMES, validate_book, validate_prices
 
 
 # These schemas are used to ensure the request and response formats for the API endpoints are well-defined.
@@ -11,13 +13,129 @@ class PredictionRequest(BaseModel):
     home_team: str = Field(..., description="Name of the home team")
     away_team: str = Field(..., description="Name of the away team")
     home_team_odds_avg: float = Field(
-        ..., description="Average odds for the home team to win"
+        ..., gt=1, allow_inf_nan=False, description="Average decimal odds for the home team to win"
     )
     away_team_odds_avg: float = Field(
-        ..., description="Average odds for the away team to win"
+        ..., gt=1, allow_inf_nan=False, description="Average decimal odds for the away team to win"
+    )
+    odds_book: Optional[Dict[str, Dict[str, Dict[str, float]]]] = Field(
+        None,
+        description=(
+            "Decimal odds per bookmaker: bookmaker -> market -> selection -> price, "
+            f"with markets {', '.join(MARKET_NAMES)}. The best prices become the *_best_bet_odds."
+        ),
+    )
+
+    @field_validator("odds_book")
+    @classmethod
+    def check_odds_book(cls, value):
+        if value is not None:
+            validate_book(value)
+        return value
+
+    # Shown in the OpenAPI docs and used for the startup warmup calls (see src/startup.py)
+    model_config = ConfigDict(
+        json_schema_extra={
+            "examples": [
+                {
+                    "home_team": "Lions",
+                    "away_team": "Sharks",
+                    "home_team_odds_avg": 1.75,
+                    "away_team_odds_avg": 2.20,
+                },
+                {
+                    "home_team": "Eagles",
+                    "away_team": "Wolves",
+                    "home_team_odds_avg": 2.40,
+                    "away_team_odds_avg": 1.60,
+                },
+            ]
+        }
     )
 
 
+# Request Schema for /results
+class MatchResult(BaseModel):
+    home_team: str = Field(..., description="Name of the home team")
+    away_team: str = Field(..., description="Name of the away team")
+    home_goals: int = Field(..., ge=0, description="Goals scored by the home team")
+    away_goals: int = Field(..., ge=0, description="Goals scored by the away team")
+    played_at: Optional[float] = Field(
+        None, description="Unix time the match was played (defaults to now)"
+    )
+
+
+class TeamRating(BaseModel):
+    team: str = Field(..., description="Name of the team")
+    rating: float = Field(..., description="Current rating")
+    rating_deviation: float = Field(
+        ..., description="Uncertainty of the rating (lower is more certain)"
+    )
+    games: int = Field(..., description="Number of results recorded for the team")
+    form_points: float = Field(
+        ..., description="Recent form: moving average of 1 / 0.5 / 0 per win / draw / loss"
+    )
+    form_goal_diff: float = Field(
+        ..., description="Recent form: moving average of the goal difference"
+    )
+
+
+# Response Schema for /results
+class ResultsResponse(BaseModel):
+    applied: int = Field(..., description="Number of results applied")
+    ratings: list[TeamRating] = Field(
+        ..., description="Updated ratings of the teams involved"
+    )
+
+
+# Response Schema for /odds
+class OddsUpdateResponse(BaseModel):
+    received: int = Field(..., description="Number of odds updates received")
+    recomputed: int = Field(
+        ..., description="Subscribed fixtures whose odds moved and were predicted again"
+    )
+    pushed: int = Field(..., description="Update messages queued for subscribers")
+
+
+# Request Schema for /odds/book
+class BookmakerOdds(BaseModel):
+    home_team: str = Field(..., description="Name of the home team")
+    away_team: str = Field(..., description="Name of the away team")
+    bookmaker: str = Field(..., description="Bookmaker moving its line")
+    market: str = Field(..., description=f"One of {', '.join(MARKET_NAMES)}")
+    prices: Dict[str, float] = Field(
+        ..., description="New decimal odds per selection, e.g. {\"home\": 1.8, \"away\": 2.1}"
+    )
+
+    @model_validator(mode="after")
+    def check_prices(self):
+        validate_prices(self.market, self.prices, self.bookmaker)
+        return self
+
+
+class SelectionOdds(BaseModel):
+    best_price: Optional[float] = Field(None, description="Best decimal odds on the book")
+    bookmaker: Optional[str] = Field(None, description="Bookmaker offering the best odds")
+    probability: Optional[float] = Field(
+        None, description="Implied probability with the bookmakers' margin removed"
+    )
+
+
+class FixtureOdds(BaseModel):
+    home_team: str = Field(..., description="Name of the home team")
+    away_team: str = Field(..., description="Name of the away team")
+    markets: Dict[str, Dict[str, SelectionOdds]] = Field(
+        ..., description="Best odds and implied probability of every selection, per market"
+    )
+
+
+# Response Schema for /odds/book
+class OddsBookResponse(BaseModel):
+    applied: int = Field(..., description="Number of bookmaker lines applied")
+    pushed: int = Field(..., description="Update messages queued for subscribers")
+    fixtures: list[FixtureOdds] = Field(..., description="Odds of the fixtures involved")
+
+
 # Response Schema for /predict
 class PredictionResponse(BaseModel):
     winner: Optional[str] = Field(
@@ -57,3 +175,30 @@ class PredictionResponse(BaseModel):
     spread_best_bet_odds: Optional[float] = Field(
         None, description="Best available odds for the spread bet (can be null)"
     )
+
+
+# Response Schema for /models
+class ModelVersion(BaseModel):
+    version_id: str = Field(..., description="Content hash identifying the version")
+    version: Optional[str] = Field(None, description="Version label, e.g. 1.3")
+    status: Optional[str] = Field(None, description="Status the model was saved with")
+    trained_at: Optional[str] = Field(None, description="When the version was trained")
+    registered_at: float = Field(..., description="Unix time the version was registered")
+    active: bool = Field(..., description="Whether the version serves /predict")
+    canary_percent: Optional[float] = Field(
+        None, description="Share of /predict calls the version serves as a canary"
+    )
+    warm: bool = Field(..., description="Whether the version is loaded in memory")
+
+
+# Response Schema for /models/{version_id}/activate and /models/rollback
+class ActivationResponse(BaseModel):
+    version_id: str = Field(..., description="Content hash of the version now active")
+    version: str = Field(..., description="Version label of the version now active")
+    warm: bool = Field(..., description="Whether it was swapped in without loading from disk")
+
+
+# Request and response Schema for /models/canary
+class Canary(BaseModel):
+    version_id: str = Field(..., description="Version to route part of the /predict calls to")
+    percent: float = Field(..., gt=0, le=100, description="Share of /predict calls it serves")
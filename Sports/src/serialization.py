@@ -0,0 +1,288 @@
+from typing import Any, List, Optional, Tuple, Type
+from array import array
+import math
+import sys
+import json
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, TypeAdapter
+import pydantic_core
+
+try:
+    import orjson
+except ImportError:  # orjson is optional
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional, only needed for application/msgpack
+    msgpack = None
+
+
+SERIALIZER_BACKENDS = ("auto", "orjson", "pydantic", "json")
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+# msgpack extension type holding a little-endian float64 array
+FLOAT64_ARRAY_EXT = 1
+# Forecast fields sent as float64 arrays in the typed-array layout
+TYPED_FORECAST_COLUMNS = ("price", "pct_change")
+
+
+def negotiate(accept: Optional[str]) -> Tuple[str, bool]:
+    """
+    Picks the response format for an Accept header. Returns ("msgpack",
+    typed_arrays) when msgpack is installed and the client ranks
+    application/msgpack at least as high as application/json, otherwise
+    ("json", False). `typed_arrays` is set by the media type parameter
+    `arrays=typed` (e.g. "application/msgpack; arrays=typed").
+    """
+    if not accept or msgpack is None:
+        return "json", False
+    msgpack_q, json_q, typed = 0.0, 0.0, False
+    for media_range in accept.split(","):
+        media_type, *params = [part.strip() for part in media_range.split(";")]
+        options = dict(param.partition("=")[::2] for param in params)
+        try:
+            q = float(options.get("q", 1))
+        except ValueError:
+            q = 0.0
+        media_type = media_type.lower()
+        if media_type in MSGPACK_MEDIA_TYPES:
+            msgpack_q, typed = q, options.get("arrays") == "typed"
+        elif media_type == JSON_MEDIA_TYPE:
+            json_q = q
+    if msgpack_q > 0 and msgpack_q >= json_q:
+        return "msgpack", typed
+    return "json", False
+
+
+def _float64_array(values: List[float]):
+    packed = array("d", values)
+    if sys.byteorder != "little":
+        packed.byteswap()
+    return msgpack.ExtType(FLOAT64_ARRAY_EXT, packed.tobytes())
+
+
+def _ext_hook(code: int, data: bytes):
+    if code != FLOAT64_ARRAY_EXT:
+        return msgpack.ExtType(code, data)
+    values = array("d", data)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tolist()
+
+
+def _pack_forecasts(value: Any) -> Any:
+    """
+    Typed-array layout: every `forecasts` list of rows becomes a dict of
+    columns, with the TYPED_FORECAST_COLUMNS as float64 arrays.
+    """
+    if isinstance(value, list):
+        return [_pack_forecasts(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    packed = {}
+    for key, item in value.items():
+        if key == "forecasts" and isinstance(item, list) and item and isinstance(item[0], dict):
+            packed[key] = {
+                column: (_float64_array if column in TYPED_FORECAST_COLUMNS else list)(
+                    [row[column] for row in item]
+                )
+                for column in item[0]
+            }
+        else:
+            packed[key] = _pack_forecasts(item)
+    return packed
+
+
+def _unpack_forecasts(value: Any) -> Any:
+    # Inverse of _pack_forecasts: columns back to rows
+    if isinstance(value, list):
+        return [_unpack_forecasts(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    unpacked = {}
+    for key, item in value.items():
+        if key == "forecasts" and isinstance(item, dict):
+            unpacked[key] = [dict(zip(item, row)) for row in zip(*item.values())]
+        else:
+            unpacked[key] = _unpack_forecasts(item)
+    return unpacked
+
+
+def _msgpack_default(value: Any) -> Any:
+    # NumPy scalars and arrays
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"Cannot serialize {type(value).__name__} to msgpack")
+
+
+def decode_msgpack(body: bytes, rows: bool = True) -> Any:
+    """
+    Decodes a msgpack body, in either layout, into the same structure the
+    JSON encoding would give. With `rows=False`, forecast series of the
+    typed-array layout are left as columns.
+    """
+    typed = []
+
+    def ext_hook(code: int, data: bytes):
+        typed.append(code)
+        return _ext_hook(code, data)
+
+    # raw=False: strings must be UTF-8, anything else raises UnicodeDecodeError (a ValueError)
+    value = msgpack.unpackb(body, raw=False, ext_hook=ext_hook)
+    # Only the typed-array layout needs its columns turned back into rows
+    return _unpack_forecasts(value) if typed and rows else value
+
+
+def _json_safe(value: Any) -> Any:
+    # Validation errors echo the rejected input, which JSON can't always carry
+    if isinstance(value, float) and not math.isfinite(value):
+        return str(value)
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    if isinstance(value, dict):
+        return {key: _json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(item) for item in value]
+    return value
+
+
+async def validation_error_response(request: Request, exc: RequestValidationError) -> JSONResponse:
+    """
+    The 422 answer to an invalid request body, as FastAPI's own, except that
+    rejected inputs JSON can't encode (inf, NaN, raw bytes) are echoed as text
+    instead of failing with a 500.
+    """
+    return JSONResponse(
+        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        content={"detail": jsonable_encoder(_json_safe(exc.errors()))},
+    )
+
+
+class MsgpackRoute(APIRoute):
+    """
+    Route class accepting application/msgpack request bodies. The body is
+    decoded up front and handed to FastAPI in place of the parsed JSON, so
+    the request schemas validate it exactly like a JSON body.
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            content_type = request.headers.get("content-type", "").partition(";")[0].strip().lower()
+            if content_type in MSGPACK_MEDIA_TYPES:
+                if msgpack is None:
+                    raise HTTPException(
+                        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                        detail="msgpack request bodies need the msgpack package, which is not installed",
+                    )
+                body = await request.body()
+                try:
+                    decoded = decode_msgpack(body)
+                except ValueError as e:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid msgpack body: {e}"
+                    )
+                scope = dict(request.scope)
+                scope["headers"] = [
+                    (name, value) for name, value in request.scope["headers"] if name != b"content-type"
+                ] + [(b"content-type", JSON_MEDIA_TYPE.encode("ascii"))]
+                request = Request(scope, request.receive)
+                # Starlette keeps the parsed body here; FastAPI reads it through request.json()
+                request._body = body
+                request._json = decoded
+            return await handler(request)
+
+        return route_handler
+
+
+class PredictionSerializer:
+    """
+    Turns the dicts returned by AIModel into response bytes in a single pass.
+
+    In the normal path the result is encoded as-is by orjson (when installed)
+    or pydantic-core's Rust encoder, skipping jsonable_encoder's walk over the
+    structure. With `validate=True` (debug mode) the result is first validated
+    into the response model and emitted through pydantic's model_dump_json,
+    so schema drift shows up during development.
+
+    response() and response_many() negotiate the wire format from the Accept
+    header and answer application/msgpack instead of JSON when asked to.
+    """
+
+    def __init__(self, response_model: Type[BaseModel], backend: str = "auto", validate: bool = False):
+        if backend not in SERIALIZER_BACKENDS:
+            raise ValueError(f"Unknown serializer {backend!r}, expected one of {SERIALIZER_BACKENDS}")
+        if backend == "auto":
+            backend = "orjson" if orjson is not None else "pydantic"
+        if backend == "orjson" and orjson is None:
+            raise ValueError("RESPONSE_SERIALIZER=orjson but orjson is not installed")
+
+        self.response_model = response_model
+        self.backend = backend
+        self.validate = validate
+        self._list_adapter = TypeAdapter(List[response_model])
+
+    @classmethod
+    def from_settings(cls, response_model: Type[BaseModel], settings) -> "PredictionSerializer":
+        return cls(response_model, backend=settings.response_serializer, validate=settings.debug)
+
+    def dumps(self, result: Any) -> bytes:
+        if self.validate:
+            return self.response_model.model_validate(result).model_dump_json().encode("utf-8")
+        return self.encode(result)
+
+    def validate_many(self, results: List[Any]) -> List[Any]:
+        """
+        Validates `results` against the response model, whatever `validate`
+        says, and returns them as plain data ready for either wire format.
+        """
+        return self._list_adapter.dump_python(self._list_adapter.validate_python(results))
+
+    def dumps_many(self, results: List[Any]) -> bytes:
+        if self.validate:
+            return self._list_adapter.dump_json(self._list_adapter.validate_python(results))
+        return self.encode(results)
+
+    def encode(self, value: Any) -> bytes:
+        """
+        Encodes any JSON-able value with the selected backend, without validation.
+        """
+        if self.backend == "orjson":
+            return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+        if self.backend == "pydantic":
+            return pydantic_core.to_json(value)
+        return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+    def packb(self, value: Any, typed_arrays: bool = False) -> bytes:
+        """
+        Encodes a value to msgpack, optionally with forecast series packed
+        as typed float arrays (see _pack_forecasts).
+        """
+        if typed_arrays:
+            value = _pack_forecasts(value)
+        return msgpack.packb(value, default=_msgpack_default)
+
+    def response(self, result: Any, accept: Optional[str] = None) -> Response:
+        wire_format, typed_arrays = negotiate(accept)
+        if wire_format == "msgpack":
+            if self.validate:
+                result = self.response_model.model_validate(result).model_dump()
+            return Response(content=self.packb(result, typed_arrays), media_type=MSGPACK_MEDIA_TYPE)
+        return Response(content=self.dumps(result), media_type=JSON_MEDIA_TYPE)
+
+    def response_many(self, results: List[Any], accept: Optional[str] = None) -> Response:
+        wire_format, typed_arrays = negotiate(accept)
+        if wire_format == "msgpack":
+            if self.validate:
+                results = self._list_adapter.dump_python(self._list_adapter.validate_python(results))
+            return Response(content=self.packb(results, typed_arrays), media_type=MSGPACK_MEDIA_TYPE)
+        return Response(content=self.dumps_many(results), media_type=JSON_MEDIA_TYPE)
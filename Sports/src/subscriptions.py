@@ -0,0 +1,216 @@
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+# A fixture is identified by its two teams
+FixtureKey = Tuple[str, str]
+ODDS_FIELDS = ("home_team_odds_avg", "away_team_odds_avg")
+
+
+def fixture_key(row: Dict[str, Any]) -> FixtureKey:
+    return row["home_team"], row["away_team"]
+
+
+class Subscriber:
+    """
+    One connected client: the fixtures it follows and the queue of encoded
+    messages waiting to be sent to it. A client that falls `queue_size`
+    messages behind is dropped rather than slowing everyone else down.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.fixtures: Set[FixtureKey] = set()
+        self.dropped = False
+
+    def push(self, message: str):
+        if self.dropped:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.dropped = True
+            # Make room for the end-of-stream marker the sender stops on
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class FixtureHub:
+    """
+    Keeps the latest inputs and prediction of every fixture that has at
+    least one subscriber, and pushes prediction changes to them.
+
+    An odds update only recomputes the fixtures whose odds actually moved,
+    all of them in a single `predict_many` call. For each recomputed fixture
+    the fields that differ from the previous prediction are encoded once
+    into a message, and that same message is queued for every subscriber of
+    the fixture, so the cost of an update doesn't grow with the number of
+    clients beyond a queue append each.
+
+    Updates are applied one batch at a time, so a slower recompute can never
+    overwrite a newer one.
+    """
+
+    def __init__(
+        self,
+        predict_many: Callable[[List[Dict[str, Any]]], Awaitable[List[Dict[str, Any]]]],
+        encode: Callable[[Any], bytes],
+        queue_size: int = 256,
+        max_fixtures: int = 500,
+    ):
+        self.predict_many = predict_many
+        self.encode = encode
+        self.queue_size = queue_size
+        self.max_fixtures = max_fixtures
+        # key -> {"request": inputs, "result": latest prediction}
+        self._fixtures: Dict[FixtureKey, Dict[str, Dict[str, Any]]] = {}
+        self._subscribers: Dict[FixtureKey, Set[Subscriber]] = {}
+        self._connections: Set[Subscriber] = set()
+        self._lock = asyncio.Lock()
+        self.updates = 0
+        self.recomputed = 0
+        self.messages = 0
+
+    @classmethod
+    def from_settings(cls, predict_many, encode, settings) -> Optional["FixtureHub"]:
+        if not settings.subscriptions_enabled:
+            return None
+        return cls(
+            predict_many,
+            encode,
+            queue_size=settings.subscription_queue_size,
+            max_fixtures=settings.subscription_max_fixtures,
+        )
+
+    def connect(self) -> Subscriber:
+        subscriber = Subscriber(self.queue_size)
+        self._connections.add(subscriber)
+        return subscriber
+
+    def disconnect(self, subscriber: Subscriber):
+        self._connections.discard(subscriber)
+        self.unsubscribe(subscriber, list(subscriber.fixtures))
+
+    async def subscribe(self, subscriber: Subscriber, requests: List[Dict[str, Any]]):
+        """
+        Follows the fixtures of `requests` and sends their current prediction
+        to `subscriber`. Fixtures nobody followed yet are predicted first.
+        """
+        if len(subscriber.fixtures | {fixture_key(row) for row in requests}) > self.max_fixtures:
+            raise ValueError(f"A connection can follow at most {self.max_fixtures} fixtures")
+        async with self._lock:
+            new = {fixture_key(row): row for row in requests if fixture_key(row) not in self._fixtures}
+            if new:
+                results = await self.predict_many(list(new.values()))
+                self.recomputed += len(results)
+                for (key, row), result in zip(new.items(), results):
+                    self._fixtures[key] = {"request": row, "result": result}
+            if subscriber not in self._connections:
+                # Disconnected while the fixtures were predicted; disconnect() already ran
+                self._forget_unfollowed(new)
+                return
+            for row in requests:
+                key = fixture_key(row)
+                self._subscribers.setdefault(key, set()).add(subscriber)
+                subscriber.fixtures.add(key)
+                fixture = self._fixtures[key]
+                subscriber.push(self._message("snapshot", key, fixture["request"], prediction=fixture["result"]))
+                self.messages += 1
+
+    def _forget_unfollowed(self, keys: Iterable[FixtureKey]):
+        for key in keys:
+            if key not in self._subscribers:
+                self._fixtures.pop(key, None)
+
+    def unsubscribe(self, subscriber: Subscriber, keys: Iterable[FixtureKey]):
+        for key in keys:
+            subscriber.fixtures.discard(key)
+            subscribers = self._subscribers.get(key)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscriber)
+            if not subscribers:
+                # Nobody follows the fixture anymore, stop tracking it
+                del self._subscribers[key]
+                self._fixtures.pop(key, None)
+
+    async def update_odds(self, rows: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Applies odds updates. Returns how many fixtures were recomputed and
+        how many messages were queued for subscribers.
+        """
+        async with self._lock:
+            self.updates += len(rows)
+            # The latest update of a fixture wins; untracked fixtures are ignored
+            changed = {}
+            for row in rows:
+                key = fixture_key(row)
+                fixture = self._fixtures.get(key)
+                if fixture is None:
+                    continue
+                current = changed.get(key, fixture["request"])
+                moved = any(row[field] != current[field] for field in ODDS_FIELDS)
+                if moved or row.get("odds_book") != current.get("odds_book"):
+                    changed[key] = {
+                        **current,
+                        **{field: row[field] for field in ODDS_FIELDS},
+                        "odds_book": row.get("odds_book"),
+                    }
+            pushed = await self._recompute(changed)
+        return {"received": len(rows), "recomputed": len(changed), "pushed": pushed}
+
+    async def refresh(self, keys: Iterable[FixtureKey]) -> int:
+        """
+        Predicts the given tracked fixtures again, e.g. after their odds book
+        changed, and pushes the changes. Returns how many messages were queued.
+        """
+        async with self._lock:
+            # Without their last odds_book, so the model's current book is used as it is
+            changed = {key: {**self._fixtures[key]["request"], "odds_book": None} for key in keys if key in self._fixtures}
+            return await self._recompute(changed)
+
+    async def _recompute(self, changed: Dict[FixtureKey, Dict[str, Any]]) -> int:
+        if not changed:
+            return 0
+        results = await self.predict_many(list(changed.values()))
+        self.recomputed += len(results)
+        pushed = 0
+        for (key, row), result in zip(changed.items(), results):
+            fixture = self._fixtures.get(key)
+            if fixture is None:
+                continue
+            previous = fixture["result"]
+            fixture["request"], fixture["result"] = row, result
+            changes = {field: value for field, value in result.items() if previous.get(field) != value}
+            if not changes:
+                continue
+            # Encoded once, the same message goes to every subscriber
+            message = self._message("update", key, row, changes=changes)
+            for subscriber in self._subscribers.get(key, ()):
+                subscriber.push(message)
+                pushed += 1
+        self.messages += pushed
+        return pushed
+
+    def _message(self, kind: str, key: FixtureKey, row: Dict[str, Any], **payload) -> str:
+        message = {
+            "type": kind,
+            "home_team": key[0],
+            "away_team": key[1],
+            **{field: row[field] for field in ODDS_FIELDS},
+            **payload,
+        }
+        return self.encode(message).decode("utf-8")
+
+    def stats(self):
+        return {
+            "connections": len(self._connections),
+            "fixtures": len(self._fixtures),
+            "updates": self.updates,
+            "recomputed": self.recomputed,
+            "messages": self.messages,
+        }
@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+
+from src.admission import AdmissionController, AdmissionMiddleware, AdmissionRejected, ConcurrencyLimiter
+
+
+def test_queued_request_gets_the_released_slot():
+    async def scenario():
+        limiter = ConcurrencyLimiter("t", 1, max_queue=1, queue_timeout=1.0)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.stats()["waiting"] == 1
+        limiter.release()
+        await waiter
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats == {"limit": 1, "in_flight": 1, "waiting": 0, "admitted": 2, "queued": 1, "shed": 0}
+
+
+def test_queued_request_times_out_with_503():
+    async def scenario():
+        limiter = ConcurrencyLimiter("t", 1, max_queue=1, queue_timeout=0.01, retry_after=3)
+        await limiter.acquire()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await limiter.acquire()
+        return limiter, rejected.value
+
+    limiter, rejection = asyncio.run(scenario())
+    assert (rejection.status_code, rejection.retry_after) == (503, 3)
+    assert limiter.stats() == {"limit": 1, "in_flight": 1, "waiting": 0, "admitted": 1, "queued": 1, "shed": 1}
+    # The timed out request left the queue, so the slot goes back to nobody
+    limiter.release()
+    assert limiter.in_flight == 0
+
+
+def test_full_queue_sheds_with_429():
+    async def scenario():
+        limiter = ConcurrencyLimiter("t", 1, max_queue=1, queue_timeout=1.0)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await limiter.acquire()
+        limiter.release()
+        await waiter
+        return limiter, rejected.value
+
+    limiter, rejection = asyncio.run(scenario())
+    assert rejection.status_code == 429
+    assert limiter.stats()["shed"] == 1
+    assert limiter.stats()["admitted"] == 2
+
+
+def test_no_queue_sheds_straight_away():
+    async def scenario():
+        limiter = ConcurrencyLimiter("probes", 1)
+        await limiter.acquire()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await limiter.acquire()
+        return rejected.value
+
+    assert asyncio.run(scenario()).status_code == 429
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        limiter = ConcurrencyLimiter("t", 1, max_queue=1, queue_timeout=1.0)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        limiter.release()
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["in_flight"], stats["waiting"], stats["shed"]) == (0, 0, 0)
+
+
+def test_adaptive_limit_backs_off_and_recovers():
+    limiter = ConcurrencyLimiter("t", 8, target_latency=0.1, min_limit=2, max_limit=10, backoff=0.5)
+    limiter.observe(0.5)
+    assert limiter.stats()["limit"] == 4
+    # One burst of slow responses counts once
+    limiter.observe(0.5)
+    assert limiter.stats()["limit"] == 4
+    limiter.in_flight = 3
+    for _ in range(20):
+        limiter.observe(0.01)
+    assert limiter.stats()["limit"] > 4
+
+
+def test_controller_matches_longest_prefix():
+    limiters = {group: ConcurrencyLimiter(group, 1) for group in ("predict", "batch", "default")}
+    controller = AdmissionController(
+        limiters, [("/predict", "predict"), ("/predict/slate", "batch"), ("/", "default")]
+    )
+    assert controller.limiter_for("/predict").name == "predict"
+    assert controller.limiter_for("/predict/slate").name == "batch"
+    assert controller.limiter_for("/predictions").name == "default"
+    assert controller.limiter_for("/docs").name == "default"
+
+
+def test_middleware_answers_shed_requests_before_the_app():
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope["path"])
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    async def scenario():
+        limiter = ConcurrencyLimiter("predict", 1, retry_after=2)
+        middleware = AdmissionMiddleware(app, AdmissionController({"predict": limiter}, [("/predict", "predict")]))
+        await limiter.acquire()  # Someone else holds the only slot
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "path": "/predict"}
+        await middleware(scope, None, send)
+        limiter.release()
+        await middleware({"type": "http", "path": "/predict"}, None, send)
+        return scope, sent, limiter
+
+    scope, sent, limiter = asyncio.run(scenario())
+    assert calls == ["/predict"]
+    assert sent[0]["status"] == 429
+    assert (b"retry-after", b"2") in sent[0]["headers"]
+    assert scope["admission_group"] == "predict"
+    assert sent[2]["status"] == 200
+    assert limiter.in_flight == 0
@@ -0,0 +1,100 @@
+import os
+
+import pytest
+
+from src.ratings import INITIAL_RATING, RatingTable
+
+
+DAY = 86400.0
+
+
+def record_season(table, start=0.0):
+    table.record_result("Lions", "Sharks", 2, 0, played_at=start)
+    table.record_result("Eagles", "Lions", 1, 1, played_at=start + DAY)
+    table.record_result("Sharks", "Eagles", 0, 3, played_at=start + 2 * DAY)
+
+
+def touch_later(path):
+    # Snapshots written within one filesystem timestamp tick share an mtime
+    mtime_ns = path.stat().st_mtime_ns + 1_000_000_000
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "ratings.bin"
+
+
+def test_snapshot_round_trip(path):
+    table = RatingTable(path, check_interval=0)
+    record_season(table)
+    table.save()
+
+    loaded = RatingTable(path, check_interval=0)
+    assert loaded.names == table.names
+    assert loaded.results_applied == 3
+    for team in table.names:
+        assert loaded.describe(team) == table.describe(team)
+    fixtures = (["Lions", "Eagles", "Wolves"], ["Sharks", "Wolves", "Lions"])
+    assert loaded.home_win_probability(*fixtures).tolist() == table.home_win_probability(*fixtures).tolist()
+
+
+def test_unknown_teams_get_the_initial_rating(path):
+    table = RatingTable(path, check_interval=0)
+    assert table.describe("Lions") is None
+    probability = table.home_win_probability(["Lions"], ["Sharks"])[0]
+    assert 0.5 < probability < 1.0  # Only home advantage tells them apart
+    table.record_result("Lions", "Sharks", 1, 0, played_at=0.0)
+    assert table.describe("Lions")["rating"] > INITIAL_RATING > table.describe("Sharks")["rating"]
+
+
+def test_reader_reloads_a_newer_snapshot(path):
+    writer = RatingTable(path, check_interval=0)
+    writer.record_result("Lions", "Sharks", 2, 0, played_at=0.0)
+    writer.save()
+    reader = RatingTable(path, check_interval=0)
+
+    record_season(writer, start=DAY)
+    writer.save()
+    touch_later(path)
+    reader.home_win_probability(["Lions"], ["Sharks"])
+    assert reader.results_applied == 4
+    assert reader.describe("Eagles") == writer.describe("Eagles")
+
+
+def test_unsaved_results_are_not_dropped_by_a_reload(path):
+    writer = RatingTable(path, check_interval=0)
+    writer.record_result("Lions", "Sharks", 2, 0, played_at=0.0)
+    writer.save()
+    other = RatingTable(path, check_interval=0)
+    other.record_result("Wolves", "Bears", 4, 1, played_at=DAY)
+
+    writer.record_result("Eagles", "Hawks", 1, 0, played_at=DAY)
+    writer.save()
+    touch_later(path)
+    other.home_win_probability(["Wolves"], ["Bears"])
+    assert other.results_applied == 2
+    assert other.describe("Wolves")["games"] == 1
+    assert other.describe("Eagles") is None
+
+
+def test_writer_does_not_reload_its_own_snapshot(path, monkeypatch):
+    table = RatingTable(path, check_interval=0)
+    record_season(table)
+    table.save()
+
+    loads = []
+    monkeypatch.setattr(table, "load", lambda: loads.append(True))
+    table.home_win_probability(["Lions"], ["Sharks"])
+    table.record_result("Lions", "Eagles", 0, 1, played_at=3 * DAY)
+    table.home_win_probability(["Lions"], ["Sharks"])
+    assert loads == []
+    assert table.results_applied == 4
+
+
+def test_in_memory_table_never_touches_disk(tmp_path):
+    table = RatingTable(None, check_interval=0)
+    record_season(table)
+    table.save()
+    assert table.home_win_probability(["Lions"], ["Sharks"]).shape == (1,)
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,52 @@
+import pytest
+from pydantic import ValidationError
+
+from src.schemas import BookmakerOdds, PredictionRequest
+
+
+def prediction_json(home_odds="1.75", away_odds="2.2", odds_book=None):
+    body = (
+        f'{{"home_team": "Lions", "away_team": "Sharks", '
+        f'"home_team_odds_avg": {home_odds}, "away_team_odds_avg": {away_odds}'
+    )
+    if odds_book is not None:
+        body += f', "odds_book": {odds_book}'
+    return body + "}"
+
+
+def test_valid_prediction_request():
+    request = PredictionRequest.model_validate_json(
+        prediction_json(odds_book='{"bet365": {"winner": {"home": 1.8, "away": 2.1}}}')
+    )
+    assert request.home_team_odds_avg == 1.75
+    assert request.odds_book["bet365"]["winner"]["away"] == 2.1
+
+
+@pytest.mark.parametrize("odds", ["0", "1", "0.5", "-2", "1e400", "NaN", "Infinity"])
+def test_prediction_request_rejects_odds_not_above_one_or_not_finite(odds):
+    with pytest.raises(ValidationError):
+        PredictionRequest.model_validate_json(prediction_json(home_odds=odds))
+    with pytest.raises(ValidationError):
+        PredictionRequest.model_validate_json(prediction_json(away_odds=odds))
+
+
+@pytest.mark.parametrize("price", ["1", "0.9", "1e400", "NaN", "-Infinity"])
+def test_odds_book_rejects_prices_not_above_one_or_not_finite(price):
+    with pytest.raises(ValidationError):
+        PredictionRequest.model_validate_json(
+            prediction_json(odds_book=f'{{"bet365": {{"winner": {{"home": {price}}}}}}}')
+        )
+    with pytest.raises(ValidationError):
+        BookmakerOdds.model_validate_json(
+            f'{{"home_team": "Lions", "away_team": "Sharks", "bookmaker": "bet365", '
+            f'"market": "winner", "prices": {{"home": {price}}}}}'
+        )
+
+
+@pytest.mark.parametrize(
+    "odds_book",
+    ['{"bet365": {"corners": {"home": 1.8}}}', '{"bet365": {"winner": {"draw": 3.1}}}'],
+)
+def test_odds_book_rejects_unknown_markets_and_selections(odds_book):
+    with pytest.raises(ValidationError):
+        PredictionRequest.model_validate_json(prediction_json(odds_book=odds_book))
@@ -0,0 +1,128 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.exceptions import RequestValidationError
+from fastapi.testclient import TestClient
+
+from src.schemas import PredictionRequest, PredictionResponse
+from src.serialization import (
+    MSGPACK_MEDIA_TYPE,
+    MsgpackRoute,
+    PredictionSerializer,
+    decode_msgpack,
+    negotiate,
+    validation_error_response,
+)
+
+msgpack = pytest.importorskip("msgpack")
+
+
+RESULT = {
+    "winner": "Lions",
+    "winner_confidence_pct": 61.5,
+    "winner_best_bet_odds": 1.8,
+    "over_under": "Over 2.5",
+    "over_under_confidence_pct": 54.25,
+    "over_under_best_bet_odds": None,
+    "spread": "Lions -1.5",
+    "spread_confidence_pct": 38.0,
+    "spread_best_bet_odds": 2.6,
+}
+REQUEST = {"home_team": "Lions", "away_team": "Sharks", "home_team_odds_avg": 1.75, "away_team_odds_avg": 2.2}
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        (None, ("json", False)),
+        ("", ("json", False)),
+        ("*/*", ("json", False)),
+        ("application/json", ("json", False)),
+        ("application/msgpack", ("msgpack", False)),
+        ("application/x-msgpack", ("msgpack", False)),
+        ("Application/MsgPack", ("msgpack", False)),
+        ("application/msgpack; arrays=typed", ("msgpack", True)),
+        ("application/json, application/msgpack", ("msgpack", False)),
+        ("application/json;q=0.9, application/msgpack;q=0.5", ("json", False)),
+        ("application/json;q=0.5, application/msgpack;q=0.9; arrays=typed", ("msgpack", True)),
+        ("application/msgpack;q=0", ("json", False)),
+        ("application/msgpack;q=oops", ("json", False)),
+    ],
+)
+def test_negotiate(accept, expected):
+    assert negotiate(accept) == expected
+
+
+@pytest.mark.parametrize("typed_arrays", [False, True])
+def test_msgpack_round_trip(typed_arrays):
+    serializer = PredictionSerializer(PredictionResponse)
+    assert decode_msgpack(serializer.packb(RESULT, typed_arrays)) == RESULT
+    assert decode_msgpack(serializer.packb([RESULT, {}], typed_arrays)) == [RESULT, {}]
+
+
+@pytest.mark.parametrize("validate", [False, True])
+def test_response_follows_the_accept_header(validate):
+    serializer = PredictionSerializer(PredictionResponse, backend="json", validate=validate)
+    as_json = serializer.response(RESULT, "application/json")
+    as_msgpack = serializer.response(RESULT, "application/msgpack; arrays=typed")
+    assert as_json.media_type == "application/json"
+    assert PredictionResponse.model_validate_json(as_json.body).model_dump() == RESULT
+    assert as_msgpack.media_type == MSGPACK_MEDIA_TYPE
+    assert decode_msgpack(as_msgpack.body) == RESULT
+
+
+def test_slate_is_validated_once_for_both_formats():
+    serializer = PredictionSerializer(PredictionResponse, backend="json")
+    results = serializer.validate_many([RESULT, {"winner": "Sharks"}])
+    assert results[1]["winner_confidence_pct"] is None
+    as_json = serializer.response_many(results, "application/json")
+    as_msgpack = serializer.response_many(results, MSGPACK_MEDIA_TYPE)
+    assert decode_msgpack(as_msgpack.body) == results
+    assert as_json.body == serializer.encode(results)
+    with pytest.raises(ValueError):
+        serializer.validate_many([{**RESULT, "winner_confidence_pct": 150}])
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.router.route_class = MsgpackRoute
+    app.add_exception_handler(RequestValidationError, validation_error_response)
+    serializer = PredictionSerializer(PredictionResponse)
+
+    @app.post("/predict")
+    async def predict(request: PredictionRequest):
+        return serializer.response(request.model_dump(exclude_none=True), MSGPACK_MEDIA_TYPE)
+
+    return TestClient(app)
+
+
+def post_msgpack(client, body):
+    return client.post("/predict", content=body, headers={"content-type": MSGPACK_MEDIA_TYPE})
+
+
+def test_msgpack_request_body_is_validated_like_json(client):
+    response = post_msgpack(client, msgpack.packb(REQUEST))
+    assert response.status_code == 200
+    assert msgpack.unpackb(response.content) == REQUEST
+
+    invalid = post_msgpack(client, msgpack.packb({**REQUEST, "home_team_odds_avg": 0.5}))
+    assert invalid.status_code == 422
+
+
+def test_undecodable_msgpack_body_gets_400(client):
+    # A str header followed by invalid UTF-8
+    assert post_msgpack(client, b"\x81\xa9home_team\xa2\xff\xfe").status_code == 400
+    assert post_msgpack(client, b"\xc1").status_code == 400
+
+
+def test_bytes_in_a_string_field_get_422(client):
+    response = post_msgpack(client, msgpack.packb({**REQUEST, "home_team": b"\xff\x00"}, use_bin_type=True))
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize("price", ["1e400", "NaN", "-Infinity"])
+def test_non_finite_json_numbers_get_422(client, price):
+    body = f'{{"home_team": "Lions", "away_team": "Sharks", "home_team_odds_avg": {price}, "away_team_odds_avg": 2.2}}'
+    response = client.post("/predict", content=body, headers={"content-type": "application/json"})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "home_team_odds_avg"]
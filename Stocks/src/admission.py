@@ -0,0 +1,271 @@
+from collections import deque
+from typing import Deque, Dict, Optional, Sequence, Tuple
+import asyncio
+import logging
+import json
+import time
+
+from src.metrics import ADMISSION_LIMIT, ADMISSION_REQUESTS
+
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a request is shed instead of admitted.
+    """
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """
+    Admits at most `limit` concurrent requests of one route group and lets up
+    to `max_queue` more wait, first in first out, for at most `queue_timeout`
+    seconds. Anything beyond that is shed straight away: 429 when the queue
+    is full, 503 when a queued request timed out.
+
+    With a `target_latency`, the limit adapts (AIMD) to the latency reported
+    through observe(): it grows by one for every `limit` fast responses while
+    the limit is actually in use, and shrinks by `backoff` when responses are
+    slower than the target, at most once per target latency so that one burst
+    of slow responses counts as a single signal.
+
+    Only used from the event loop thread, so no lock is needed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        max_queue: int = 0,
+        queue_timeout: float = 0.5,
+        retry_after: int = 1,
+        target_latency: Optional[float] = None,
+        min_limit: int = 1,
+        max_limit: Optional[int] = None,
+        backoff: float = 0.9,
+    ):
+        self.name = name
+        self.limit = float(limit)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.target_latency = target_latency
+        self.min_limit = min_limit
+        self.max_limit = max_limit or limit
+        self.backoff = backoff
+        self.in_flight = 0
+        self.admitted = 0
+        self.queued = 0
+        self.shed = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._last_decrease = 0.0
+        ADMISSION_LIMIT.labels(name).set(int(self.limit))
+
+    @property
+    def adaptive(self) -> bool:
+        return self.target_latency is not None
+
+    async def acquire(self):
+        """
+        Waits for a slot; raises AdmissionRejected if the request is shed.
+        """
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self._admit()
+            return
+        if len(self._waiters) >= self.max_queue:
+            self._shed()
+            raise AdmissionRejected(429, f"Too many concurrent {self.name} requests, retry later.", self.retry_after)
+
+        self.queued += 1
+        ADMISSION_REQUESTS.labels(self.name, "queued").inc()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the wait ended
+                if isinstance(e, asyncio.TimeoutError):
+                    return
+                self.release()
+                raise
+            self._waiters.remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self._shed()
+            raise AdmissionRejected(503, f"Timed out waiting for {self.name} capacity, retry later.", self.retry_after)
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def observe(self, latency: float):
+        """
+        Feeds the latency of one finished request to the adaptive limit.
+        """
+        if not self.adaptive:
+            return
+        if latency > self.target_latency:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.target_latency:
+                self._last_decrease = now
+                self._set_limit(max(self.min_limit, self.limit * self.backoff))
+        elif self.in_flight + 1 >= int(self.limit) / 2:
+            self._set_limit(min(self.max_limit, self.limit + 1.0 / self.limit))
+
+    def _set_limit(self, limit: float):
+        grew = int(limit) > int(self.limit)
+        self.limit = limit
+        ADMISSION_LIMIT.labels(self.name).set(int(limit))
+        if grew:
+            self._wake()
+
+    def _admit(self):
+        self.in_flight += 1
+        self.admitted += 1
+        ADMISSION_REQUESTS.labels(self.name, "admitted").inc()
+
+    def _shed(self):
+        self.shed += 1
+        ADMISSION_REQUESTS.labels(self.name, "shed").inc()
+
+    def _wake(self):
+        # Hand free slots to the oldest waiters
+        while self._waiters and self.in_flight < int(self.limit):
+            self._admit()
+            self._waiters.popleft().set_result(None)
+
+    def stats(self):
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shed": self.shed,
+        }
+
+
+class AdmissionController:
+    """
+    Routes every request to the limiter of its route group. Groups are
+    matched on path prefixes, longest first, so each route (e.g. /predict
+    versus /health) has its own budget and probes never wait behind
+    predictions. Paths matching no group are admitted without a limit.
+    """
+
+    def __init__(self, limiters: Dict[str, ConcurrencyLimiter], routes: Sequence[Tuple[str, str]]):
+        self.limiters = limiters
+        # (path, group) pairs, longest path first
+        self.routes = sorted(routes, key=lambda route: len(route[0]), reverse=True)
+
+    @classmethod
+    def from_settings(cls, settings, batch_path: str) -> Optional["AdmissionController"]:
+        if not settings.admission_enabled:
+            return None
+        queue = dict(
+            max_queue=settings.admission_max_queue,
+            queue_timeout=settings.admission_queue_timeout_ms / 1000.0,
+            retry_after=settings.admission_retry_after_seconds,
+        )
+        limiters = {
+            "predict": ConcurrencyLimiter(
+                "predict",
+                settings.admission_predict_limit,
+                target_latency=settings.admission_target_latency_ms / 1000.0,
+                min_limit=settings.admission_predict_min_limit,
+                max_limit=settings.admission_predict_max_limit,
+                **queue,
+            ),
+            "batch": ConcurrencyLimiter("batch", settings.admission_batch_limit, **queue),
+            # Probes get a small budget of their own and never queue
+            "probes": ConcurrencyLimiter(
+                "probes", settings.admission_probe_limit, retry_after=settings.admission_retry_after_seconds
+            ),
+            "default": ConcurrencyLimiter("default", settings.admission_default_limit, **queue),
+        }
+        routes = [
+            ("/predict", "predict"),
+            (batch_path, "batch"),
+            ("/health", "probes"),
+            ("/ready", "probes"),
+            ("/metrics", "probes"),
+            ("/", "default"),
+        ]
+        return cls(limiters, routes)
+
+    def limiter_for(self, path: str) -> Optional[ConcurrencyLimiter]:
+        for prefix, group in self.routes:
+            if path == prefix or path.startswith(prefix.rstrip("/") + "/"):
+                return self.limiters[group]
+        return None
+
+    def stats(self):
+        return {name: limiter.stats() for name, limiter in self.limiters.items()}
+
+
+class AdmissionMiddleware:
+    """
+    Pure ASGI middleware applying an AdmissionController. Shed requests get
+    their 429/503 answer (with Retry-After) before any routing or body
+    parsing, and the latency of admitted requests drives adaptive limits.
+    """
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        limiter = self.controller.limiter_for(scope["path"])
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await limiter.acquire()
+        except AdmissionRejected as e:
+            # Shed before routing, so MetricsMiddleware labels it with the group
+            scope["admission_group"] = limiter.name
+            await self._reject(send, e)
+            return
+
+        status_code = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status_code[0] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            limiter.release()
+            if status_code[0] < 500:
+                limiter.observe(time.perf_counter() - start)
+
+    @staticmethod
+    async def _reject(send, rejection: AdmissionRejected):
+        body = json.dumps({"detail": rejection.detail}).encode("utf-8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": rejection.status_code,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode("ascii")),
+                    (b"retry-after", str(rejection.retry_after).encode("ascii")),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
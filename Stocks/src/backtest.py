@@ -0,0 +1,163 @@
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional
+import multiprocessing
+import logging
+import os
+
+from src.ingest import DATA_SUFFIXES, clean_chunks, parse_chunks
+from src.lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+
+
+logger = logging.getLogger(__name__)
+
+# Forecast timestamps aren't scored, so every replayed row uses the same date
+_REPLAY_DATE = "2000-01-03"
+
+
+def load_price_history(directory, chunk_rows: int = 50_000, max_rows: int = 5_000) -> Dict[str, "np.ndarray"]:
+    """
+    Closes per symbol from the files in `directory` (the ingest format:
+    `symbol` and `close` columns, rows in time order per symbol). Rows with
+    a close <= 0 are skipped, like summarize_price_history() does. Only the
+    latest `max_rows` closes of each symbol are kept while streaming.
+    """
+    history: Dict[str, "np.ndarray"] = {}
+    for path in sorted(Path(directory).rglob("*")):
+        if path.suffix not in DATA_SUFFIXES or not path.is_file():
+            continue
+        chunks = clean_chunks(parse_chunks(path, ["symbol", "close"], chunk_rows), ["close"], ["symbol"])
+        for chunk in chunks:
+            valid = chunk["close"] > 0
+            symbols, closes = chunk["symbol"][valid], chunk["close"][valid]
+            order = np.argsort(symbols, kind="stable")
+            symbols, closes = symbols[order], closes[order]
+            starts = np.flatnonzero(np.r_[True, symbols[1:] != symbols[:-1]])
+            ends = np.r_[starts[1:], len(symbols)]
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                symbol = str(symbols[start])
+                series = closes[start:end]
+                if symbol in history:
+                    series = np.concatenate([history[symbol], series])
+                history[symbol] = series[-max_rows:]
+    return history
+
+
+def _score_symbol(symbol: str, closes: "np.ndarray", models: Dict[str, Dict[str, Any]], window: int):
+    # Runs in a worker process: replays one symbol through every model
+    from src.models import AIModel
+
+    scores = {}
+    for label, model in models.items():
+        evaluator = AIModel.for_backtest(model)
+        horizon = len(model["pct_changes"])
+        steps = np.arange(1, horizon + 1)
+        origins = np.arange(len(closes) - horizon)
+        errors = []
+        hits = []
+        # Walk forward one window at a time; each window is a single batch call
+        for start in range(0, len(origins), window):
+            at = origins[start : start + window]
+            current = closes[at]
+            results = evaluator._predict_batch(
+                [{"name": symbol, "date": _REPLAY_DATE, "current_price": float(price)} for price in current]
+            )
+            predicted = np.array(
+                [[forecast["price"] for forecast in result["predictions"][0]["forecasts"]] for result in results]
+            )
+            realized = closes[at[:, None] + steps[None, :]]
+            errors.append(np.abs(predicted - realized) / realized)
+            hits.append(np.sign(predicted - current[:, None]) == np.sign(realized - current[:, None]))
+        if errors:
+            errors, hits = np.concatenate(errors), np.concatenate(hits)
+            scores[label] = {"forecasts": int(errors.size), "abs_pct_error_sum": float(errors.sum()), "hits": int(hits.sum())}
+    return scores
+
+
+class Backtester:
+    """
+    Walk-forward backtest of Stocks models on the price history in DATA_DIR.
+
+    For every symbol, each model forecasts from every historical close in
+    turn and its 7 forecast prices are compared with the closes that
+    actually followed. Origins are replayed a `window` at a time through
+    AIModel's batch path, so each window costs one vectorised call; symbols
+    run in parallel in a process pool. A model's score is its direction
+    accuracy minus its mean absolute percentage error (higher is better).
+    """
+
+    def __init__(
+        self,
+        directory,
+        window: int = 64,
+        max_history: int = 5_000,
+        chunk_rows: int = 50_000,
+        workers: Optional[int] = None,
+    ):
+        self.directory = Path(directory)
+        self.window = window
+        self.max_history = max_history
+        self.chunk_rows = chunk_rows
+        self.workers = workers
+
+    @classmethod
+    def from_settings(cls, settings) -> Optional["Backtester"]:
+        if not settings.backtest_enabled or not settings.data_dir.is_dir():
+            return None
+        return cls(
+            settings.data_dir,
+            window=settings.backtest_window,
+            max_history=settings.backtest_max_history,
+            chunk_rows=settings.ingest_chunk_rows,
+            workers=settings.backtest_workers or None,
+        )
+
+    def evaluate(self, models: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Scores each of `models` (label -> model dict). Returns label ->
+        score details, or an empty dict when there is no usable history.
+        """
+        history = self.load_history()
+        if not history:
+            return {}
+
+        args = [(symbol, closes, models, self.window) for symbol, closes in history.items()]
+        if len(args) > 1 and self.workers != 1:
+            # spawn keeps children clear of the parent's threads and locks
+            with ProcessPoolExecutor(
+                max_workers=min(len(args), self.workers or os.cpu_count() or 1),
+                mp_context=multiprocessing.get_context("spawn"),
+            ) as pool:
+                per_group = list(pool.map(_score_symbol, *zip(*args)))
+        else:
+            per_group = [_score_symbol(*arg) for arg in args]
+
+        return self._combine(per_group, groups=len(args))
+
+    def load_history(self) -> Dict[str, "np.ndarray"]:
+        return load_price_history(self.directory, self.chunk_rows, self.max_history)
+
+    @staticmethod
+    def _combine(per_group, groups: int) -> Dict[str, Dict[str, Any]]:
+        totals: Dict[str, Dict[str, float]] = {}
+        for scores in per_group:
+            for label, values in scores.items():
+                total = totals.setdefault(label, dict.fromkeys(values, 0))
+                for key, value in values.items():
+                    total[key] += value
+
+        combined = {}
+        for label, total in totals.items():
+            forecasts = total["forecasts"]
+            mape = total["abs_pct_error_sum"] / forecasts
+            direction_accuracy = total["hits"] / forecasts
+            combined[label] = {
+                "score": round(direction_accuracy - mape, 6),
+                "mape": round(mape, 6),
+                "direction_accuracy": round(direction_accuracy, 6),
+                "forecasts": int(forecasts),
+                "symbols": groups,
+            }
+        return combined
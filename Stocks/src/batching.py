@@ -0,0 +1,127 @@
+from typing import Any, Awaitable, Callable, List, Optional, Set
+import asyncio
+import logging
+import time
+
+from src.executor import ExecutorSaturated
+from src.metrics import MICROBATCH_QUEUE_DELAY, MICROBATCH_SIZE
+
+
+logger = logging.getLogger(__name__)
+
+
+class BatchQueueFull(ExecutorSaturated):
+    """
+    Raised when the micro-batching queue already holds `max_queue` requests.
+    """
+
+
+class MicroBatcher:
+    """
+    Collects concurrent single-row prediction requests and runs them through
+    the model as one batch.
+
+    A batch is dispatched once it holds `max_batch_size` rows or the oldest row
+    has waited `max_wait_ms`, whichever comes first. `run_batch` receives the
+    rows in arrival order and must return one result per row; each result is
+    routed back to the handler awaiting it. Batches are dispatched as tasks,
+    so the next batch is being collected while the previous one runs.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_wait_ms: float = 5.0,
+        max_batch_size: int = 64,
+        max_queue: int = 1024,
+        retry_after: int = 1,
+    ):
+        self.run_batch = run_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight: Set[asyncio.Task] = set()
+
+    @classmethod
+    def from_settings(cls, run_batch, settings) -> Optional["MicroBatcher"]:
+        if not settings.microbatch_enabled:
+            return None
+        return cls(
+            run_batch,
+            max_wait_ms=settings.microbatch_max_wait_ms,
+            max_batch_size=settings.microbatch_max_batch_size,
+            max_queue=settings.microbatch_max_queue,
+            retry_after=settings.execution_retry_after_seconds,
+        )
+
+    async def submit(self, row: Any) -> Any:
+        """
+        Queues one row and waits for its result.
+        """
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._worker = asyncio.create_task(self._collect())
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((row, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            raise BatchQueueFull(self.retry_after)
+        return await future
+
+    async def _collect(self):
+        queue = self._queue
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if not queue.empty():
+                    batch.append(queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            task = asyncio.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch):
+        dispatched_at = time.perf_counter()
+        MICROBATCH_SIZE.observe(len(batch))
+        for _, _, enqueued_at in batch:
+            MICROBATCH_QUEUE_DELAY.observe(dispatched_at - enqueued_at)
+
+        try:
+            results = await self.run_batch([row for row, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "batches_in_flight": len(self._inflight),
+            "max_wait_ms": self.max_wait * 1000.0,
+            "max_batch_size": self.max_batch_size,
+            "max_queue": self.max_queue,
+        }
+
+    def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
@@ -0,0 +1,307 @@
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import threading
+import logging
+import time
+import json
+import math
+import os
+
+from src.lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "index.json"
+DATA_NAME = "features.bin"
+FORMAT_VERSION = 1
+
+# Order of the values in each symbol's feature vector
+FEATURE_NAMES = ("sma", "ema", "volatility", "last_return", "window_return")
+
+
+class FeatureStore:
+    """
+    Rolling price features per symbol, updated in O(1) per observed price.
+
+    Every symbol owns one record in a memory-mapped file: a ring buffer of the
+    last `window` prices and returns, running sums over the buffers, the EMA
+    and the current feature vector (see FEATURE_NAMES). An update replaces
+    the oldest buffer entry and adjusts the sums, so nothing is recomputed
+    from the history. To keep floating point drift in check, the sums are
+    rebuilt from the buffers once per `window` updates, which is still O(1)
+    amortised.
+
+    The symbol -> record mapping lives next to the data in index.json. Both
+    survive restarts, and process-pool children that open the same directory
+    see new prices straight away through the shared mapping. Updates take a
+    lock; reads don't, and get a view into the mapping instead of a copy.
+    Looking up a symbol this store doesn't know checks index.json for
+    symbols added elsewhere at most once every `check_interval` seconds.
+    """
+
+    def __init__(
+        self, directory, window: int = 64, ema_span: int = 20, capacity: int = 1024, check_interval: float = 1.0
+    ):
+        self.directory = Path(directory)
+        self.window = window
+        self.ema_span = ema_span
+        self.alpha = 2.0 / (ema_span + 1)
+        self.check_interval = check_interval
+        self.dtype = np.dtype(
+            [
+                ("count", np.int64),  # prices observed so far
+                ("prices", np.float64, (window,)),
+                ("returns", np.float64, (window,)),
+                ("price_sum", np.float64),
+                ("return_sum", np.float64),
+                ("return_sq_sum", np.float64),
+                ("ema", np.float64),
+                ("last_price", np.float64),
+                ("features", np.float64, (len(FEATURE_NAMES),)),
+            ]
+        )
+        self._index_path = self.directory / INDEX_NAME
+        self._data_path = self.directory / DATA_NAME
+        self._lock = threading.Lock()
+        self._index_mtime = None
+        self._checked_at = 0.0
+        self._slots: Dict[str, int] = {}
+        self.capacity = 0
+        self._records = None
+        self._open(capacity)
+
+    @classmethod
+    def from_settings(cls, settings) -> Optional["FeatureStore"]:
+        if not settings.feature_store_enabled:
+            return None
+        return cls(
+            settings.feature_store_dir,
+            window=settings.feature_window,
+            ema_span=settings.feature_ema_span,
+            capacity=settings.feature_store_capacity,
+        )
+
+    def _layout(self) -> Dict[str, Any]:
+        return {
+            "format_version": FORMAT_VERSION,
+            "window": self.window,
+            "ema_span": self.ema_span,
+            "record_size": self.dtype.itemsize,
+        }
+
+    def _open(self, capacity: int):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        index = self._read_index()
+        if index is not None and self._data_path.is_file():
+            self._slots = index["symbols"]
+            self._map(index["capacity"])
+            logger.info("Feature store opened with %d symbols", len(self._slots))
+            return
+
+        # No usable store yet (or its layout changed), start an empty one
+        self._slots = {}
+        self._resize_file(capacity)
+        self._map(capacity)
+        self._write_index()
+
+    def _read_index(self) -> Optional[Dict[str, Any]]:
+        try:
+            self._index_mtime = self._index_path.stat().st_mtime_ns
+            with open(self._index_path, "r") as file:
+                index = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if index.get("layout") != self._layout():
+            logger.warning("Feature store layout changed, starting from an empty store")
+            return None
+        return index
+
+    def _write_index(self):
+        index = {"layout": self._layout(), "capacity": self.capacity, "symbols": self._slots}
+        tmp_path = self._index_path.with_name(f".{INDEX_NAME}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as file:
+            json.dump(index, file)
+        os.replace(tmp_path, self._index_path)
+        self._index_mtime = self._index_path.stat().st_mtime_ns
+
+    def _resize_file(self, capacity: int):
+        # Growing a file keeps its content, and the new tail reads as zeros
+        with open(self._data_path, "ab") as file:
+            file.truncate(capacity * self.dtype.itemsize)
+
+    def _map(self, capacity: int):
+        self._records = np.memmap(self._data_path, dtype=self.dtype, mode="r+", shape=(capacity,))
+        self.capacity = capacity
+        # Field views into the mapping, indexed by record
+        self._count = self._records["count"]
+        self._prices = self._records["prices"]
+        self._returns = self._records["returns"]
+        self._price_sum = self._records["price_sum"]
+        self._return_sum = self._records["return_sum"]
+        self._return_sq_sum = self._records["return_sq_sum"]
+        self._ema = self._records["ema"]
+        self._last_price = self._records["last_price"]
+        self._features = self._records["features"]
+
+    def _slot_for(self, name: str) -> Optional[int]:
+        slot = self._slots.get(name)
+        if slot is None:
+            self._refresh()
+            slot = self._slots.get(name)
+        return slot
+
+    def _refresh(self):
+        """
+        Picks up symbols added by another process (e.g. the API process when
+        this store belongs to a process-pool child).
+        """
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = self._index_path.stat().st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._index_mtime:
+            return
+        index = self._read_index()
+        if index is None:
+            return
+        if index["capacity"] != self.capacity:
+            self._map(index["capacity"])
+        self._slots = index["symbols"]
+
+    def _add_symbol(self, name: str) -> int:
+        slot = len(self._slots)
+        if slot >= self.capacity:
+            self._records.flush()
+            self._resize_file(self.capacity * 2)
+            self._map(self.capacity * 2)
+        self._slots = {**self._slots, name: slot}
+        self._write_index()
+        return slot
+
+    def observe(self, name: str, price: float) -> Dict[str, Any]:
+        """
+        Adds the latest price of `name` and returns its updated features.
+        Raises ValueError for prices that aren't finite and positive, which
+        would otherwise stay in the stored window.
+        """
+        if not (math.isfinite(price) and price > 0):
+            raise ValueError(f"Price of {name} must be finite and positive, got {price}")
+        with self._lock:
+            slot = self._slots.get(name)
+            if slot is None:
+                slot = self._add_symbol(name)
+
+            window = self.window
+            count = int(self._count[slot])
+            head = count % window
+            prices = self._prices[slot]
+            returns = self._returns[slot]
+            last_price = float(self._last_price[slot])
+            new_return = price / last_price - 1.0 if count else 0.0
+
+            # Drop the entries about to be overwritten from the running sums.
+            # The return slot holds a real return from the (window + 1)th price on.
+            price_sum = float(self._price_sum[slot]) + price
+            return_sum = float(self._return_sum[slot]) + new_return
+            return_sq_sum = float(self._return_sq_sum[slot]) + new_return * new_return
+            if count >= window:
+                price_sum -= prices[head]
+            if count > window:
+                return_sum -= returns[head]
+                return_sq_sum -= returns[head] * returns[head]
+            prices[head] = price
+            returns[head] = new_return
+            count += 1
+
+            if count % window == 0:
+                # Rebuild the sums from the buffers to shed accumulated rounding error
+                price_sum = float(prices.sum())
+                return_sum = float(returns.sum())
+                return_sq_sum = float(np.dot(returns, returns))
+
+            ema = price if count == 1 else self.alpha * price + (1.0 - self.alpha) * float(self._ema[slot])
+            price_count = min(count, window)
+            return_count = min(count - 1, window)
+            volatility = 0.0
+            if return_count > 1:
+                mean = return_sum / return_count
+                volatility = math.sqrt(max(return_sq_sum / return_count - mean * mean, 0.0))
+            oldest = prices[count % window] if count >= window else prices[0]
+
+            self._price_sum[slot] = price_sum
+            self._return_sum[slot] = return_sum
+            self._return_sq_sum[slot] = return_sq_sum
+            self._ema[slot] = ema
+            self._last_price[slot] = price
+            self._features[slot] = (
+                price_sum / price_count,
+                ema,
+                volatility,
+                new_return,
+                price / oldest - 1.0,
+            )
+            # Written last, so readers never see a new count with old features
+            self._count[slot] = count
+
+        return self.describe(name)
+
+    def features(self, name: str) -> Optional["np.ndarray"]:
+        """
+        The feature vector of `name` (ordered as FEATURE_NAMES) as a read-only
+        view into the store, or None for a symbol that was never observed.
+        """
+        slot = self._slot_for(name)
+        if slot is None:
+            return None
+        view = self._features[slot]
+        view.flags.writeable = False
+        return view
+
+    def lookup(self, names: List[str]) -> "np.ndarray":
+        """
+        Record numbers for `names`, -1 for symbols that were never observed.
+        Use them to index `matrix` for a whole batch at once.
+        """
+        slots = [self._slot_for(name) for name in names]
+        return np.array([-1 if slot is None else slot for slot in slots], dtype=np.int64)
+
+    @property
+    def matrix(self) -> "np.ndarray":
+        """
+        Feature vectors of all records, (capacity, len(FEATURE_NAMES)), as a view.
+        """
+        return self._features
+
+    def version(self, name: str) -> int:
+        """
+        Number of prices observed for `name`; changes with every update,
+        so it can key cached predictions.
+        """
+        slot = self._slot_for(name)
+        return 0 if slot is None else int(self._count[slot])
+
+    def describe(self, name: str) -> Optional[Dict[str, Any]]:
+        slot = self._slot_for(name)
+        if slot is None:
+            return None
+        values = dict(zip(FEATURE_NAMES, self._features[slot].tolist()))
+        return {"name": name, "observations": int(self._count[slot]), **values}
+
+    def stats(self):
+        return {
+            "symbols": len(self._slots),
+            "capacity": self.capacity,
+            "window": self.window,
+            "ema_span": self.ema_span,
+        }
+
+    def flush(self):
+        if self._records is not None:
+            self._records.flush()
@@ -0,0 +1,128 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+import threading
+import logging
+import time
+import uuid
+
+
+logger = logging.getLogger(__name__)
+
+
+class RetrainJob:
+    """
+    Tracks the progress of a single background retraining run.
+    """
+
+    def __init__(self):
+        self.job_id = uuid.uuid4().hex
+        self.status = "queued"
+        self.stage = None
+        self.stages = []
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    def enter_stage(self, name: str):
+        """
+        Marks the previous stage as finished and starts timing the next one.
+        Passed to AIModel.retrain as its progress callback.
+        """
+        now = time.time()
+        with self._lock:
+            self._finish_stage(now)
+            self.stage = name
+            self.stages.append({"name": name, "started_at": now, "duration_s": None})
+
+    def _finish_stage(self, now: float):
+        if self.stages and self.stages[-1]["duration_s"] is None:
+            self.stages[-1]["duration_s"] = round(now - self.stages[-1]["started_at"], 3)
+
+    def start(self):
+        with self._lock:
+            self.status = "running"
+            self.started_at = time.time()
+
+    def finish(self, result: Dict[str, Any]):
+        now = time.time()
+        with self._lock:
+            self._finish_stage(now)
+            self.stage = None
+            self.result = result
+            # "rejected": the candidate lost the backtest and the live model was kept
+            self.status = {"success": "succeeded", "rejected": "rejected"}.get(result.get("status"), "failed")
+            self.finished_at = now
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            end = self.finished_at or time.time()
+            return {
+                "job_id": self.job_id,
+                "status": self.status,
+                "stage": self.stage,
+                "stages": [dict(stage) for stage in self.stages],
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "elapsed_s": round(end - self.started_at, 3) if self.started_at else None,
+                "result": self.result,
+            }
+
+
+class RetrainJobManager:
+    """
+    Runs AIModel.retrain in a dedicated worker thread so the event loop keeps
+    serving requests. A thread (rather than a process) is used because the
+    retrained model has to be swapped into this process's AIModel.
+
+    Only one retrain runs at a time; submitting while a job is active returns
+    that job instead of queueing another one. `on_success` is called after a
+    new model has been swapped in.
+    """
+
+    def __init__(self, ai_model, max_history: int = 50, on_success=None):
+        self.ai_model = ai_model
+        self.on_success = on_success
+        self.max_history = max_history
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="retrain")
+        self._jobs: "OrderedDict[str, RetrainJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self) -> RetrainJob:
+        with self._lock:
+            for job in self._jobs.values():
+                if job.active:
+                    return job
+
+            job = RetrainJob()
+            self._jobs[job.job_id] = job
+            while len(self._jobs) > self.max_history:
+                self._jobs.popitem(last=False)
+
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[RetrainJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: RetrainJob):
+        job.start()
+        try:
+            result = self.ai_model.retrain(progress=job.enter_stage)
+            if result.get("status") == "success" and self.on_success is not None:
+                self.on_success()
+        except Exception as e:
+            logger.error("Retrain job %s crashed: %s", job.job_id, e)
+            result = {"status": "error", "message": f"Model retraining failed: {str(e)}"}
+        job.finish(result)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
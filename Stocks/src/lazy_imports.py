@@ -0,0 +1,41 @@
+from types import ModuleType
+import importlib.util
+import importlib
+import sys
+
+
+# Heavy libraries that modules import through lazy_import() and that the
+# startup "imports" phase loads for real, off the event loop
+HEAVY_MODULES = ("numpy",)
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Returns `name` as a module whose code only runs on first attribute access.
+
+    Importing the API then costs next to nothing, so uvicorn binds its port
+    straight away and the real import happens during the startup phases. A
+    module that is already imported is returned as-is.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named {name!r}")
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def preload_heavy_modules():
+    """
+    Finishes loading every module in HEAVY_MODULES.
+    """
+    for name in HEAVY_MODULES:
+        # Touching any attribute runs the deferred module code
+        getattr(importlib.import_module(name), "__name__")
@@ -0,0 +1,181 @@
+from logging.handlers import QueueHandler, QueueListener
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+import contextvars
+import itertools
+import logging
+import atexit
+import queue
+import json
+import time
+import uuid
+import sys
+
+
+# Request ID of the request currently being handled (None outside of requests)
+request_id_var: contextvars.ContextVar = contextvars.ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message",
+    "asctime",
+    "request_id",
+}
+
+_listener: Optional[QueueListener] = None
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread.
+    The stock handler formats the message in the calling thread; here the
+    caller only tags the record with its request ID and enqueues it.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_id = request_id_var.get()
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Renders each record as a single JSON line, including the request ID and
+    any structured fields passed through `extra=`.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "request_id"):
+            record.request_id = None
+        return super().format(record)
+
+
+def configure_logging(level: str = "INFO", fmt: str = "json"):
+    """
+    Routes all logging through a queue drained by a background listener, so
+    request handlers never block on writing to stderr. Safe to call more than
+    once; only the first call installs the pipeline.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    if fmt == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(
+            _TextFormatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+        )
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_DeferredQueueHandler(log_queue))
+    root.setLevel(level.upper())
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """
+    Flushes the queue and stops the listener thread.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class PayloadSampler:
+    """
+    Decides which request bodies get logged: one in every `every_n` requests.
+    0 disables payload logging, 1 logs every payload.
+    """
+
+    def __init__(self, every_n: int):
+        self.every_n = every_n
+        self._counter = itertools.count()
+
+    def should_log(self) -> bool:
+        if self.every_n <= 0:
+            return False
+        return next(self._counter) % self.every_n == 0
+
+
+class StageTimer:
+    """
+    Collects per-stage durations (in milliseconds) for a single request.
+    """
+
+    def __init__(self):
+        self.durations_ms: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations_ms[name] = round((time.perf_counter() - start) * 1000, 3)
+
+    def log_fields(self, payload: Any = None) -> Dict[str, Any]:
+        fields: Dict[str, Any] = {"durations_ms": self.durations_ms}
+        if payload is not None:
+            fields["payload"] = payload
+        return fields
+
+
+class RequestIdMiddleware:
+    """
+    Pure ASGI middleware that assigns every HTTP request an ID (taken from the
+    X-Request-ID header when the caller sends one), exposes it to log records
+    and echoes it back on the response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:128]
+                break
+        if not request_id:
+            request_id = uuid.uuid4().hex
+        header = (b"x-request-id", request_id.encode("latin-1"))
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [header]
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
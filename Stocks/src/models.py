@@ -1,112 +1,330 @@
 import time
 import random
-from typing import Dict, Any
+from typing import Callable, Dict, Any, List, Optional, Tuple
 import datetime
 import logging
 
+from src.artifacts import artifact_exists, load_artifact, write_artifact
+from src.backtest import Backtester
+from src.cache import PredictionCache, bucket
+from src.config import settings
+from src.features import FeatureStore
+from src.ingest import DataIngest
+from src.lazy_imports import lazy_import
+from src.registry import ModelRegistry
+from src.metrics import MODEL_LOAD_SECONDS, MODEL_PREDICT_SECONDS, RETRAIN_STAGE_SECONDS
+
+# NumPy is only imported for real during the startup "imports" phase
+np = lazy_import("numpy")
+
 
-# Configure Logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Columns read from the price history files in DATA_DIR (see src/ingest.py)
+PRICE_TEXT_COLUMNS = ("symbol",)
+PRICE_NUMERIC_COLUMNS = ("close",)
+FORECAST_HORIZON = 7
+
+
+def summarize_price_history(chunks) -> Dict[str, Any]:
+    """
+    Feature stage of the ingest pipeline for one price history file, with
+    rows in time order per symbol. Sums the h-day percentage moves of every
+    symbol for h = 1..FORECAST_HORIZON. Only the last FORECAST_HORIZON closes
+    of each symbol are carried from one chunk to the next.
+    """
+    sums = np.zeros(FORECAST_HORIZON)
+    counts = np.zeros(FORECAST_HORIZON, dtype=np.int64)
+    tails: Dict[str, Any] = {}
+    for chunk in chunks:
+        valid = chunk["close"] > 0
+        symbols, closes = chunk["symbol"][valid], chunk["close"][valid]
+        # Group rows by symbol; the stable sort keeps each symbol's time order
+        order = np.argsort(symbols, kind="stable")
+        symbols, closes = symbols[order], closes[order]
+        starts = np.flatnonzero(np.r_[True, symbols[1:] != symbols[:-1]])
+        ends = np.r_[starts[1:], len(symbols)]
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            symbol = symbols[start]
+            tail = tails.get(symbol, closes[:0])
+            series = np.concatenate([tail, closes[start:end]])
+            for h in range(1, FORECAST_HORIZON + 1):
+                # Only moves ending in this chunk; earlier ones were counted already
+                first = max(len(tail), h)
+                if len(series) > first:
+                    moves = series[first:] / series[first - h : len(series) - h] - 1.0
+                    sums[h - 1] += moves.sum()
+                    counts[h - 1] += len(moves)
+            tails[symbol] = series[-FORECAST_HORIZON:]
+    return {"sums": sums.tolist(), "counts": counts.tolist()}
+
 
 class AIModel:
     def __init__(self):
         self.model = None
         self.last_trained_at = None
+        self.cache = PredictionCache.from_settings(settings)
+        # Rolling per-symbol features fed by /observe (see src/features.py)
+        self.features = FeatureStore.from_settings(settings)
+        # Versions on disk, activation and rollback (see src/registry.py)
+        self.registry = ModelRegistry.from_settings(settings, self._read_artifact, self._save_artifact)
         self._load_model()  # Attempt to load an initial model
 
+    @classmethod
+    def for_backtest(cls, model: Dict[str, Any]) -> "AIModel":
+        """
+        An AIModel serving `model` as it is, without the result cache or the
+        live feature store, so a backtest only measures the model itself.
+        """
+        evaluator = cls.__new__(cls)
+        evaluator.model = model
+        evaluator.last_trained_at = model.get("trained_at")
+        evaluator.cache = None
+        evaluator.registry = None
+        evaluator.features = None
+        return evaluator
+
     def _load_model(self):
         """
         Placeholder for loading a pre-trained model from disk or a cloud storage.
         This would load your actual ML model artifact.
         """
 
-        logger.info("INFO: Attempting to load AI model...")
-        self.model = {"status": "dummy_model_loaded", "version": "1.0"}
-        self.last_trained_at = str(datetime.datetime.now()).split(".")[
-            0
-        ]  # Store current time as last trained time
+        logger.info("Attempting to load AI model...")
+        with MODEL_LOAD_SECONDS.time():
+            registry = self.registry
+            model = registry.load_active() if registry is not None else None
+            if model is None:
+                if artifact_exists(settings.model_artifact_dir):
+                    model = self._read_artifact(settings.model_artifact_dir)
+                else:
+                    # No saved artifact yet, start from the placeholder model
+                    model = self._build_model(version="1.0")
+                if registry is not None:
+                    # An empty registry starts out with this model as its first version
+                    model = registry.activate(registry.register(model))
+            self.model = model
+        self.last_trained_at = self.model.get("trained_at") or str(
+            datetime.datetime.now()
+        ).split(".")[0]  # Store current time as last trained time
         logger.info(
-            f"INFO: AI model loaded. Status: {self.model['status']}, Version: {self.model['version']}"
+            "AI model loaded. Status: %s, Version: %s",
+            self.model["status"],
+            self.model["version"],
         )
 
+    def _build_model(self, version: str, summaries: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Builds a complete model object without touching the live one.
+        Replace the body with your training code. NumPy arrays in the returned
+        dict are saved as the artifact's weights, everything else as metadata.
+        `summaries` are the per-file results of summarize_price_history, or
+        None when there is no data in DATA_DIR.
+        """
+        # Percentage move versus the current price for each forecast step
+        pct_changes = np.array([-0.03, -1.31, 0.52, 0.15, 0.57, 0.35, 0.83], dtype=np.float64)
+        status = "dummy_model_loaded"
+        if summaries:
+            sums = np.sum([summary["sums"] for summary in summaries], axis=0)
+            counts = np.sum([summary["counts"] for summary in summaries], axis=0)
+            seen = counts > 0
+            if seen.any():
+                # Average historical h-day move, keeping the placeholder where there is no data
+                pct_changes[seen] = np.round(sums[seen] / counts[seen] * 100.0, 2)
+                status = "trained_on_history"
+        return {
+            "status": status,
+            "version": version,
+            "pct_changes": pct_changes,
+        }
+
+    def _read_artifact(self, directory) -> Dict[str, Any]:
+        """
+        Opens a saved model artifact. The weight arrays are read-only views
+        into a memory map shared with every other worker process.
+        """
+        metadata, arrays = load_artifact(directory)
+        return {**metadata, **arrays}
+
+    def _save_artifact(self, model: Dict[str, Any], directory):
+        arrays = {key: value for key, value in model.items() if isinstance(value, np.ndarray)}
+        metadata = {key: value for key, value in model.items() if key not in arrays}
+        write_artifact(directory, metadata, arrays)
+
+    def _next_version(self) -> str:
+        versions = [self.model["version"]]
+        if self.registry is not None:
+            # Counts from the newest registered version, so labels stay unique after a rollback
+            versions += [entry["version"] for entry in self.registry.versions()]
+        major, minor = max(
+            (int(major), int(minor or 0))
+            for major, _, minor in (str(version).partition(".") for version in versions)
+            if major.isdigit() and (minor or "0").isdigit()
+        )
+        return f"{major}.{minor + 1}"
+
+    def activate(self, version_id: str) -> Dict[str, Any]:
+        """
+        Serves a registered version from now on. A version that is still
+        loaded (warm) is swapped in without touching the disk.
+        """
+        warm = self.registry.is_warm(version_id)
+        self._swap(self.registry.activate(version_id))
+        return {"version_id": version_id, "version": self.model["version"], "warm": warm}
+
+    def rollback(self) -> Dict[str, Any]:
+        """
+        Goes back to the version that was active before the current one.
+        """
+        self._swap(self.registry.rollback())
+        return {"version_id": self.model["version_id"], "version": self.model["version"], "warm": True}
+
+    def _swap(self, model: Dict[str, Any]):
+        self.model = model
+        self.last_trained_at = model.get("trained_at") or self.last_trained_at
+        logger.info("Now serving model version %s (%s)", model["version"], model["version_id"])
+
     def predict(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Placeholder for making predictions using the loaded AI model.
         This will contain your actual prediction logic.
         """
 
-        logger.info(f"INFO: Making prediction with data: {data}")
+        logger.debug("Making prediction with data: %s", data)
+
+        with MODEL_PREDICT_SECONDS.labels("predict").time():
+            # The key carries the model version, so a finished retrain
+            # automatically stops serving results from the previous model
+            model = self.model if self.registry is None else self.registry.route(self.model)
+            cache_key = None
+            if self.cache is not None:
+                cache_key = (
+                    model.get("version_id", model["version"]),
+                    data["name"],
+                    data["date"],
+                    bucket(data["current_price"], settings.cache_price_tolerance),
+                    # New observations change the features, and so the forecast
+                    self.features.version(data["name"]) if self.features is not None else 0,
+                )
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    return cached
+
+            result = self._predict_batch([data], model)[0]
+            if cache_key is not None:
+                self.cache.put(cache_key, result)
+            return result
+
+    def predict_batch(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Makes predictions for many symbols at once.
+        Every symbol's forecast series is computed in a single NumPy pass over
+        an (n_symbols, horizon) matrix; only building the response dicts loops.
+        """
+        with MODEL_PREDICT_SECONDS.labels("predict_batch").time():
+            return self._predict_batch(data)
+
+    def predict_routed(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Predictions for rows that arrived as separate /predict calls (the
+        micro-batcher's batches). Like predict(), each row goes to the active
+        model or the canary; the rows of each model then run as one batch.
+        """
+        with MODEL_PREDICT_SECONDS.labels("predict_routed").time():
+            if self.registry is None:
+                return self._predict_batch(data)
+            active = self.model
+            groups: Dict[str, Tuple[Dict[str, Any], List[int]]] = {}
+            for index in range(len(data)):
+                model = self.registry.route(active)
+                groups.setdefault(model.get("version_id", model["version"]), (model, []))[1].append(index)
+            results: List[Optional[Dict[str, Any]]] = [None] * len(data)
+            for model, indices in groups.values():
+                for index, result in zip(indices, self._predict_batch([data[index] for index in indices], model)):
+                    results[index] = result
+            return results
+
+    def _predict_batch(self, data: List[Dict[str, Any]], model: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        logger.debug("Making batch prediction for %d symbols", len(data))
+        if not data:
+            return []
+
+        # Grab the model once so a concurrent retrain can't swap it mid-batch
+        model = model or self.model
+        pct_changes = model["pct_changes"]
+        horizon = len(pct_changes)
+
+        current_prices = np.fromiter(
+            (row["current_price"] for row in data), dtype=np.float64, count=len(data)
+        )
+        dates = np.array([row["date"] for row in data], dtype="datetime64[D]")
+
+        # Here the forecast simply applies the model's step changes to the current price,
+        # tilted by the EMA/SMA trend of symbols that have observed prices.
+        # In a real scenario, you would run your model over the whole input matrix here
+        steps = np.arange(1, horizon + 1)
+        step_changes = np.broadcast_to(pct_changes, (len(data), horizon))
+        if self.features is not None:
+            slots = self.features.lookup([row["name"] for row in data])
+            observed = slots >= 0
+            if observed.any():
+                sma, ema = self.features.matrix[slots[observed], :2].T
+                trend_pct = (ema / sma - 1.0) * 100.0
+                step_changes = step_changes.copy()
+                step_changes[observed] += trend_pct[:, None] * steps[None, :] / horizon
+        prices = current_prices[:, None] * (1.0 + step_changes / 100.0)
+        pct = np.round((prices / current_prices[:, None] - 1.0) * 100.0, 2)
+        directions = np.where(pct >= 0, "UP", "DOWN")
+
+        # Forecasts land on the following business days. Most batches share a
+        # date, so the timestamp strings are only formatted once per unique date.
+        unique_dates, date_index = np.unique(dates, return_inverse=True)
+        forecast_days = np.busday_offset(
+            unique_dates[:, None], steps[None, :], roll="backward"
+        )
+        timestamps = [
+            [f"{day}T00:00:00" for day in row] for row in forecast_days.tolist()
+        ]
+
+        prediction_timestamp = datetime.datetime.now(datetime.timezone.utc).strftime(
+            "%Y-%m-%dT%H:%M:%S.%fZ"
+        )
+        prices = prices.tolist()
+        pct = pct.tolist()
+        directions = directions.tolist()
+        date_index = date_index.reshape(-1).tolist()
 
-        # Here is a hard coded response simulating a prediction 
-        # In a real scenario, you would use the model to make predictions based on the input data
         # Your response should follow the structure defined here
-        return {
-            "prediction_timestamp": "2025-08-12T07:41:42.236533Z",
-            "predictions": [
+        results = []
+        for i, row in enumerate(data):
+            row_timestamps = timestamps[date_index[i]]
+            results.append(
                 {
-                    "name": "Model GPT",  # Name your name
-                    "description": "Stock price forecast with 7-day horizon.",  # Describe your model
-                    "horizon": 7,
-                    "frequency": 1,
-                    "stock_name": "S&P 500",  # Which index/stock are you predicting?
-                    "forecasts": [
+                    "prediction_timestamp": prediction_timestamp,
+                    "predictions": [
                         {
-                            "timestamp": "2025-08-11T00:00:00",
-                            "forecast_index": 1,
-                            "price": 637.0087458737507,
-                            "pct_change": -0.03,
-                            "direction": "DOWN",
-                        },
-                        {
-                            "timestamp": "2025-08-12T00:00:00",
-                            "forecast_index": 2,
-                            "price": 628.8247751970202,
-                            "pct_change": -1.31,
-                            "direction": "DOWN",
-                        },
-                        {
-                            "timestamp": "2025-08-13T00:00:00",
-                            "forecast_index": 3,
-                            "price": 640.4971446347408,
-                            "pct_change": 0.52,
-                            "direction": "UP",
-                        },
-                        {
-                            "timestamp": "2025-08-14T00:00:00",
-                            "forecast_index": 4,
-                            "price": 638.1062217748986,
-                            "pct_change": 0.15,
-                            "direction": "UP",
-                        },
-                        {
-                            "timestamp": "2025-08-15T00:00:00",
-                            "forecast_index": 5,
-                            "price": 640.8362960967352,
-                            "pct_change": 0.57,
-                            "direction": "UP",
-                        },
-                        {
-                            "timestamp": "2025-08-18T00:00:00",
-                            "forecast_index": 6,
-                            "price": 639.421582551462,
-                            "pct_change": 0.35,
-                            "direction": "UP",
-                        },
-                        {
-                            "timestamp": "2025-08-19T00:00:00",
-                            "forecast_index": 7,
-                            "price": 642.4778955136717,
-                            "pct_change": 0.83,
-                            "direction": "UP",
-                        },
+                            "name": "Model GPT",  # Name your name
+                            "description": "Stock price forecast with 7-day horizon.",  # Describe your model
+                            "horizon": horizon,
+                            "frequency": 1,
+                            "stock_name": row["name"],  # Which index/stock are you predicting?
+                            "forecasts": [
+                                {
+                                    "timestamp": row_timestamps[step],
+                                    "forecast_index": step + 1,
+                                    "price": prices[i][step],
+                                    "pct_change": pct[i][step],
+                                    "direction": directions[i][step],
+                                }
+                                for step in range(horizon)
+                            ],
+                        }
                     ],
                 }
-            ],
-        }
+            )
+        return results
 
-    def retrain(self):
+    def retrain(self, progress: Optional[Callable[[str], None]] = None):
         """
         Placeholder for the AI model retraining logic.
         This would involve:
@@ -116,41 +334,116 @@ class AIModel:
         4. Evaluating the model.
         5. Saving the new model artifact.
         6. Updating the loaded model in memory (or triggering a reload).
+
+        `progress` is called with the name of each stage as it starts.
+        The new model is built next to the live one and swapped in with a
+        single assignment, so concurrent predictions never see a partial model.
         """
-        logger.info("INFO: Starting AI model retraining process...")
+
+        current = {"stage": None, "started": 0.0}
+
+        def enter(stage: Optional[str]):
+            # Closes the timing of the previous stage and starts the next one
+            now = time.perf_counter()
+            if current["stage"] is not None:
+                RETRAIN_STAGE_SECONDS.labels(current["stage"]).observe(now - current["started"])
+            current["stage"], current["started"] = stage, now
+            if stage is not None and progress is not None:
+                progress(stage)
+
+        logger.info("Starting AI model retraining process...")
         try:
-            # Simulate data sourcing
-            logger.info("INFO: Sourcing historical or new data...")
-            time.sleep(2)  # Simulate network/DB call
+            # Find the history files in DATA_DIR that changed since the last run
+            enter("sourcing")
+            ingest = DataIngest.from_settings(
+                settings, PRICE_NUMERIC_COLUMNS, PRICE_TEXT_COLUMNS, summarize_price_history
+            )
+            if ingest is not None:
+                logger.info("Sourcing historical data from %s...", settings.data_dir)
+                data_files = ingest.scan()
+            else:
+                logger.info("Sourcing historical or new data...")
+                time.sleep(2)  # Simulate network/DB call
 
-            # Simulate data preprocessing
-            logger.info("INFO: Preprocessing data...")
-            time.sleep(1)
+            # Stream the changed files through parse -> clean -> feature
+            enter("preprocessing")
+            logger.info("Preprocessing data...")
+            if ingest is not None:
+                summaries = ingest.run(data_files)
+            else:
+                summaries = None
+                time.sleep(1)
 
             # Simulate model training
-            logger.info("INFO: Training new model version...")
+            enter("training")
+            logger.info("Training new model version...")
             time.sleep(5)  # This could be a long-running process
+            candidate = self._build_model(version=self._next_version(), summaries=summaries)
 
-            # Simulate model evaluation (e.g., checking performance metrics)
-            logger.info("INFO: Evaluating new model...")
-            time.sleep(1)
+            # Replay the history through both models; keep the live one if it forecasts better
+            enter("evaluation")
+            backtester = Backtester.from_settings(settings)
+            if backtester is not None:
+                logger.info("Backtesting new model against version %s...", self.model["version"])
+                scores = backtester.evaluate({"live": self.model, "candidate": candidate})
+            else:
+                logger.info("Evaluating new model...")
+                scores = {}
+                time.sleep(1)
+            if scores and scores["candidate"]["score"] < scores["live"]["score"] - settings.backtest_tolerance:
+                enter(None)
+                logger.warning(
+                    "Keeping version %s: candidate %s scored %.4f in the backtest against %.4f",
+                    self.model["version"],
+                    candidate["version"],
+                    scores["candidate"]["score"],
+                    scores["live"]["score"],
+                )
+                candidate_id = None
+                if self.registry is not None:
+                    # Kept as an inactive version, e.g. to try it as a canary
+                    candidate["trained_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+                    candidate_id = self.registry.register(candidate)
+                return {
+                    "status": "rejected",
+                    "message": f"Candidate scored below the live model in the backtest, keeping version {self.model['version']}.",
+                    "version": self.model["version"],
+                    "candidate_version_id": candidate_id,
+                    "backtest": scores,
+                }
 
-            # Simulate saving the new model artifact
-            logger.info("INFO: Saving new model artifact...")
-            # In a real scenario, you'd save to a persistent volume, cloud storage (GCS, S3), etc.
-            time.sleep(0.5)
+            # Save the new model artifact and reopen it memory-mapped
+            enter("saving")
+            logger.info("Saving new model artifact...")
+            # In a real scenario you may also push it to a persistent volume, cloud storage (GCS, S3), etc.
+            candidate["trained_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+            if self.registry is not None:
+                candidate = self.registry.load(self.registry.register(candidate))
+            else:
+                self._save_artifact(candidate, settings.model_artifact_dir)
+                candidate = self._read_artifact(settings.model_artifact_dir)
 
-            # Update the in-memory model (or trigger a reload mechanism)
-            self._load_model()  # Reloads the dummy model for this example
+            # Swap the fully built model in; readers hold on to whichever
+            # reference they grabbed before this line.
+            enter("swapping")
+            if self.registry is not None:
+                self.registry.activate(candidate["version_id"])
+            self.model = candidate
             self.last_trained_at = time.time()
+            enter(None)
             logger.info(
-                f"INFO: AI model retraining complete. New model loaded at {time.ctime(self.last_trained_at)}"
+                "AI model retraining complete. Version %s loaded at %s",
+                candidate["version"],
+                time.ctime(self.last_trained_at),
             )
             return {
                 "status": "success",
                 "message": "Model retrained and loaded successfully.",
+                "version": candidate["version"],
+                "version_id": candidate.get("version_id"),
                 "last_trained_at": time.ctime(self.last_trained_at),
+                "backtest": scores or None,
             }
         except Exception as e:
-            logger.error(f"ERROR: Model retraining failed: {e}")
+            logger.error("Model retraining failed: %s", e)
             return {"status": "error", "message": f"Model retraining failed: {str(e)}"}
@@ -0,0 +1,280 @@
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+import threading
+import hashlib
+import logging
+import random
+import shutil
+import json
+import os
+import re
+
+from src.artifacts import MANIFEST_NAME, artifact_exists, write_atomic
+from src.metrics import MODEL_VERSION_PREDICTIONS
+
+
+logger = logging.getLogger(__name__)
+
+# On-disk registry layout:
+#
+#   <registry_dir>/versions/<version_id>/   one artifact per version (see src/artifacts.py)
+#   <registry_dir>/registry.json            active version, activation history and canary
+#
+# A version ID is a hash of the artifact's manifest (metadata plus weights
+# hash), so registering the same model twice yields the same version, and a
+# version directory is never modified once it's in place.
+
+STATE_NAME = "registry.json"
+VERSION_ID = re.compile(r"[0-9a-f]{16}")
+MAX_HISTORY = 50
+
+
+def _content_id(directory: Path) -> str:
+    with open(directory / MANIFEST_NAME, "r") as file:
+        manifest = json.load(file)
+    content = {key: manifest[key] for key in ("metadata", "weights_sha256", "arrays")}
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+class ModelRegistry:
+    """
+    Immutable, content-addressed model versions on disk, plus a small LRU of
+    loaded ones.
+
+    Loaded versions stay warm in memory (up to `cache_size` of them), so
+    activating or rolling back to one of them is a reference swap; a cold
+    version costs one artifact load, which maps the weights rather than
+    reading them. The active version, the history of previously active ones
+    (what rollback() goes back through) and the canary are kept in
+    registry.json, so a restart or a new process-pool child serves the
+    same versions.
+
+    With a canary set, route() hands that version `percent` % of the calls
+    instead of the active one, and counts the calls each version served in
+    model_version_predictions_total.
+    """
+
+    def __init__(
+        self,
+        directory,
+        read: Callable[[Path], Dict[str, Any]],
+        write: Callable[[Dict[str, Any], Path], None],
+        cache_size: int = 3,
+        max_versions: int = 20,
+    ):
+        self.directory = Path(directory)
+        self.versions_dir = self.directory / "versions"
+        self.read = read
+        self.write = write
+        self.cache_size = cache_size
+        self.max_versions = max_versions
+        self._loaded: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._state = self._read_state()
+        # The canary is pinned here, so the LRU can't evict it while it serves
+        self._canary: Optional[Dict[str, Any]] = None
+        self._canary_percent = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_settings(cls, settings, read, write) -> Optional["ModelRegistry"]:
+        if not settings.model_registry_enabled:
+            return None
+        return cls(
+            settings.model_artifact_dir,
+            read,
+            write,
+            cache_size=settings.model_registry_cache_size,
+            max_versions=settings.model_registry_max_versions,
+        )
+
+    def _read_state(self) -> Dict[str, Any]:
+        try:
+            with open(self.directory / STATE_NAME, "r") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {"active": None, "history": [], "canary": None}
+
+    def _save_state(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        write_atomic(self.directory / STATE_NAME, json.dumps(self._state, indent=2).encode("utf-8"))
+
+    @property
+    def active(self) -> Optional[str]:
+        return self._state["active"]
+
+    def register(self, model: Dict[str, Any]) -> str:
+        """
+        Saves `model` as a new version, unless the same content is already
+        registered, and returns its version ID. Doesn't activate it.
+        """
+        with self._lock:
+            self.versions_dir.mkdir(parents=True, exist_ok=True)
+            staging = self.versions_dir / f".staging-{os.getpid()}-{threading.get_ident()}"
+            shutil.rmtree(staging, ignore_errors=True)
+            self.write({key: value for key, value in model.items() if key != "version_id"}, staging)
+            version_id = _content_id(staging)
+            target = self.versions_dir / version_id
+            try:
+                # Atomic: readers see either no version or the complete one
+                os.rename(staging, target)
+            except OSError:
+                if not artifact_exists(target):
+                    raise
+                shutil.rmtree(staging, ignore_errors=True)  # Same content, already registered
+            self._prune()
+            logger.info("Registered model version %s (%s)", version_id, model.get("version"))
+            return version_id
+
+    def load(self, version_id: str) -> Dict[str, Any]:
+        """
+        Returns a registered version, from the LRU if it's warm. Raises
+        KeyError for unknown versions.
+        """
+        with self._lock:
+            model = self._loaded.get(version_id)
+            if model is not None:
+                self._loaded.move_to_end(version_id)
+                self.hits += 1
+                return model
+            directory = self.versions_dir / version_id
+            if not VERSION_ID.fullmatch(version_id) or not artifact_exists(directory):
+                raise KeyError(f"Unknown model version: {version_id}")
+            model = {**self.read(directory), "version_id": version_id}
+            self.misses += 1
+            self._loaded[version_id] = model
+            while len(self._loaded) > self.cache_size:
+                self._loaded.popitem(last=False)
+            return model
+
+    def is_warm(self, version_id: str) -> bool:
+        return version_id in self._loaded
+
+    def load_active(self) -> Optional[Dict[str, Any]]:
+        """
+        The active version and the canary as recorded on disk, or None when
+        nothing was activated yet.
+        """
+        canary = self._state["canary"]
+        if canary is not None:
+            try:
+                self._canary, self._canary_percent = self.load(canary["version_id"]), canary["percent"]
+            except KeyError:
+                logger.warning("Canary version %s is gone, dropping it", canary["version_id"])
+                self.clear_canary()
+        if self.active is None:
+            return None
+        return self.load(self.active)
+
+    def activate(self, version_id: str) -> Dict[str, Any]:
+        """
+        Makes `version_id` the active version and returns it. The previous
+        active version goes onto the rollback history.
+        """
+        with self._lock:
+            model = self.load(version_id)
+            previous = self.active
+            history = [entry for entry in self._state["history"] if entry != version_id]
+            if previous is not None and previous != version_id:
+                history.append(previous)
+            self._state["history"] = history[-MAX_HISTORY:]
+            self._state["active"] = version_id
+            self._save_state()
+            return model
+
+    def rollback(self) -> Dict[str, Any]:
+        """
+        Reactivates the version that was active before the current one.
+        Raises LookupError when there is none left.
+        """
+        with self._lock:
+            history = self._state["history"]
+            while history:
+                version_id = history.pop()
+                try:
+                    model = self.load(version_id)
+                except KeyError:
+                    continue  # Pruned in the meantime
+                self._state["active"] = version_id
+                self._save_state()
+                return model
+            self._save_state()
+            raise LookupError("No previous model version to roll back to")
+
+    def set_canary(self, version_id: str, percent: float) -> Dict[str, Any]:
+        with self._lock:
+            model = self.load(version_id)
+            self._canary, self._canary_percent = model, percent
+            self._state["canary"] = {"version_id": version_id, "percent": percent}
+            self._save_state()
+            return model
+
+    def clear_canary(self):
+        with self._lock:
+            self._canary, self._canary_percent = None, 0.0
+            self._state["canary"] = None
+            self._save_state()
+
+    def route(self, active: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        The model one call should use: the canary for `percent` % of the
+        calls, `active` for the rest.
+        """
+        canary = self._canary
+        if canary is None:
+            return active
+        model = canary if random.random() * 100.0 < self._canary_percent else active
+        MODEL_VERSION_PREDICTIONS.labels(model.get("version_id", model["version"])).inc()
+        return model
+
+    def versions(self) -> List[Dict[str, Any]]:
+        """
+        Every registered version, newest first.
+        """
+        if not self.versions_dir.is_dir():
+            return []
+        canary = self._state["canary"] or {}
+        versions = []
+        for directory in self.versions_dir.iterdir():
+            if directory.name.startswith(".") or not artifact_exists(directory):
+                continue
+            with open(directory / MANIFEST_NAME, "r") as file:
+                metadata = json.load(file)["metadata"]
+            versions.append(
+                {
+                    "version_id": directory.name,
+                    "version": metadata.get("version"),
+                    "status": metadata.get("status"),
+                    "trained_at": metadata.get("trained_at"),
+                    "registered_at": (directory / MANIFEST_NAME).stat().st_mtime,
+                    "active": directory.name == self.active,
+                    "canary_percent": canary.get("percent") if directory.name == canary.get("version_id") else None,
+                    "warm": self.is_warm(directory.name),
+                }
+            )
+        versions.sort(key=lambda version: version["registered_at"], reverse=True)
+        return versions
+
+    def _prune(self):
+        # Drops the oldest versions beyond max_versions, except the ones in use
+        versions = self.versions()
+        if len(versions) <= self.max_versions:
+            return
+        keep = {self.active, *self._state["history"], (self._state["canary"] or {}).get("version_id")}
+        for version in versions[self.max_versions:]:
+            if version["version_id"] in keep:
+                continue
+            self._loaded.pop(version["version_id"], None)
+            shutil.rmtree(self.versions_dir / version["version_id"], ignore_errors=True)
+
+    def stats(self):
+        return {
+            "active": self.active,
+            "canary": self._state["canary"],
+            "rollback_depth": len(self._state["history"]),
+            "warm": list(self._loaded),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -1,5 +1,7 @@
 from typing import Optional
-from pydantic import BaseModel, Field
+import datetime
+
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 
 # These schemas are used to ensure the request and response formats for the API endpoints are well-defined.
@@ -9,8 +11,49 @@ from pydantic import BaseModel, Field
 # Request Schema for /predict
 class PredictionRequest(BaseModel):
     name: str = Field(..., description="Name of the stock")
-    date: str = Field(..., description="Date of the prediction in YYYY-MM-DD format")
-    current_price: float = Field(..., description="Current price of the stock")
+    date: str = Field(
+        ..., pattern=r"^\d{4}-\d{2}-\d{2}$", description="Date of the prediction in YYYY-MM-DD format"
+    )
+    current_price: float = Field(..., gt=0, allow_inf_nan=False, description="Current price of the stock")
+
+    @field_validator("date")
+    @classmethod
+    def check_date(cls, value: str) -> str:
+        # The pattern alone lets impossible dates such as 2025-02-30 through
+        datetime.date.fromisoformat(value)
+        return value
+
+    # Shown in the OpenAPI docs and used for the startup warmup calls (see src/startup.py)
+    model_config = ConfigDict(
+        json_schema_extra={
+            "examples": [
+                {"name": "aapl", "date": "2025-04-10", "current_price": 202.38},
+                {"name": "msft", "date": "2025-04-10", "current_price": 381.35},
+                {"name": "nvda", "date": "2025-04-10", "current_price": 107.57},
+            ]
+        }
+    )
+
+
+# Request Schema for /observe
+class ObservationRequest(BaseModel):
+    name: str = Field(..., description="Name of the stock, as sent to /predict")
+    price: float = Field(..., gt=0, allow_inf_nan=False, description="Latest observed price of the stock")
+
+
+# Response Schema for /observe: the symbol's rolling features after the update
+class ObservationResponse(BaseModel):
+    name: str = Field(..., description="Name of the stock")
+    observations: int = Field(..., description="Number of prices observed so far")
+    sma: float = Field(..., allow_inf_nan=False, description="Simple moving average of the price window")
+    ema: float = Field(..., allow_inf_nan=False, description="Exponential moving average of the price")
+    volatility: float = Field(
+        ..., description="Standard deviation of the returns in the window"
+    )
+    last_return: float = Field(..., description="Return since the previous price")
+    window_return: float = Field(
+        ..., description="Return since the oldest price in the window"
+    )
 
 
 # Lets correct the schema for the prediction response.
@@ -35,7 +78,7 @@ class PredictionRequest(BaseModel):
 class Forecast(BaseModel):
     timestamp: str = Field(..., description="Timestamp of the forecast")
     forecast_index: int = Field(..., description="Index of the forecast")
-    price: float = Field(..., description="Predicted stock price")
+    price: float = Field(..., allow_inf_nan=False, description="Predicted stock price")
     pct_change: float = Field(
         ..., description="Percentage change from the previous price"
     )
@@ -60,3 +103,30 @@ class PredictionResponse(BaseModel):
     predictions: list[Prediction] = Field(
         ..., description="List of predictions with details"
     )
+
+
+# Response Schema for /models
+class ModelVersion(BaseModel):
+    version_id: str = Field(..., description="Content hash identifying the version")
+    version: Optional[str] = Field(None, description="Version label, e.g. 1.3")
+    status: Optional[str] = Field(None, description="Status the model was saved with")
+    trained_at: Optional[str] = Field(None, description="When the version was trained")
+    registered_at: float = Field(..., description="Unix time the version was registered")
+    active: bool = Field(..., description="Whether the version serves /predict")
+    canary_percent: Optional[float] = Field(
+        None, description="Share of /predict calls the version serves as a canary"
+    )
+    warm: bool = Field(..., description="Whether the version is loaded in memory")
+
+
+# Response Schema for /models/{version_id}/activate and /models/rollback
+class ActivationResponse(BaseModel):
+    version_id: str = Field(..., description="Content hash of the version now active")
+    version: str = Field(..., description="Version label of the version now active")
+    warm: bool = Field(..., description="Whether it was swapped in without loading from disk")
+
+
+# Request and response Schema for /models/canary
+class Canary(BaseModel):
+    version_id: str = Field(..., description="Version to route part of the /predict calls to")
+    percent: float = Field(..., gt=0, le=100, description="Share of /predict calls it serves")
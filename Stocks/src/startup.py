@@ -0,0 +1,92 @@
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Type
+import logging
+import time
+
+from pydantic import BaseModel
+
+from src.metrics import APP_READY, STARTUP_PHASE_SECONDS
+
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTracker:
+    """
+    Times the phases of bringing the API up and tracks whether it is ready
+    to serve. The phase timings are served by /ready and exported as the
+    startup_phase_seconds gauge.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.ready = False
+        self.current_phase: Optional[str] = None
+        self.failed_phase: Optional[str] = None
+        self.error: Optional[str] = None
+        self.phases: List[Dict[str, Any]] = []
+        self._start = time.perf_counter()
+        self._mark = self._start
+        APP_READY.set(0)
+
+    def record(self, name: str):
+        """
+        Records the time since the tracker was created, or since the previous
+        phase ended, as phase `name`.
+        """
+        now = time.perf_counter()
+        duration = now - self._mark
+        self._mark = now
+        self.phases.append({"name": name, "duration_ms": round(duration * 1000, 3)})
+        STARTUP_PHASE_SECONDS.labels(name).set(duration)
+        logger.info("Startup phase %s took %.1f ms", name, duration * 1000)
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Times the enclosed block as phase `name`. A phase that raises isn't
+        recorded as a finished one; it's remembered for fail() instead.
+        """
+        self._mark = time.perf_counter()
+        self.current_phase = name
+        try:
+            yield
+        except BaseException:
+            self.failed_phase = name
+            raise
+        else:
+            self.record(name)
+        finally:
+            self.current_phase = None
+
+    def mark_ready(self):
+        self.ready = True
+        APP_READY.set(1)
+        logger.info("Ready to serve after %.1f ms", (time.perf_counter() - self._start) * 1000)
+
+    def fail(self, exc: BaseException):
+        phase = self.failed_phase or "startup"
+        self.error = f"{phase} failed: {exc}"
+        logger.exception("Startup failed during %s", phase)
+
+    def to_dict(self):
+        return {
+            "ready": self.ready,
+            "phase": self.current_phase,
+            "error": self.error,
+            "started_at": self.started_at,
+            "total_ms": round(sum(phase["duration_ms"] for phase in self.phases), 3),
+            "phases": list(self.phases),
+        }
+
+
+def sample_requests(request_model: Type[BaseModel], count: int) -> List[Dict[str, Any]]:
+    """
+    Builds `count` request payloads for warmup calls from the examples
+    declared on `request_model`, validated like a real request would be.
+    """
+    examples = (request_model.model_config.get("json_schema_extra") or {}).get("examples") or []
+    if not examples:
+        raise ValueError(f"{request_model.__name__} declares no examples to warm up with")
+    payloads = [request_model.model_validate(example).model_dump() for example in examples]
+    return [payloads[index % len(payloads)] for index in range(count)]
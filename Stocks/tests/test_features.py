@@ -0,0 +1,71 @@
+import math
+
+import pytest
+
+from src.features import FeatureStore
+
+
+WINDOW = 4
+
+
+def expected_features(history, window=WINDOW, ema_span=20):
+    # Recomputes the features of a price history from scratch
+    alpha = 2.0 / (ema_span + 1)
+    prices = history[-window:]
+    returns = [current / previous - 1.0 for previous, current in zip(history, history[1:])][-window:]
+    ema = history[0]
+    for price in history[1:]:
+        ema = alpha * price + (1.0 - alpha) * ema
+    volatility = 0.0
+    if len(returns) > 1:
+        mean = sum(returns) / len(returns)
+        volatility = math.sqrt(sum((value - mean) ** 2 for value in returns) / len(returns))
+    return {
+        "sma": sum(prices) / len(prices),
+        "ema": ema,
+        "volatility": volatility,
+        "last_return": returns[-1] if returns else 0.0,
+        "window_return": history[-1] / prices[0] - 1.0,
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FeatureStore(tmp_path / "features", window=WINDOW, capacity=2, check_interval=0)
+
+
+def test_features_match_recomputation_across_wraparound(store):
+    history = [100.0, 101.5, 99.0, 102.25, 104.0, 103.0, 98.5, 97.0, 101.0, 105.5, 106.0]
+    for observed, price in enumerate(history, start=1):
+        described = store.observe("aapl", price)
+        assert described["observations"] == observed
+        for name, value in expected_features(history[:observed]).items():
+            assert described[name] == pytest.approx(value, rel=1e-9, abs=1e-12), (observed, name)
+
+
+def test_state_survives_reopening(store, tmp_path):
+    history = [10.0, 11.0, 12.5, 12.0, 13.0, 12.75]
+    for symbol in ("aapl", "msft", "nvda"):
+        for price in history:
+            store.observe(symbol, price)
+    assert store.capacity >= 3
+    store.flush()
+
+    reopened = FeatureStore(tmp_path / "features", window=WINDOW, capacity=2, check_interval=0)
+    assert reopened.version("nvda") == len(history)
+    reopened.observe("nvda", 14.0)
+    assert reopened.describe("nvda")["sma"] == pytest.approx(expected_features(history + [14.0])["sma"])
+    assert reopened.describe("aapl") == store.describe("aapl")
+
+
+@pytest.mark.parametrize("price", [0.0, -5.0, math.inf, -math.inf, math.nan])
+def test_observe_rejects_non_positive_or_non_finite_prices(store, price):
+    store.observe("aapl", 100.0)
+    with pytest.raises(ValueError):
+        store.observe("aapl", price)
+    with pytest.raises(ValueError):
+        store.observe("msft", price)
+    assert store.version("aapl") == 1
+    assert store.describe("aapl")["sma"] == 100.0
+    assert store.version("msft") == 0
+    assert store.stats()["symbols"] == 1
@@ -0,0 +1,32 @@
+import pytest
+from pydantic import ValidationError
+
+from src.schemas import ObservationRequest, PredictionRequest
+
+
+def prediction_json(current_price="202.38", date="2025-04-10"):
+    return f'{{"name": "aapl", "date": "{date}", "current_price": {current_price}}}'
+
+
+def test_valid_prediction_request():
+    request = PredictionRequest.model_validate_json(prediction_json())
+    assert request.current_price == 202.38
+    assert request.date == "2025-04-10"
+
+
+@pytest.mark.parametrize("current_price", ["0", "-1.5", "1e400", "-1e400", "NaN", "Infinity"])
+def test_prediction_request_rejects_non_positive_or_non_finite_prices(current_price):
+    with pytest.raises(ValidationError):
+        PredictionRequest.model_validate_json(prediction_json(current_price=current_price))
+
+
+@pytest.mark.parametrize("date", ["2025-02-30", "2025/04/10", "10-04-2025", "2025-4-1"])
+def test_prediction_request_rejects_invalid_dates(date):
+    with pytest.raises(ValidationError):
+        PredictionRequest.model_validate_json(prediction_json(date=date))
+
+
+@pytest.mark.parametrize("price", ["0", "-3", "1e400", "NaN"])
+def test_observation_rejects_non_positive_or_non_finite_prices(price):
+    with pytest.raises(ValidationError):
+        ObservationRequest.model_validate_json(f'{{"name": "aapl", "price": {price}}}')
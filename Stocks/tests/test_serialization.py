@@ -0,0 +1,126 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.exceptions import RequestValidationError
+from fastapi.testclient import TestClient
+
+from src.schemas import PredictionRequest, PredictionResponse
+from src.serialization import (
+    MSGPACK_MEDIA_TYPE,
+    MsgpackRoute,
+    PredictionSerializer,
+    decode_msgpack,
+    negotiate,
+    validation_error_response,
+)
+
+msgpack = pytest.importorskip("msgpack")
+
+
+RESULT = {
+    "prediction_timestamp": "2025-04-10T00:00:00",
+    "predictions": [
+        {
+            "name": "ARIMA",
+            "description": "Test model",
+            "horizon": 2,
+            "frequency": 1,
+            "stock_name": "aapl",
+            "forecasts": [
+                {"timestamp": "2025-04-11", "forecast_index": 1, "price": 203.5, "pct_change": 0.55, "direction": "UP"},
+                {"timestamp": "2025-04-12", "forecast_index": 2, "price": 201.25, "pct_change": -1.1, "direction": "DOWN"},
+            ],
+        }
+    ],
+}
+REQUEST = {"name": "aapl", "date": "2025-04-10", "current_price": 202.38}
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        (None, ("json", False)),
+        ("", ("json", False)),
+        ("*/*", ("json", False)),
+        ("application/json", ("json", False)),
+        ("application/msgpack", ("msgpack", False)),
+        ("application/x-msgpack", ("msgpack", False)),
+        ("Application/MsgPack", ("msgpack", False)),
+        ("application/msgpack; arrays=typed", ("msgpack", True)),
+        ("application/json, application/msgpack", ("msgpack", False)),
+        ("application/json;q=0.9, application/msgpack;q=0.5", ("json", False)),
+        ("application/json;q=0.5, application/msgpack;q=0.9; arrays=typed", ("msgpack", True)),
+        ("application/msgpack;q=0", ("json", False)),
+        ("application/msgpack;q=oops", ("json", False)),
+    ],
+)
+def test_negotiate(accept, expected):
+    assert negotiate(accept) == expected
+
+
+@pytest.mark.parametrize("typed_arrays", [False, True])
+def test_msgpack_round_trip(typed_arrays):
+    serializer = PredictionSerializer(PredictionResponse)
+    body = serializer.packb(RESULT, typed_arrays)
+    assert decode_msgpack(body) == RESULT
+    columns = decode_msgpack(body, rows=False)["predictions"][0]["forecasts"]
+    if typed_arrays:
+        assert columns["price"] == [203.5, 201.25]
+    else:
+        assert columns == RESULT["predictions"][0]["forecasts"]
+
+
+@pytest.mark.parametrize("validate", [False, True])
+def test_response_follows_the_accept_header(validate):
+    serializer = PredictionSerializer(PredictionResponse, backend="json", validate=validate)
+    as_json = serializer.response(RESULT, "application/json")
+    as_msgpack = serializer.response(RESULT, "application/msgpack; arrays=typed")
+    assert as_json.media_type == "application/json"
+    assert PredictionResponse.model_validate_json(as_json.body).model_dump() == RESULT
+    assert as_msgpack.media_type == MSGPACK_MEDIA_TYPE
+    assert decode_msgpack(as_msgpack.body) == RESULT
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.router.route_class = MsgpackRoute
+    app.add_exception_handler(RequestValidationError, validation_error_response)
+    serializer = PredictionSerializer(PredictionResponse)
+
+    @app.post("/predict")
+    async def predict(request: PredictionRequest):
+        return serializer.response(request.model_dump(), MSGPACK_MEDIA_TYPE)
+
+    return TestClient(app)
+
+
+def post_msgpack(client, body):
+    return client.post("/predict", content=body, headers={"content-type": MSGPACK_MEDIA_TYPE})
+
+
+def test_msgpack_request_body_is_validated_like_json(client):
+    response = post_msgpack(client, msgpack.packb(REQUEST))
+    assert response.status_code == 200
+    assert msgpack.unpackb(response.content) == REQUEST
+
+    invalid = post_msgpack(client, msgpack.packb({**REQUEST, "current_price": -1.0}))
+    assert invalid.status_code == 422
+
+
+def test_undecodable_msgpack_body_gets_400(client):
+    # A str header followed by invalid UTF-8
+    assert post_msgpack(client, b"\x81\xa4name\xa2\xff\xfe").status_code == 400
+    assert post_msgpack(client, b"\xc1").status_code == 400
+
+
+def test_bytes_in_a_string_field_get_422(client):
+    response = post_msgpack(client, msgpack.packb({**REQUEST, "name": b"\xff\x00"}, use_bin_type=True))
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize("price", ["1e400", "NaN", "-Infinity"])
+def test_non_finite_json_numbers_get_422(client, price):
+    body = f'{{"name": "aapl", "date": "2025-04-10", "current_price": {price}}}'
+    response = client.post("/predict", content=body, headers={"content-type": "application/json"})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "current_price"]
@@ -0,0 +1,26 @@
+from pathlib import Path
+import json
+import sys
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+TEMPLATES = ("Stocks", "Sports")
+
+
+def use_template(template: str) -> Path:
+    """
+    Makes `import src...` resolve to the given template. Both templates ship a
+    package called `src`, so a process can only import one of them.
+    """
+    if template not in TEMPLATES:
+        raise SystemExit(f"Unknown template {template!r}, expected one of {TEMPLATES}")
+    template_dir = REPO_ROOT / template
+    sys.path.insert(0, str(template_dir))
+    return template_dir
+
+
+def write_results(path, results):
+    if path:
+        with open(path, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"Results written to {path}")
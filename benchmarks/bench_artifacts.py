@@ -0,0 +1,93 @@
+"""
+Compares loading the memory-mapped model artifact (src/artifacts.py) with
+unpickling the same weights.
+
+    python benchmarks/bench_artifacts.py --megabytes 256 --repeat 5
+"""
+from pathlib import Path
+import argparse
+import statistics
+import tempfile
+import pickle
+import time
+
+from _common import use_template, write_results
+
+
+def _timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--template", default="Stocks", choices=["Stocks", "Sports"])
+    parser.add_argument("--megabytes", type=int, default=128, help="Total size of the weights")
+    parser.add_argument("--arrays", type=int, default=8, help="Number of weight arrays")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    use_template(args.template)
+    import numpy as np
+    from src.artifacts import load_artifact, write_artifact
+
+    rng = np.random.default_rng(0)
+    per_array = args.megabytes * 1024 * 1024 // 8 // args.arrays
+    arrays = {f"layer_{i}": rng.standard_normal(per_array) for i in range(args.arrays)}
+    metadata = {"status": "benchmark", "version": "bench"}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        artifact_dir = Path(tmp) / "artifact"
+        pickle_path = Path(tmp) / "model.pkl"
+
+        start = time.perf_counter()
+        write_artifact(artifact_dir, metadata, arrays)
+        write_artifact_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with open(pickle_path, "wb") as file:
+            pickle.dump({**metadata, **arrays}, file, protocol=pickle.HIGHEST_PROTOCOL)
+        write_pickle_s = time.perf_counter() - start
+
+        def load_pickle():
+            with open(pickle_path, "rb") as file:
+                return pickle.load(file)
+
+        def load_mmap():
+            return load_artifact(artifact_dir)
+
+        def load_mmap_and_touch():
+            _, loaded = load_artifact(artifact_dir)
+            return sum(float(array.sum()) for array in loaded.values())
+
+        results = {
+            "template": args.template,
+            "megabytes": args.megabytes,
+            "arrays": args.arrays,
+            "write_s": {"mmap": write_artifact_s, "pickle": write_pickle_s},
+            "load_s": {},
+        }
+        for name, function in (
+            ("pickle", load_pickle),
+            ("mmap_open", load_mmap),
+            ("mmap_open_and_read_all", load_mmap_and_touch),
+        ):
+            timings = _timed(function, args.repeat)
+            results["load_s"][name] = {
+                "median": statistics.median(timings),
+                "min": min(timings),
+            }
+
+    print(f"{args.megabytes} MB in {args.arrays} arrays (warm page cache, median of {args.repeat})")
+    for name, timing in results["load_s"].items():
+        print(f"  {name:<24} {timing['median'] * 1000:10.3f} ms")
+    write_results(args.json, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Compares the /predict response encoding paths: jsonable_encoder + JSONResponse
+(the original path) against src/serialization.py's backends.
+
+    python benchmarks/bench_serialization.py --template Stocks --iterations 20000
+"""
+import argparse
+import timeit
+
+from _common import use_template, write_results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--template", default="Stocks", choices=["Stocks", "Sports"])
+    parser.add_argument("--iterations", type=int, default=20_000)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    use_template(args.template)
+    import logging
+
+    logging.disable(logging.CRITICAL)
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from src.models import AIModel
+    from src.schemas import PredictionRequest, PredictionResponse
+    from src.serialization import PredictionSerializer, orjson
+
+    sample_request = {
+        "Stocks": {"name": "aapl", "date": "2025-04-10", "current_price": 202.38},
+        "Sports": {
+            "home_team": "Lions",
+            "away_team": "Sharks",
+            "home_team_odds_avg": 1.75,
+            "away_team_odds_avg": 2.20,
+        },
+    }[args.template]
+    result = AIModel().predict(PredictionRequest(**sample_request).model_dump())
+
+    paths = {
+        "jsonable_encoder+JSONResponse": lambda value: JSONResponse(content=jsonable_encoder(value)),
+        "validate+model_dump_json": PredictionSerializer(PredictionResponse, "pydantic", validate=True).response,
+        "pydantic_core.to_json": PredictionSerializer(PredictionResponse, "pydantic").response,
+        "json.dumps": PredictionSerializer(PredictionResponse, "json").response,
+    }
+    if orjson is not None:
+        paths["orjson"] = PredictionSerializer(PredictionResponse, "orjson").response
+
+    results = {"template": args.template, "iterations": args.iterations, "us_per_call": {}}
+    baseline = None
+    print(f"{args.template}: microseconds per response ({args.iterations} iterations)")
+    for name, function in paths.items():
+        elapsed = min(timeit.repeat(lambda: function(result), number=args.iterations, repeat=3))
+        per_call = elapsed / args.iterations * 1e6
+        baseline = baseline or per_call
+        results["us_per_call"][name] = per_call
+        print(f"  {name:<32} {per_call:8.2f} us   {baseline / per_call:5.1f}x")
+    write_results(args.json, results)
+
+
+if __name__ == "__main__":
+    main()
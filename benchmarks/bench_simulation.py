@@ -0,0 +1,60 @@
+"""
+Times the Sports score simulation (src/simulation.py) against drawing every
+simulated match one by one with NumPy's Poisson sampler, per slate size.
+
+    python benchmarks/bench_simulation.py --simulations 100000 --slates 1,10,100
+"""
+import argparse
+import timeit
+
+from _common import use_template, write_results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--simulations", type=int, default=100_000, help="Simulated matches per fixture")
+    parser.add_argument("--slates", default="1,10,100", help="Comma separated slate sizes")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    use_template("Sports")
+    import numpy as np
+    from src.simulation import OVER_UNDER_LINES, MatchSimulator
+
+    simulator = MatchSimulator(simulations=args.simulations, seed=1)
+    rng = np.random.default_rng(1)
+    lines = np.array(OVER_UNDER_LINES)
+
+    def draw_per_match(home_rates, away_rates, shared_rate):
+        # The straightforward version: one score draw per simulated match
+        for home_rate, away_rate in zip(home_rates, away_rates):
+            shared = rng.poisson(shared_rate, args.simulations)
+            home = rng.poisson(home_rate, args.simulations) + shared
+            away = rng.poisson(away_rate, args.simulations) + shared
+            ((home + away)[:, None] > lines[None, :]).mean(axis=0)
+
+    results = {"simulations": args.simulations, "ms_per_slate": {}}
+    print(f"Milliseconds per slate ({args.simulations} simulations per fixture)")
+    for size in [int(size) for size in args.slates.split(",")]:
+        home_rates = rng.uniform(0.8, 2.5, size)
+        away_rates = rng.uniform(0.6, 2.0, size)
+        timings = {}
+        for name, function in (
+            ("per-match draws", draw_per_match),
+            ("MatchSimulator", simulator.simulate),
+        ):
+            number = 1 if size >= 100 or name == "per-match draws" else 10
+            elapsed = min(timeit.repeat(lambda: function(home_rates, away_rates, 0.1), number=number, repeat=args.repeat))
+            timings[name] = elapsed / number * 1000
+        speedup = timings["per-match draws"] / timings["MatchSimulator"]
+        results["ms_per_slate"][str(size)] = timings
+        print(
+            f"  {size:>5} fixtures   per-match {timings['per-match draws']:10.2f} ms   "
+            f"simulator {timings['MatchSimulator']:8.3f} ms   {speedup:7.1f}x"
+        )
+    write_results(args.json, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Compares the JSON and msgpack wire formats (src/serialization.py) on batch
+payloads: response size, response encode and decode time, and request decode
+plus schema validation time.
+
+    python benchmarks/bench_wire_format.py --template Stocks --batch-size 100
+"""
+import argparse
+import timeit
+import json
+
+from _common import use_template, write_results
+
+
+def _time(function, iterations: int) -> float:
+    # Best of three, in microseconds per call
+    return min(timeit.repeat(function, number=iterations, repeat=3)) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--template", default="Stocks", choices=["Stocks", "Sports"])
+    parser.add_argument("--batch-size", type=int, default=100, help="Rows per batch payload")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    use_template(args.template)
+    import logging
+
+    logging.disable(logging.CRITICAL)
+    from pydantic import TypeAdapter
+    from src.models import AIModel
+    from src.schemas import PredictionRequest, PredictionResponse
+    from src.serialization import PredictionSerializer, decode_msgpack, msgpack, orjson
+
+    if msgpack is None:
+        raise SystemExit("msgpack is not installed: pip install msgpack")
+
+    examples = PredictionRequest.model_config["json_schema_extra"]["examples"]
+    requests = [examples[i % len(examples)] for i in range(args.batch_size)]
+    model = AIModel()
+    batch_method = model.predict_batch if args.template == "Stocks" else model.predict_many
+    results = batch_method(requests)
+
+    serializer = PredictionSerializer(PredictionResponse)
+    json_loads = orjson.loads if orjson is not None else json.loads
+    request_adapter = TypeAdapter(list[PredictionRequest])
+    json_request, msgpack_request = serializer.encode(requests), serializer.packb(requests)
+
+    formats = {
+        f"json ({serializer.backend})": (lambda: serializer.dumps_many(results), json_loads),
+        "msgpack": (lambda: serializer.packb(results), decode_msgpack),
+        # Typed-array clients read the forecast columns as they are
+        "msgpack, typed arrays": (
+            lambda: serializer.packb(results, typed_arrays=True),
+            lambda body: decode_msgpack(body, rows=False),
+        ),
+    }
+
+    report = {"template": args.template, "batch_size": args.batch_size, "formats": {}}
+    print(f"{args.template}: {args.batch_size} rows per payload, microseconds per payload")
+    print(f"  {'format':<24}{'bytes':>9}{'encode':>10}{'decode':>10}")
+    for name, (encode, decode) in formats.items():
+        body = encode()
+        row = {
+            "response_bytes": len(body),
+            "encode_us": _time(encode, args.iterations),
+            "decode_us": _time(lambda: decode(body), args.iterations),
+        }
+        report["formats"][name] = row
+        print(f"  {name:<24}{row['response_bytes']:>9}{row['encode_us']:>10.1f}{row['decode_us']:>10.1f}")
+
+    # What the API does with a request body: parse it, then validate the schema
+    report["request_decode_validate_us"] = {
+        "json": _time(lambda: request_adapter.validate_python(json_loads(json_request)), args.iterations),
+        "msgpack": _time(lambda: request_adapter.validate_python(decode_msgpack(msgpack_request)), args.iterations),
+    }
+    report["request_bytes"] = {"json": len(json_request), "msgpack": len(msgpack_request)}
+    print("  request decode + validation:")
+    for name, per_call in report["request_decode_validate_us"].items():
+        print(f"    {name:<22}{report['request_bytes'][name]:>9}{per_call:>10.1f}")
+    write_results(args.json, report)
+
+
+if __name__ == "__main__":
+    main()
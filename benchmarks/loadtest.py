@@ -0,0 +1,288 @@
+"""
+Load test for the prediction APIs.
+
+By default the app is driven in-process through an ASGI transport (no network,
+no uvicorn); pass --url to target a running server instead.
+
+    python benchmarks/loadtest.py --template all --concurrency 1,16,64 --requests 2000
+    python benchmarks/loadtest.py --template Stocks --url http://127.0.0.1:8000
+    python benchmarks/loadtest.py --template all --json run.json --baseline previous.json
+
+With --baseline, the run fails (exit code 1) when p99 latency grows or
+throughput drops by more than --max-regression compared with the baseline.
+"""
+from pathlib import Path
+import subprocess
+import statistics
+import itertools
+import argparse
+import resource
+import asyncio
+import json
+import sys
+import time
+
+from _common import TEMPLATES, use_template, write_results
+
+
+SYMBOLS = ("aapl", "msft", "nvda", "amzn", "googl", "meta", "tsla", "jpm", "xom", "ko", "pep")
+TEAMS = ("Lions", "Sharks", "Eagles", "Wolves", "Bears", "Hawks", "Tigers", "Falcons", "Rams")
+BATCH_ROUTES = {"Stocks": "/predict/batch", "Sports": "/predict/slate"}
+ENDPOINTS = ("predict", "batch", "health", "documentation")
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _sample(template, index):
+    """
+    The index-th prediction request. Symbols or teams, dates and prices or
+    odds rotate with different periods, so the result cache and request
+    coalescing can't answer most of the load and the model cost shows.
+    """
+    if template == "Stocks":
+        return {
+            "name": SYMBOLS[index % len(SYMBOLS)],
+            "date": f"2025-04-{1 + index % 28:02d}",
+            "current_price": round(20.0 + (index * 7.31) % 480.0, 2),
+        }
+    home = index % len(TEAMS)
+    away = (home + 1 + index // len(TEAMS) % (len(TEAMS) - 1)) % len(TEAMS)
+    return {
+        "home_team": TEAMS[home],
+        "away_team": TEAMS[away],
+        "home_team_odds_avg": round(1.2 + (index * 0.137) % 3.0, 2),
+        "away_team_odds_avg": round(1.2 + (index * 0.291) % 3.0, 2),
+    }
+
+
+def _request_for(template, endpoint, batch_size):
+    """
+    Method, path and a function of the request index returning its body.
+    """
+    if endpoint == "predict":
+        return "POST", "/predict", lambda index: _sample(template, index)
+    if endpoint == "batch":
+        return "POST", BATCH_ROUTES[template], lambda index: [
+            _sample(template, index * batch_size + row) for row in range(batch_size)
+        ]
+    return "GET", f"/{endpoint}", lambda index: None
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3) if seconds is not None else None
+
+
+def _show(value):
+    return "-" if value is None else value
+
+
+async def _run_level(client, method, path, body, concurrency, total, sequence):
+    # `sequence` numbers the requests across levels, so no level replays another's bodies
+    latencies = []
+    errors = 0
+    issued = 0
+
+    async def worker():
+        nonlocal issued, errors
+        while issued < total:
+            issued += 1
+            payload = body(next(sequence))
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=payload)
+                failed = response.status_code >= 400
+            except Exception:
+                failed = True
+            latencies.append(time.perf_counter() - start)
+            errors += failed
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 4),
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "p50_ms": _ms(_percentile(latencies, 50)),
+        "p95_ms": _ms(_percentile(latencies, 95)),
+        "p99_ms": _ms(_percentile(latencies, 99)),
+        "mean_ms": _ms(statistics.fmean(latencies)) if latencies else None,
+    }
+
+
+async def _wait_until_ready(client, timeout):
+    deadline = time.perf_counter() + timeout
+    while True:
+        response = await client.get("/ready")
+        if response.status_code == 200:
+            return response.json()
+        if time.perf_counter() > deadline:
+            raise SystemExit(f"API not ready after {timeout}s: {response.text}")
+        await asyncio.sleep(0.05)
+
+
+def _build_app(template):
+    use_template(template)
+    import logging
+
+    # Keep log output from skewing the measurements
+    logging.disable(logging.CRITICAL)
+    if template == "Stocks":
+        from src.api import PredictionAPI
+    else:
+        from src.api import SportsPredictionAPI as PredictionAPI
+    return PredictionAPI().get_app()
+
+
+async def run_template(args):
+    import httpx
+
+    results = {"template": args.template, "target": args.url or "in-process", "endpoints": {}}
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=60)
+        lifespan = None
+    else:
+        app = _build_app(args.template)
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=60
+        )
+        lifespan = app.router.lifespan_context(app)
+
+    async with client:
+        if lifespan is not None:
+            await lifespan.__aenter__()
+        try:
+            startup = await _wait_until_ready(client, args.ready_timeout)
+            results["startup_ms"] = startup.get("total_ms")
+            for endpoint in args.endpoints:
+                method, path, body = _request_for(args.template, endpoint, args.batch_size)
+                sequence = itertools.count()
+                # Warm up lazy imports and code paths before measuring
+                await _run_level(client, method, path, body, 1, min(20, args.requests), sequence)
+                levels = {}
+                for concurrency in args.concurrency:
+                    levels[str(concurrency)] = await _run_level(
+                        client, method, path, body, concurrency, args.requests, sequence
+                    )
+                    level = levels[str(concurrency)]
+                    print(
+                        f"{args.template:<7}{endpoint:<15}c={concurrency:<5}"
+                        f"rps={_show(level['rps']):<10} p50={_show(level['p50_ms']):<9} "
+                        f"p95={_show(level['p95_ms']):<9} p99={_show(level['p99_ms']):<9} errors={level['errors']}",
+                        file=sys.stderr,
+                    )
+                results["endpoints"][endpoint] = {"path": path, "levels": levels}
+        finally:
+            if lifespan is not None:
+                await lifespan.__aexit__(None, None, None)
+
+    # ru_maxrss is in KiB on Linux
+    results["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return results
+
+
+def compare(results, baseline, max_regression):
+    """
+    Returns a list of human-readable regressions of `results` against `baseline`.
+    """
+    regressions = []
+    for template, run in results.items():
+        base_run = baseline.get(template)
+        if not base_run:
+            continue
+        for endpoint, data in run["endpoints"].items():
+            base_levels = base_run["endpoints"].get(endpoint, {}).get("levels", {})
+            for concurrency, level in data["levels"].items():
+                base = base_levels.get(concurrency)
+                if not base:
+                    continue
+                if base["p99_ms"] and level["p99_ms"] is not None and level["p99_ms"] > base["p99_ms"] * (1 + max_regression):
+                    regressions.append(
+                        f"{template} {endpoint} c={concurrency}: p99 {base['p99_ms']}ms -> {level['p99_ms']}ms"
+                    )
+                if base["rps"] and level["rps"] is not None and level["rps"] < base["rps"] * (1 - max_regression):
+                    regressions.append(
+                        f"{template} {endpoint} c={concurrency}: rps {base['rps']} -> {level['rps']}"
+                    )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--template", default="all", choices=list(TEMPLATES) + ["all"])
+    parser.add_argument("--url", help="Target a running server instead of the in-process app")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per concurrency level")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--batch-size", type=int, default=100, help="Rows per batch request")
+    parser.add_argument("--ready-timeout", type=float, default=60, help="Seconds to wait for /ready")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--baseline", help="Results file of a previous run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.10, help="Allowed relative regression")
+    parser.add_argument("--_child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.concurrency = [int(level) for level in args.concurrency.split(",")]
+    args.endpoints = [endpoint.strip() for endpoint in args.endpoints.split(",")]
+
+    if args.template == "all":
+        if args.url:
+            raise SystemExit("--url needs a single --template")
+        # Both templates ship a package called `src`, so each runs in its own process
+        results = {}
+        for template in TEMPLATES:
+            argv = list(sys.argv[1:])
+            argv = _replace_option(argv, "--template", template)
+            argv = _replace_option(argv, "--json", None)
+            argv = _replace_option(argv, "--baseline", None)
+            output = subprocess.run(
+                [sys.executable, str(Path(__file__).resolve()), *argv, "--_child"],
+                check=True,
+                stdout=subprocess.PIPE,
+            ).stdout
+            results[template] = json.loads(output)
+    else:
+        run = asyncio.run(run_template(args))
+        if args._child:
+            print(json.dumps(run))
+            return
+        results = {args.template: run}
+
+    write_results(args.json, results)
+    if args.baseline:
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            print("Performance regressions:", *regressions, sep="\n  ")
+            raise SystemExit(1)
+        print(f"No regressions beyond {args.max_regression:.0%} against {args.baseline}")
+
+
+def _replace_option(argv, option, value):
+    cleaned = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+            continue
+        if arg == option:
+            skip = True
+            continue
+        if arg.startswith(option + "="):
+            continue
+        cleaned.append(arg)
+    if value is not None:
+        cleaned += [option, value]
+    return cleaned
+
+
+if __name__ == "__main__":
+    main()